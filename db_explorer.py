@@ -8,11 +8,13 @@ CORREGIDO: Manejo de compatibilidad SQLAlchemy
 """
 
 import pandas as pd
-import psycopg2
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import warnings
 warnings.filterwarnings('ignore')
 
+from src.utils.db_connector import create_db_engine
+from src.utils.storage_backend import default_schema, list_tables
+
 def safe_query(engine, query, query_name="Query"):
     """Ejecuta query de forma segura con manejo de errores"""
     try:
@@ -32,32 +34,12 @@ def main():
     print("🔍 EXPLORADOR DE BASE DE DATOS CRYPTONITA (CORREGIDO)")
     print("=" * 55)
     
-    # Configuración DB
-    db_config = {
-        'user': 'cryptonita_user',
-        'password': 'TIZavoltio999',
-        'host': 'localhost',
-        'port': '5432',
-        'database': 'cryptonita_db2'
-    }
-    
     try:
-        # Conectar con configuración mejorada
-        connection_string = (
-            f"postgresql://{db_config['user']}:{db_config['password']}"
-            f"@{db_config['host']}:{db_config['port']}/{db_config['database']}"
-        )
-        
-        # Engine con configuración explícita
-        engine = create_engine(
-            connection_string,
-            pool_pre_ping=True,
-            pool_recycle=300
-        )
-        
-        # Test de conexión
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        # Conectar con el backend configurado (PostgreSQL o DuckDB embebido)
+        engine = create_db_engine()
+        if engine is None:
+            raise RuntimeError("No se pudo crear el motor de base de datos")
+        schema = default_schema(engine)
         
         print("✅ Conectado a la base de datos\n")
         
@@ -66,10 +48,10 @@ def main():
         print("-" * 30)
         
         # Verificar si la tabla existe primero
-        table_exists_query = """
+        table_exists_query = f"""
         SELECT table_name 
         FROM information_schema.tables 
-        WHERE table_schema = 'public' AND table_name = 'gnn_technical_features'
+        WHERE table_schema = '{schema}' AND table_name = 'gnn_technical_features'
         """
         
         table_exists = safe_query(engine, table_exists_query, "Check table exists")
@@ -123,9 +105,9 @@ def main():
         print("-" * 30)
         
         # Verificar si existe
-        check_corr_query = """
+        check_corr_query = f"""
         SELECT table_name FROM information_schema.tables 
-        WHERE table_schema = 'public' AND table_name = 'gnn_correlations'
+        WHERE table_schema = '{schema}' AND table_name = 'gnn_correlations'
         """
         
         corr_exists = safe_query(engine, check_corr_query, "Check correlations table")
@@ -167,79 +149,28 @@ def main():
         print("🔍 TODAS LAS TABLAS EN LA BASE DE DATOS")
         print("-" * 30)
         
-        # Método alternativo usando psycopg2 directamente
-        try:
-            import psycopg2
-            
-            conn_params = {
-                'host': db_config['host'],
-                'port': db_config['port'],
-                'database': db_config['database'],
-                'user': db_config['user'],
-                'password': db_config['password']
-            }
-            
-            with psycopg2.connect(**conn_params) as conn:
-                with conn.cursor() as cur:
-                    # Obtener todas las tablas
-                    cur.execute("""
-                        SELECT schemaname, tablename 
-                        FROM pg_tables 
-                        WHERE schemaname = 'public'
-                        ORDER BY tablename
-                    """)
-                    
-                    tables = cur.fetchall()
-                    
-                    print("📋 TODAS LAS TABLAS DISPONIBLES:")
-                    gnn_tables = []
-                    other_tables = []
-                    
-                    for schema, table in tables:
-                        if table.startswith('gnn_'):
-                            gnn_tables.append(table)
-                        else:
-                            other_tables.append(table)
-                    
-                    print(f"\n🧠 TABLAS GNN ({len(gnn_tables)}):")
-                    for table in gnn_tables:
-                        # Contar registros
-                        try:
-                            cur.execute(f"SELECT COUNT(*) FROM {table}")
-                            count = cur.fetchone()[0]
-                            print(f"   {table}: {count:,} registros")
-                        except Exception as e:
-                            print(f"   {table}: Error contando - {e}")
-                    
-                    print(f"\n📊 OTRAS TABLAS ({len(other_tables)}):")
-                    for table in other_tables[:10]:  # Solo primeras 10
-                        try:
-                            cur.execute(f"SELECT COUNT(*) FROM {table}")
-                            count = cur.fetchone()[0]
-                            print(f"   {table}: {count:,} registros")
-                        except Exception as e:
-                            print(f"   {table}: Error contando")
-                    
-                    if len(other_tables) > 10:
-                        print(f"   ... y {len(other_tables) - 10} tablas más")
-                        
-        except ImportError:
-            print("⚠️ psycopg2 no disponible, usando método SQLAlchemy alternativo")
-            
-            # Método alternativo con SQLAlchemy
-            all_tables_query = """
-            SELECT schemaname, tablename 
-            FROM pg_tables 
-            WHERE schemaname = 'public'
-            ORDER BY tablename
-            """
-            
-            tables_df = safe_query(engine, all_tables_query, "All tables")
-            
-            if not tables_df.empty:
-                print("📋 TABLAS ENCONTRADAS:")
-                for _, row in tables_df.iterrows():
-                    print(f"   {row['tablename']}")
+        # Listado vía el inspector de SQLAlchemy (funciona igual en PostgreSQL y DuckDB)
+        tables = list_tables(engine)
+        gnn_tables = [table for table in tables if table.startswith('gnn_')]
+        other_tables = [table for table in tables if not table.startswith('gnn_')]
+        
+        def count_rows(table):
+            count_df = safe_query(engine, f"SELECT COUNT(*) AS total FROM {table}", f"Count {table}")
+            return None if count_df.empty else int(count_df['total'].iloc[0])
+        
+        print("📋 TODAS LAS TABLAS DISPONIBLES:")
+        print(f"\n🧠 TABLAS GNN ({len(gnn_tables)}):")
+        for table in gnn_tables:
+            count = count_rows(table)
+            print(f"   {table}: {count:,} registros" if count is not None else f"   {table}: Error contando")
+        
+        print(f"\n📊 OTRAS TABLAS ({len(other_tables)}):")
+        for table in other_tables[:10]:  # Solo primeras 10
+            count = count_rows(table)
+            print(f"   {table}: {count:,} registros" if count is not None else f"   {table}: Error contando")
+        
+        if len(other_tables) > 10:
+            print(f"   ... y {len(other_tables) - 10} tablas más")
         
         # 4. ANÁLISIS ESPECÍFICO PARA GRAPHBUILDER
         print("\n" + "="*55)
@@ -256,7 +187,7 @@ def main():
             check_query = f"""
             SELECT COUNT(*) as exists 
             FROM information_schema.tables 
-            WHERE table_schema = 'public' AND table_name = '{table_name}'
+            WHERE table_schema = '{schema}' AND table_name = '{table_name}'
             """
             
             exists_df = safe_query(engine, check_query, f"Check {table_name}")
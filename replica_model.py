@@ -16,9 +16,9 @@ Arquitectura identificada:
 
 import pandas as pd
 import numpy as np
-import joblib
 import json
-from sqlalchemy import create_engine
+import sys
+import os
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
@@ -30,95 +30,58 @@ from lightgbm import LGBMClassifier
 import warnings
 warnings.filterwarnings('ignore')
 
-# Configuración DB
-DB_CONFIG = {
-    'user': 'cryptonita_user',
-    'password': 'TIZavoltio999',
-    'host': 'localhost', 
-    'port': '5432',
-    'database': 'cryptonita_db2'
-}
+project_root = os.path.abspath(os.path.dirname(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-def conectar_db():
-    return f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+from sqlalchemy import text
+from src.utils.db_connector import create_db_engine
+from src.feature_engineering.model_features import MODEL_FEATURES, load_training_frame
+from src.modeling.model_server import save_model_package
+
+TRAINING_START = '2022-01-01'
 
 def load_and_prepare_expanded_dataset():
     """
-    Carga y prepara el dataset expandido con las 15 features exactas del modelo original
+    Carga el dataset de entrenamiento con las 15 features del modelo calculadas
+    por el mismo kernel que 02_prepare_features (model_features), reutilizando
+    sus artefactos en caché, más el retorno a 7 días de las mismas barras para el target.
     """
     print("📊 PASO 1: Cargando y preparando dataset expandido")
     print("-" * 50)
     
-    engine = create_engine(conectar_db())
+    engine = create_db_engine()
     
     # ========================================
-    # Cargar datos técnicos
-    # ========================================
-    print("   🔧 Cargando datos técnicos...")
-    tech_query = """
-    SELECT 
-        ticker, date,
-        return_1d, return_7d, return_30d,
-        volatility_7d, rsi_14, 
-        macd, macd_signal, macd_histogram,
-        ema_12, ema_26, ema_50
-    FROM gnn_technical_features 
-    WHERE date >= '2022-01-01'
-    ORDER BY ticker, date
-    """
-    df_tech = pd.read_sql(tech_query, engine)
-    print(f"   ✅ Datos técnicos: {df_tech.shape} | Tickers: {df_tech['ticker'].nunique()}")
-    
+    # Features del modelo (kernel compartido con producción)
     # ========================================
-    # Cargar y procesar datos macro
-    # ========================================
-    print("   🔧 Cargando datos macro...")
-    macro_query = """
-    SELECT date, indicator_symbol, close_value
-    FROM gnn_macro_indicators
-    WHERE date >= '2022-01-01'
-    ORDER BY date, indicator_symbol
-    """
-    df_macro_raw = pd.read_sql(macro_query, engine)
-    
-    # Pivotar macro data
-    df_macro = df_macro_raw.pivot(index='date', columns='indicator_symbol', values='close_value')
-    column_mapping = {
-        'SPY': 'spy_close', 'VIX': 'vix_close', 'TNX': 'tnx_close',
-        'DXY': 'dxy_close', 'GOLD': 'gc_close', 'OIL': 'cl_close'
-    }
-    df_macro = df_macro.rename(columns=column_mapping)
-    df_macro = df_macro.fillna(method='ffill')  # Forward fill
-    
-    print(f"   ✅ Datos macro: {df_macro.shape} | Columnas: {list(df_macro.columns)}")
+    print("   🔧 Cargando features del kernel compartido (model_features)...")
+    df_features = load_training_frame(engine, MODEL_FEATURES, since=TRAINING_START)
+    print(f"   ✅ Features: {df_features.shape} | Tickers: {df_features['ticker'].nunique()}")
     
     # ========================================
-    # Cargar funding rates
+    # Retorno a 7 días (target) desde asset_metrics
     # ========================================
-    print("   🔧 Cargando funding rates...")
-    funding_query = """
-    SELECT ticker, date, funding_rate
-    FROM gnn_funding_rates
-    WHERE date >= '2022-01-01'
-    """
-    df_funding = pd.read_sql(funding_query, engine)
-    print(f"   ✅ Funding rates: {df_funding.shape}")
+    print("   🔧 Calculando return_7d desde asset_metrics...")
+    # 7 días antes del inicio para que las primeras fechas de entrenamiento tengan retorno
+    bars_since = pd.Timestamp(TRAINING_START, tz='UTC') - pd.Timedelta(days=7)
+    df_bars = pd.read_sql(
+        text("SELECT ticker, timestamp, close FROM asset_metrics WHERE timestamp >= :since ORDER BY ticker, timestamp"),
+        engine, params={'since': bars_since.to_pydatetime()}
+    )
+    df_bars['timestamp'] = pd.to_datetime(df_bars['timestamp'], utc=True).dt.normalize()
+    # Una barra por (ticker, día), la última, como las features: pct_change(7) son 7 días, no 7 filas
+    df_bars = df_bars.drop_duplicates(['ticker', 'timestamp'], keep='last').reset_index(drop=True)
+    df_bars['return_7d'] = df_bars.groupby('ticker')['close'].pct_change(7) * 100
     
     engine.dispose()
     
     # ========================================
-    # Unir todos los datos
+    # Unir features y retornos
     # ========================================
-    print("   🔧 Uniendo datasets...")
-    
-    # Convertir fechas
-    df_tech['date'] = pd.to_datetime(df_tech['date'])
-    df_macro.index = pd.to_datetime(df_macro.index) 
-    df_funding['date'] = pd.to_datetime(df_funding['date'])
-    
-    # Merges
-    df_combined = pd.merge(df_tech, df_macro, left_on='date', right_index=True, how='left')
-    df_combined = pd.merge(df_combined, df_funding, on=['ticker', 'date'], how='left')
+    df_combined = pd.merge(
+        df_features, df_bars[['ticker', 'timestamp', 'return_7d']], on=['ticker', 'timestamp'], how='left'
+    ).rename(columns={'timestamp': 'date'})
     
     print(f"   ✅ Dataset unificado: {df_combined.shape}")
     
@@ -126,80 +89,15 @@ def load_and_prepare_expanded_dataset():
 
 def create_exact_features(df):
     """
-    Crea las 15 features exactas que requiere el modelo original
+    Verifica las 15 features exactas que requiere el modelo. Se calculan en
+    src/feature_engineering/model_features.py, el mismo código que usa producción.
     """
-    print("\n🔧 PASO 2: Creando las 15 features exactas del modelo")
+    print("\n🔧 PASO 2: Verificando las 15 features exactas del modelo")
     print("-" * 50)
     
-    df = df.copy()
+    required_features = list(MODEL_FEATURES)
     
-    # ========================================
-    # Features ya disponibles (9):
-    # ========================================
-    available_features = [
-        'macd_signal', 'volatility_7d', 'spy_close', 'vix_close', 
-        'tnx_close', 'dxy_close', 'gc_close', 'cl_close', 'funding_rate'
-    ]
-    
-    print(f"   ✅ Features ya disponibles: {len(available_features)}")
-    for feat in available_features:
-        if feat in df.columns:
-            print(f"      ✓ {feat}: {df[feat].notna().sum():,} valores válidos")
-        else:
-            print(f"      ✗ {feat}: FALTANTE")
-    
-    # ========================================
-    # Features a calcular (6):
-    # ========================================
-    print(f"\n   🔧 Calculando features faltantes...")
-    
-    # 1. close (usar return_1d como proxy del precio)
-    df['close'] = df['return_1d']
-    print(f"      ✓ close: creado usando return_1d")
-    
-    # 2. macd_hist (usar macd_histogram si existe, sino proxy)
-    if 'macd_histogram' in df.columns and not df['macd_histogram'].isna().all():
-        df['macd_hist'] = df['macd_histogram']
-        print(f"      ✓ macd_hist: usando macd_histogram existente")
-    else:
-        df['macd_hist'] = df['macd'] * 0.1  # Proxy simple
-        print(f"      ✓ macd_hist: creado como proxy (macd * 0.1)")
-    
-    # 3. log_return
-    df['log_return'] = np.log(1 + df['return_1d'].fillna(0)/100)
-    print(f"      ✓ log_return: log(1 + return_1d/100)")
-    
-    # 4. price_to_ema_ratio (usando ema_50 si existe)
-    if 'ema_50' in df.columns:
-        df['price_to_ema_ratio'] = df['return_1d'] / df['ema_50'].fillna(1)
-        print(f"      ✓ price_to_ema_ratio: return_1d / ema_50")
-    else:
-        df['price_to_ema_ratio'] = 1.0  # Placeholder
-        print(f"      ✓ price_to_ema_ratio: placeholder (1.0)")
-    
-    # 5. macd_norm (MACD normalizado por rolling std)
-    df['macd_norm'] = df.groupby('ticker')['macd'].transform(
-        lambda x: x / x.rolling(30, min_periods=5).std().fillna(1)
-    )
-    print(f"      ✓ macd_norm: macd / rolling_std(30)")
-    
-    # 6. log_return_gc_close (log return del oro)
-    df = df.sort_values(['ticker', 'date'])
-    df['gc_close_pct'] = df['gc_close'].pct_change().fillna(0)
-    df['log_return_gc_close'] = np.log(1 + df['gc_close_pct'].fillna(0))
-    print(f"      ✓ log_return_gc_close: log(1 + pct_change(gc_close))")
-    
-    # ========================================
-    # Verificar que tenemos las 15 features
-    # ========================================
-    required_features = [
-        'close', 'macd_signal', 'macd_hist', 'funding_rate',
-        'spy_close', 'vix_close', 'tnx_close', 'dxy_close', 
-        'gc_close', 'cl_close', 'log_return', 'volatility_7d',
-        'price_to_ema_ratio', 'macd_norm', 'log_return_gc_close'
-    ]
-    
-    print(f"\n   📊 Verificación de las 15 features:")
+    print(f"   📊 Verificación de las 15 features:")
     missing_features = []
     for feat in required_features:
         if feat in df.columns:
@@ -259,12 +157,7 @@ def build_exact_model_architecture():
     print("-" * 50)
     
     # Features exactas del modelo original
-    feature_columns = [
-        'close', 'macd_signal', 'macd_hist', 'funding_rate',
-        'spy_close', 'vix_close', 'tnx_close', 'dxy_close', 
-        'gc_close', 'cl_close', 'log_return', 'volatility_7d',
-        'price_to_ema_ratio', 'macd_norm', 'log_return_gc_close'
-    ]
+    feature_columns = list(MODEL_FEATURES)
     
     print(f"   🔧 Features del pipeline: {len(feature_columns)}")
     
@@ -457,7 +350,8 @@ def train_and_evaluate_replica(df, primary_pipeline, meta_model, feature_columns
     }
     
     model_filename = 'models/ULTRA_MODEL_REPLICA_EXPANDED.joblib'
-    joblib.dump(replicated_model, model_filename)
+    # Escritura atómica: el servidor de modelos en caliente nunca ve el fichero a medias
+    save_model_package(replicated_model, model_filename)
     print(f"\n   💾 Modelo replicado guardado: {model_filename}")
     
     return replicated_model
@@ -1,5 +1,7 @@
 # src/celery_app.py
 from celery import Celery
+from celery.signals import worker_process_init
+import logging
 import os
 import sys
 
@@ -43,5 +45,14 @@ app.conf.update(
 # Auto-descubrir tareas en el módulo pipeline
 app.autodiscover_tasks(['src.pipeline'])
 
+@worker_process_init.connect
+def warm_model_server(**kwargs):
+    """Carga el modelo al arrancar cada proceso worker: las tareas lo encuentran ya en memoria."""
+    try:
+        from src.modeling.model_server import model_server
+        model_server.current()
+    except Exception as e:
+        logging.warning(f"⚠️ No se pudo precargar el modelo en el worker: {e}")
+
 if __name__ == '__main__':
     app.start()
\ No newline at end of file
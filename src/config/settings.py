@@ -126,4 +126,229 @@ RISK_PER_TRADE = 0.01
 # ALIAS PARA COMPATIBILIDAD CON SCRIPTS
 # =============================================
 
-TICKER_TO_BINANCE = TICKER_MAP_BINANCE
\ No newline at end of file
+TICKER_TO_BINANCE = TICKER_MAP_BINANCE
+
+# =============================================
+# RETENCIÓN DE DATOS Y ARCHIVO EN PARQUET
+# =============================================
+
+# Directorio donde se guardan los archivos Parquet con las filas archivadas
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'archive')
+
+# Compresión de los archivos Parquet del archivo histórico
+ARCHIVE_COMPRESSION = 'zstd'
+
+# Políticas de retención por tabla:
+# - time_column: columna temporal usada para particionar por mes
+# - hot_days: días que se mantienen "en caliente" en PostgreSQL
+# - rollup_table: tabla de agregados diarios que sobrevive al archivado
+# - rollup: tipo de agregado ('ohlcv', 'funding', 'trades')
+# asset_metrics no tiene política: es diaria y las features necesitan toda su
+# historia en caliente. 'ohlcv' queda para cuando exista una tabla intradía.
+RETENTION_POLICIES = {
+    'derivatives_funding_rates': {
+        'time_column': 'timestamp',
+        'hot_days': 365,
+        'rollup_table': 'derivatives_funding_rates_daily',
+        'rollup': 'funding',
+    },
+    'trade_log': {
+        'time_column': 'timestamp',
+        'hot_days': 365,
+        'rollup_table': 'trade_log_daily',
+        'rollup': 'trades',
+    },
+}
+
+# =============================================
+# BACKEND DE ALMACENAMIENTO
+# =============================================
+
+# 'postgresql' (servidor) o 'duckdb' (archivo local embebido, columnar)
+DB_BACKEND = os.getenv('CRYPTONITA_DB_BACKEND', 'postgresql')
+
+# Archivo de la base de datos embebida (solo para DB_BACKEND = 'duckdb')
+EMBEDDED_DB_PATH = os.getenv(
+    'CRYPTONITA_EMBEDDED_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'cryptonita.duckdb')
+)
+
+# =============================================
+# CACHÉ CALIENTE (REDIS)
+# =============================================
+
+# Último bar / vector de features / predicción por ticker, escritos por cada etapa
+HOT_CACHE_ENABLED = os.getenv('CRYPTONITA_HOT_CACHE', '1') == '1'
+HOT_CACHE_URL = os.getenv('CRYPTONITA_HOT_CACHE_URL', REDIS_URL)
+HOT_CACHE_PREFIX = 'cryptonita:hot'
+
+# Días de barras diarias que se guardan junto al último bar (ventanas del dashboard)
+HOT_CACHE_BAR_WINDOW_DAYS = 30
+
+# TTL en segundos: si una etapa deja de escribir, la entrada caduca y se lee de disco
+HOT_CACHE_TTL = {
+    'bar': 2 * 24 * 3600,
+    'features': 2 * 24 * 3600,
+    'prediction': 24 * 3600,
+}
+
+# =============================================
+# FEATURES INCREMENTALES
+# =============================================
+
+# Estado recursivo por ticker (EMAs, cola de retornos, último cierre) y features ya calculadas
+FEATURE_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'feature_state')
+
+# =============================================
+# CÁLCULO PARALELO DE INDICADORES
+# =============================================
+
+# Procesos para TA-Lib (por defecto, uno por núcleo). Con 1 se calcula en el propio proceso.
+INDICATOR_WORKERS = int(os.getenv('CRYPTONITA_INDICATOR_WORKERS', os.cpu_count() or 1))
+
+# Por debajo de estas filas no compensa arrancar el pool
+INDICATOR_PARALLEL_MIN_ROWS = 50_000
+
+# =============================================
+# PATRONES DE VELAS
+# =============================================
+
+# Subconjunto de patrones TA-Lib que se evalúan (los más frecuentes). Se genera con
+# `python src/feature_engineering/candle_patterns.py --calibrate` si no existe.
+CANDLE_PATTERN_SUBSET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'notebooks', 'candle_pattern_subset.json')
+
+# =============================================
+# REGISTRO DE FEATURES
+# =============================================
+
+# La lista de features activa se toma del paquete del modelo; el JSON es el respaldo
+MODEL_PACKAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'models', 'ULTRA_MODEL_PACKAGE.joblib')
+MODEL_FEATURES_FALLBACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'notebooks', 'important_features.json')
+
+# =============================================
+# CACHÉ DE ARTEFACTOS DE FEATURES
+# =============================================
+
+# Artefactos de 02 indexados por la huella de sus tablas fuente y la versión del código
+FEATURE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'feature_cache')
+
+# Tamaño máximo en disco; por encima se expulsan los de uso más antiguo (LRU)
+FEATURE_CACHE_MAX_BYTES = int(os.getenv('CRYPTONITA_FEATURE_CACHE_MAX_MB', '2048')) * 1024 * 1024
+
+# =============================================
+# ESQUEMA COMPACTO DE FEATURES
+# =============================================
+
+# model_input_features/ y los artefactos de 02 en float32 / ticker categórico /
+# días int32; se vuelve a float64 en la frontera con el modelo
+COMPACT_SCHEMA = os.getenv('CRYPTONITA_COMPACT_SCHEMA', '1') == '1'
+
+# Columnas que se guardan en float32: solo features sin escala (retornos, ratios,
+# volatilidades, funding), cuyo redondeo (~6e-8 relativo) está muy por debajo de su
+# ruido. Precios (open/high/low/close, cierres macro), volumen y MACD en unidades de
+# precio se quedan en float64
+COMPACT_FLOAT32_COLUMNS = [
+    'funding_rate', 'log_return', 'volatility_7d',
+    'price_to_ema_ratio', 'macd_norm', 'log_return_gc_close'
+]
+
+# =============================================
+# KERNELS COMPILADOS
+# =============================================
+
+# Bucles de EWM y ventanas móviles compilados con Numba (si está instalado); si no, NumPy
+NUMBA_KERNELS = os.getenv('CRYPTONITA_NUMBA_KERNELS', '1') == '1'
+
+# =============================================
+# CORRELACIONES MÓVILES
+# =============================================
+
+# Ventana (días) y umbral de aristas del grafo de activos (graph_specifications.json)
+CORRELATION_WINDOW = int(os.getenv('CRYPTONITA_CORRELATION_WINDOW', '30'))
+CORRELATION_EDGE_THRESHOLD = 0.3
+
+# Días en común mínimos de un par para publicar su correlación/beta
+CORRELATION_MIN_PERIODS = int(os.getenv('CRYPTONITA_CORRELATION_MIN_PERIODS', '10'))
+
+# Sumas por pares de la ventana (estado del motor incremental)
+CORRELATION_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'correlation_state')
+
+# =============================================
+# FEATURES TRANSVERSALES
+# =============================================
+
+# Activos mínimos con dato en un día para publicar rangos, percentiles y z-scores
+CROSS_SECTION_MIN_ASSETS = int(os.getenv('CRYPTONITA_CROSS_SECTION_MIN_ASSETS', '5'))
+
+# =============================================
+# EJECUCIÓN DIARIA DE FEATURES
+# =============================================
+
+# Días extra (sobre el lookback del plan) que se leen antes de la última barra conocida
+# cuando solo han llegado barras nuevas: cubren huecos de tickers y el desplazamiento de 1 barra
+DAILY_LOOKBACK_MARGIN_DAYS = int(os.getenv('CRYPTONITA_DAILY_LOOKBACK_MARGIN_DAYS', '7'))
+
+# =============================================
+# MONITOR DE DERIVA DE FEATURES
+# =============================================
+
+DRIFT_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'drift')
+
+# Bins de igual masa en la referencia, días agregados por ventana y días de historial guardados
+DRIFT_BINS = 10
+DRIFT_WINDOW_DAYS = int(os.getenv('CRYPTONITA_DRIFT_WINDOW_DAYS', '7'))
+DRIFT_HISTORY_DAYS = 180
+
+# Inicio de los datos de entrenamiento (replica_model.TRAINING_START): la referencia va de aquí a la fecha del modelo
+DRIFT_REFERENCE_START = '2022-01-01'
+
+# Umbrales: PSI (0.1 aviso / 0.25 alerta, los habituales) y subida de la tasa de ceros o nulos
+DRIFT_PSI_WARN = 0.1
+DRIFT_PSI_ALERT = 0.25
+DRIFT_ZERO_RATE_ALERT = 0.2
+
+# =============================================
+# PREDICTOR RÁPIDO
+# =============================================
+
+# Escalado + PCA plegados en una matriz afín y booster de LightGBM llamado directamente;
+# si la arquitectura del paquete no es la esperada se usa el pipeline de sklearn
+FAST_PREDICTOR = os.getenv('CRYPTONITA_FAST_PREDICTOR', '1') == '1'
+
+# Filas sintéticas con las que se compara contra sklearn al cargar el modelo, y
+# diferencia máxima admitida en probabilidades (si cambia alguna clase se descarta)
+FAST_PREDICTOR_CHECK_ROWS = 512
+FAST_PREDICTOR_MAX_DIFF = 1e-9
+
+# =============================================
+# SIMULACIÓN DE ESTRATEGIA
+# =============================================
+
+# Filas por bloque al puntuar todo el histórico en 05 (acota la copia float64 de entrada)
+SIMULATION_BATCH_ROWS = int(os.getenv('CRYPTONITA_SIMULATION_BATCH_ROWS', '262144'))
+
+# =============================================
+# SNAPSHOT DE FEATURES
+# =============================================
+
+# Salida de 02: features del modelo, un parquet por mes + manifest.json
+# (src/utils/monthly_parquet.py); cada ejecución solo añade los meses que cambian
+MODEL_INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'notebooks', 'dataframes', 'model_input_features')
+
+# Último vector por ticker que 02 escribe junto a MODEL_INPUT_DIR;
+# 03 lo lee en lugar del almacén completo (que solo se usa para backfills)
+LATEST_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'notebooks', 'dataframes', 'model_input_latest.parquet')
+
+# =============================================
+# BACKEND ONNX
+# =============================================
+
+# 'native' (predictor rápido o sklearn) u 'onnx' (onnxruntime sobre models/*.onnx, que
+# se exporta solo si falta o es de otra versión del paquete)
+MODEL_BACKEND = os.getenv('CRYPTONITA_MODEL_BACKEND', 'native')
+
+# Hilos intra-op de onnxruntime (0 = los que elija onnxruntime)
+ONNX_INTRA_OP_THREADS = int(os.getenv('CRYPTONITA_ONNX_THREADS', '1'))
+
+# Diferencia máxima admitida frente a sklearn al exportar y en la suite de equivalencia
+ONNX_MAX_DIFF = 1e-9
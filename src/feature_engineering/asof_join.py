@@ -0,0 +1,94 @@
+# src/feature_engineering/asof_join.py
+
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+def _as_int64(timestamps) -> np.ndarray:
+    """Timestamps (naive o tz-aware) -> nanosegundos UTC como int64."""
+    return pd.DatetimeIndex(timestamps).as_unit('ns').asi8
+
+def asof_join(timestamps, series: list) -> np.ndarray:
+    """
+    Alinea varias series (p. ej. cierres macro) sobre el calendario de
+    `timestamps` (una fila por barra cripto, en cualquier orden). Cada serie es
+    un par (timestamps, valores); para cada fila se toma el último valor no nulo
+    con timestamp <= el de la fila (búsqueda solo hacia atrás: nunca mira al
+    futuro). Sin observación previa, NaN.
+
+    La búsqueda se hace una vez por fecha distinta (searchsorted sobre la serie
+    ordenada) y se expande a las filas con el índice inverso, escribiendo en una
+    única matriz (filas x series).
+    """
+    rows = _as_int64(timestamps)
+    inverse, dates = pd.factorize(rows)
+    aligned = np.full((len(dates), len(series)), np.nan)
+    for k, (series_ts, values) in enumerate(series):
+        series_ts = _as_int64(series_ts)
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        series_ts, values = series_ts[valid], values[valid]
+        # Orden estable: con timestamps repetidos gana la última observación
+        order = np.argsort(series_ts, kind='stable')
+        series_ts, values = series_ts[order], values[order]
+        position = np.searchsorted(series_ts, dates, side='right') - 1
+        found = position >= 0
+        aligned[found, k] = values[position[found]]
+    out = np.empty((len(rows), len(series)))
+    np.take(aligned, inverse, axis=0, out=out)
+    return out
+
+# --- BENCHMARK ---
+
+def _reference_merge_ffill(frame: pd.DataFrame, macro: dict) -> pd.DataFrame:
+    """Implementación anterior de 02: un merge por serie + ffill agrupado por ticker."""
+    master_df = frame
+    for column, df in macro.items():
+        master_df = pd.merge(master_df, df, on='timestamp', how='left')
+    master_df = master_df.sort_values(by=['ticker', 'timestamp'])
+    master_df[list(macro)] = master_df.groupby('ticker')[list(macro)].ffill()
+    return master_df
+
+def run_benchmark(n_tickers: int = 1000, n_days: int = 1500, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D', tz='UTC')
+    frame = pd.DataFrame({
+        'ticker': np.repeat([f"T{i:04d}" for i in range(n_tickers)], n_days),
+        'timestamp': np.tile(dates, n_tickers),
+    })
+    weekdays = dates[dates.dayofweek < 5]
+    macro = {
+        f"m{k}_close": pd.DataFrame({'timestamp': weekdays, f"m{k}_close": rng.random(len(weekdays))})
+        for k in range(6)
+    }
+    print(f"📊 {n_tickers} tickers x {n_days} días ({len(frame):,} filas), {len(macro)} series macro")
+
+    start = time.perf_counter()
+    reference = _reference_merge_ffill(frame, macro)
+    print(f"   merge x{len(macro)} + ffill agrupado: {time.perf_counter() - start:6.2f} s")
+
+    start = time.perf_counter()
+    values = asof_join(frame['timestamp'], [(df['timestamp'], df[col]) for col, df in macro.items()])
+    result = frame.assign(**{col: values[:, k] for k, col in enumerate(macro)})
+    print(f"   as-of join:                 {time.perf_counter() - start:6.2f} s")
+
+    reference = reference.sort_values(['ticker', 'timestamp']).reset_index(drop=True)
+    result = result.sort_values(['ticker', 'timestamp']).reset_index(drop=True)
+    same = np.array_equal(reference[list(macro)].to_numpy(), result[list(macro)].to_numpy(), equal_nan=True)
+    print(f"   idéntico: {same}")
+
+    # Sin look-ahead: cada valor alineado es de una fecha <= la de su fila
+    series_ts, series_values = macro['m0_close']['timestamp'], macro['m0_close']['m0_close']
+    source_date = pd.Series(series_ts.values, index=series_values.values)
+    used = source_date.reindex(result['m0_close']).to_numpy()
+    mask = ~pd.isna(used)
+    print(f"   sin look-ahead: {bool((used[mask] <= result['timestamp'].values[mask]).all())}")
+
+if __name__ == "__main__":
+    run_benchmark()
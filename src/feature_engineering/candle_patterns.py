@@ -1,34 +1,166 @@
 # src/feature_engineering/candle_patterns.py (VERSIÓN CON FILTRADO)
 
 import pandas as pd
+import numpy as np
 import talib
 from sqlalchemy import text
+import json
+import time
+import tracemalloc
 import sys, os
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if project_root not in sys.path: sys.path.insert(0, project_root)
 
+from src.config import settings
 from src.utils.db_connector import create_db_engine
+from src.utils.db_streaming import iter_ticker_frames, BulkCopyWriter
+
+TOP_N_PATTERNS = 20
+
+# Todas las funciones de patrones de TA-Lib, en su orden (define el "primer patrón activo")
+ALL_PATTERNS = talib.get_function_groups()['Pattern Recognition']
+
+# TA-Lib devuelve 0, ±80, ±100 o ±200: en unidades de 20 cabe en int8
+PATTERN_UNIT = 20
+
+OUTPUT_COLUMNS = ['ticker', 'timestamp', 'pattern_score', 'pattern_name']
+
+# --- MOTOR VECTORIZADO ---
+
+def pattern_matrix(df: pd.DataFrame, patterns: list) -> np.ndarray:
+    """Evalúa `patterns` sobre un ticker y apila los resultados en una matriz int8 (filas x patrones)."""
+    o, h, l, c = (df[col].to_numpy(dtype='float64') for col in ['open', 'high', 'low', 'close'])
+    matrix = np.empty((len(df), len(patterns)), dtype=np.int8)
+    for j, pattern in enumerate(patterns):
+        raw = getattr(talib, pattern)(o, h, l, c)
+        if (raw % PATTERN_UNIT).any():
+            raise ValueError(f"{pattern} devolvió valores que no son múltiplo de {PATTERN_UNIT}")
+        matrix[:, j] = raw // PATTERN_UNIT
+    return matrix
+
+def score_matrix(matrix: np.ndarray, patterns: list):
+    """
+    'pattern_score' (suma de señales) y 'pattern_name' (primer patrón activo, en el
+    orden de `patterns`) a partir de la matriz int8, sin recorrer filas.
+    """
+    score = matrix.sum(axis=1, dtype=np.int32) * PATTERN_UNIT
+    active = matrix != 0
+    first = active.argmax(axis=1)
+    names = np.array([p.lower() for p in patterns] + ["No Pattern"], dtype=object)
+    name = names[np.where(active.any(axis=1), first, len(patterns))]
+    return score, name
+
+def compute_pattern_features(df: pd.DataFrame, patterns: list) -> pd.DataFrame:
+    """Filas con patrón (score != 0) de un ticker: ticker, timestamp, pattern_score, pattern_name."""
+    if df.empty:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    score, name = score_matrix(pattern_matrix(df, patterns), patterns)
+    mask = score != 0
+    return pd.DataFrame({
+        'ticker': df['ticker'].to_numpy()[mask],
+        'timestamp': df['timestamp'].to_numpy()[mask],
+        'pattern_score': score[mask],
+        'pattern_name': name[mask],
+    })
+
+# --- SUBCONJUNTO DE PATRONES ---
+
+def load_pattern_subset() -> list:
+    if not os.path.exists(settings.CANDLE_PATTERN_SUBSET_PATH):
+        return None
+    with open(settings.CANDLE_PATTERN_SUBSET_PATH, 'r') as f:
+        patterns = json.load(f)
+    unknown = [p for p in patterns if p not in ALL_PATTERNS]
+    if unknown:
+        raise ValueError(f"Patrones desconocidos en {settings.CANDLE_PATTERN_SUBSET_PATH}: {unknown}")
+    # Siempre en el orden de TA-Lib, para que el "primer patrón activo" no dependa del archivo
+    return [p for p in ALL_PATTERNS if p in patterns]
+
+def calibrate_pattern_subset(engine, top_n: int = TOP_N_PATTERNS) -> list:
+    """
+    Evalúa los ~61 patrones sobre todo el histórico (una sola vez), cuenta cuántas
+    filas nombra cada uno como primer patrón activo y guarda los `top_n` más
+    frecuentes como subconjunto configurado.
+    """
+    print(f"  -> Calibrando subconjunto de patrones con los {len(ALL_PATTERNS)} de TA-Lib...")
+    sql_query = "SELECT ticker, timestamp, open, high, low, close FROM asset_metrics ORDER BY ticker, timestamp"
+    counts = pd.Series(dtype='int64')
+    for ticker, ticker_df in iter_ticker_frames(engine, sql_query):
+        names = compute_pattern_features(ticker_df, ALL_PATTERNS)['pattern_name'].value_counts()
+        counts = counts.add(names, fill_value=0)
+    ranking = counts.reset_index()
+    ranking.columns = ['pattern_name', 'count']
+    top = ranking.sort_values(['count', 'pattern_name'], ascending=[False, True]).head(top_n)['pattern_name']
+    patterns = [p for p in ALL_PATTERNS if p.lower() in set(top)]
+
+    with open(settings.CANDLE_PATTERN_SUBSET_PATH, 'w') as f:
+        json.dump(patterns, f, indent=2)
+    print(f"  -> Subconjunto de {len(patterns)} patrones guardado en {settings.CANDLE_PATTERN_SUBSET_PATH}")
+    return patterns
+
+def get_pattern_subset(engine) -> list:
+    return load_pattern_subset() or calibrate_pattern_subset(engine)
+
+# --- COMPATIBILIDAD (todas las funciones, formato ancho) ---
 
 def recognize_candle_patterns(df: pd.DataFrame) -> pd.DataFrame:
-    # (Esta función auxiliar no cambia)
+    """Añade una columna por patrón de TA-Lib con alguna señal en este ticker."""
     df_out = df.copy()
-    pattern_functions = talib.get_function_groups()['Pattern Recognition']
-    for pattern in pattern_functions:
-        try:
-            result = getattr(talib, pattern)(df_out['open'], df_out['high'], df_out['low'], df_out['close'])
-            if result.abs().sum() > 0:
-                df_out[pattern.lower()] = result
-        except Exception:
-            continue
+    matrix = pattern_matrix(df, ALL_PATTERNS)
+    for j in np.flatnonzero((matrix != 0).any(axis=0)):
+        df_out[ALL_PATTERNS[j].lower()] = matrix[:, j].astype(np.int32) * PATTERN_UNIT
     return df_out
 
-def generate_pattern_feature():
+def score_patterns(patterns_df: pd.DataFrame) -> pd.DataFrame:
+    """Añade 'pattern_score' (suma de señales) y 'pattern_name' (primer patrón activo)."""
+    pattern_cols = [col for col in patterns_df.columns if col.startswith('cdl')]
+    values = patterns_df[pattern_cols].fillna(0).to_numpy()
+    patterns_df['pattern_score'] = values.sum(axis=1)
+    active = values != 0
+    names = np.array(pattern_cols + ["No Pattern"], dtype=object)
+    patterns_df['pattern_name'] = names[np.where(active.any(axis=1), active.argmax(axis=1), len(pattern_cols))]
+    return patterns_df
+
+# --- GENERACIÓN ---
+
+def _generate_pattern_feature_streaming(engine, table_name, patterns):
+    """
+    Modo streaming: patrones ticker a ticker desde un cursor de servidor, escritos
+    con COPY. Solo se evalúa el subconjunto configurado, así que no hace falta
+    filtrar después por frecuencia.
+    """
+    sql_query = "SELECT ticker, timestamp, open, high, low, close FROM asset_metrics ORDER BY ticker, timestamp"
+
+    with engine.connect() as connection:
+        with connection.begin() as transaction:
+            connection.execute(text(f"TRUNCATE TABLE {table_name};"))
+            writer = BulkCopyWriter(connection, table_name, OUTPUT_COLUMNS)
+            for ticker, ticker_df in iter_ticker_frames(engine, sql_query):
+                writer.write(compute_pattern_features(ticker_df, patterns))
+            print(f"  -> {writer.rows_written} registros de patrones relevantes guardados en '{table_name}'.")
+
+def generate_pattern_feature(streaming: bool = True):
     table_name = 'candle_patterns'
     print(f"\n[FEATURE ENG]: Iniciando la generación de '{table_name}'...")
     engine = create_db_engine()
     if not engine: return
 
+    try:
+        patterns = get_pattern_subset(engine)
+        print(f"  -> Evaluando {len(patterns)} patrones configurados.")
+    except Exception as e:
+        print(f"[ERROR EN TAREA]: No se pudo cargar el subconjunto de patrones. Error: {e}")
+        return
+
+    if streaming:
+        try:
+            _generate_pattern_feature_streaming(engine, table_name, patterns)
+            print(f"[TAREA COMPLETADA]: Generación de '{table_name}' finalizada.")
+        except Exception as e:
+            print(f"[ERROR EN TAREA]: Falló la generación de patrones de velas. Error: {e}")
+        return
+
     try:
         sql_query = "SELECT * FROM asset_metrics ORDER BY ticker, timestamp"
         df = pd.read_sql(sql_query, engine)
@@ -36,29 +168,13 @@ def generate_pattern_feature():
             print("  -> La tabla 'asset_metrics' está vacía.")
             return
 
-        patterns_df = df.groupby('ticker', group_keys=False).apply(recognize_candle_patterns)
-        pattern_cols = [col for col in patterns_df.columns if col.startswith('cdl')]
-        
-        patterns_df['pattern_score'] = patterns_df[pattern_cols].sum(axis=1)
-        
-        def get_pattern_name(row):
-            for col in pattern_cols:
-                if row[col] != 0: return col
-            return "No Pattern"
-            
-        patterns_df['pattern_name'] = patterns_df.apply(get_pattern_name, axis=1)
-
-        # --- INICIO DEL BLOQUE DE FILTRADO ---
-        print("  -> Filtrando para quedarnos con los 20 patrones más frecuentes...")
-        patterns_with_score = patterns_df[patterns_df['pattern_score'] != 0].copy()
-        pattern_counts = patterns_with_score['pattern_name'].value_counts()
-        top_20_patterns = pattern_counts.nlargest(20).index
-        final_df = patterns_with_score[patterns_with_score['pattern_name'].isin(top_20_patterns)]
-        final_df = final_df[['ticker', 'timestamp', 'pattern_score', 'pattern_name']]
-        # --- FIN DEL BLOQUE DE FILTRADO ---
-        
+        final_df = pd.concat(
+            [compute_pattern_features(ticker_df, patterns) for _, ticker_df in df.groupby('ticker', sort=False)],
+            ignore_index=True
+        )
+
         if final_df.empty:
-            print("  -> No se encontraron patrones significativos tras el filtrado.")
+            print("  -> No se encontraron patrones significativos.")
             return
 
         with engine.connect() as connection:
@@ -72,5 +188,65 @@ def generate_pattern_feature():
     except Exception as e:
         print(f"[ERROR EN TAREA]: Falló la generación de patrones de velas. Error: {e}")
 
+# --- BENCHMARK ---
+
+def _reference_per_ticker(df: pd.DataFrame) -> pd.DataFrame:
+    """Versión anterior: los 61 patrones en columnas del DataFrame + nombre con apply por fila."""
+    df_out = df.copy()
+    for pattern in ALL_PATTERNS:
+        result = getattr(talib, pattern)(df_out['open'], df_out['high'], df_out['low'], df_out['close'])
+        if result.abs().sum() > 0:
+            df_out[pattern.lower()] = result
+    pattern_cols = [col for col in df_out.columns if col.startswith('cdl')]
+    df_out['pattern_score'] = df_out[pattern_cols].sum(axis=1)
+
+    def get_pattern_name(row):
+        for col in pattern_cols:
+            if row[col] != 0: return col
+        return "No Pattern"
+
+    df_out['pattern_name'] = df_out.apply(get_pattern_name, axis=1)
+    return df_out
+
+def run_benchmark(n_bars: int = 3000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_bars)))
+    df = pd.DataFrame({
+        'ticker': 'T', 'timestamp': pd.date_range('2020-01-01', periods=n_bars, freq='D', tz='UTC'),
+        'open': open_, 'high': high, 'low': low, 'close': close,
+    })
+    subset = load_pattern_subset() or [p for p in ALL_PATTERNS][:TOP_N_PATTERNS]
+
+    def measure(fn):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    reference, t_ref, m_ref = measure(lambda: _reference_per_ticker(df))
+    full, t_full, m_full = measure(lambda: compute_pattern_features(df, ALL_PATTERNS))
+    _, t_sub, m_sub = measure(lambda: compute_pattern_features(df, subset))
+
+    reference = reference[reference['pattern_score'] != 0]
+    same = (reference['pattern_score'].to_numpy() == full['pattern_score'].to_numpy()).all() and \
+           (reference['pattern_name'].to_numpy() == full['pattern_name'].to_numpy()).all()
+    print(f"📊 1 ticker x {n_bars} barras")
+    print(f"   anterior (61 patrones + apply): {t_ref * 1000:8.1f} ms | pico {m_ref / 1e6:6.2f} MB")
+    print(f"   vectorizado (61 patrones):      {t_full * 1000:8.1f} ms | pico {m_full / 1e6:6.2f} MB | idéntico: {same}")
+    print(f"   vectorizado ({len(subset)} patrones):      {t_sub * 1000:8.1f} ms | pico {m_sub / 1e6:6.2f} MB")
+
 if __name__ == "__main__":
-    generate_pattern_feature()
\ No newline at end of file
+    if '--benchmark' in sys.argv:
+        run_benchmark()
+    elif '--calibrate' in sys.argv:
+        engine = create_db_engine()
+        if engine:
+            calibrate_pattern_subset(engine)
+    else:
+        generate_pattern_feature(streaming='--no-streaming' not in sys.argv)
@@ -0,0 +1,360 @@
+# src/feature_engineering/compiled_kernels.py
+
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+
+# Numba es opcional: sin él (o con NUMBA_KERNELS desactivado) se usan las
+# versiones NumPy, que dan exactamente el mismo resultado en los kernels de 02
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Sin fastmath: la versión compilada hace las mismas operaciones IEEE, en el
+# mismo orden, que la de NumPy (sin FMA ni reordenaciones)
+jit = njit(cache=True, nogil=True) if NUMBA_AVAILABLE else (lambda func: func)
+
+# Columnas por bloque en las ventanas móviles de NumPy (acota la vista de ventanas en memoria)
+NUMPY_BLOCK_COLUMNS = 64
+
+def use_compiled() -> bool:
+    return NUMBA_AVAILABLE and settings.NUMBA_KERNELS
+
+# --- EWM (adjust=False de pandas) ---
+
+def ewm_step(weighted, old_wt, cur, present, alpha):
+    """
+    Un paso de la media exponencial adjust=False para todas las columnas a la vez.
+    Misma recursión que pandas (incluido el tratamiento de NaN); las celdas no
+    presentes (el ticker no tiene barra esa fecha) no tocan el estado.
+    """
+    has_weighted = present & (weighted == weighted)
+    observed = cur == cur
+    old_wt = np.where(has_weighted, old_wt * (1.0 - alpha), old_wt)
+    update = has_weighted & observed & (weighted != cur)
+    weighted_new = np.where(update, (old_wt * weighted + alpha * cur) / (old_wt + alpha), weighted)
+    old_wt = np.where(has_weighted & observed, 1.0, old_wt)
+    start = present & ~(weighted == weighted) & observed
+    weighted_new = np.where(start, cur, weighted_new)
+    old_wt = np.where(start, 1.0, old_wt)
+    return weighted_new, old_wt
+
+@jit
+def _ewm_scalar(weighted, old_wt, cur, alpha):
+    """ewm_step para una celda presente."""
+    if weighted == weighted:
+        old_wt = old_wt * (1.0 - alpha)
+        if cur == cur:
+            if weighted != cur:
+                weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            old_wt = 1.0
+    elif cur == cur:
+        weighted = cur
+        old_wt = 1.0
+    return weighted, old_wt
+
+@jit
+def _macd_chain_compiled(close, present, state, a_fast, a_slow, a_signal):
+    n_dates, n_cols = close.shape
+    out = np.empty((3, n_dates, n_cols))
+    for i in range(n_dates):
+        for k in range(n_cols):
+            if present[i, k]:
+                state[0, k], state[1, k] = _ewm_scalar(state[0, k], state[1, k], close[i, k], a_fast)
+                state[2, k], state[3, k] = _ewm_scalar(state[2, k], state[3, k], close[i, k], a_slow)
+                state[4, k], state[5, k] = _ewm_scalar(state[4, k], state[5, k], state[0, k] - state[2, k], a_signal)
+            out[0, i, k] = state[0, k]
+            out[1, i, k] = state[2, k]
+            out[2, i, k] = state[4, k]
+    return out
+
+def _macd_chain_numpy(close, present, state, a_fast, a_slow, a_signal):
+    n_dates, n_cols = close.shape
+    out = np.full((3, n_dates, n_cols), np.nan)
+    alphas = [a_fast, a_slow, a_signal]
+    full_rows = present.all(axis=1) & (close == close).all(axis=1)
+    # normalized: todas las medias son válidas y con peso 1 -> la recursión se reduce a
+    # (f*w + a*x)/(f + a), exactamente la misma operación que el camino general.
+    normalized = False
+    for i in range(n_dates):
+        cur, mask = close[i], present[i]
+        for j, alpha in enumerate(alphas):
+            x = state[0] - state[2] if j == 2 else cur
+            if normalized and full_rows[i]:
+                factor = 1.0 - alpha
+                w = state[2 * j]
+                state[2 * j] = np.where(w != x, (factor * w + alpha * x) / (factor + alpha), w)
+            else:
+                state[2 * j], state[2 * j + 1] = ewm_step(state[2 * j], state[2 * j + 1], x, mask, alpha)
+        if not (normalized and full_rows[i]):
+            normalized = bool(full_rows[i]) and not np.isnan(state[0::2]).any()
+        out[:, i] = state[0::2]
+    return out
+
+def macd_ewm_chain(close: np.ndarray, present: np.ndarray, state: np.ndarray, alphas: tuple) -> np.ndarray:
+    """
+    EMA rápida, EMA lenta y señal (EMA de rápida - lenta) en una sola pasada por
+    fechas sobre una matriz (fechas x columnas). `state` es (6, columnas):
+    [rápida, peso, lenta, peso, señal, peso] y se actualiza en sitio.
+    Devuelve (3, fechas, columnas) con las tres medias tras cada fecha.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if use_compiled():
+        return _macd_chain_compiled(close, np.ascontiguousarray(present), state, *alphas)
+    return _macd_chain_numpy(close, present, state, *alphas)
+
+def ewm(values: np.ndarray, span: float) -> np.ndarray:
+    """`DataFrame(values).ewm(span=span, adjust=False).mean()` por columnas."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    state = np.vstack([np.full(values.shape[1], np.nan), np.ones(values.shape[1])])
+    if use_compiled():
+        return _ewm_compiled(values, state, alpha)
+    out = np.empty_like(values)
+    present = np.ones(values.shape[1], dtype=bool)
+    for i in range(values.shape[0]):
+        state[0], state[1] = ewm_step(state[0], state[1], values[i], present, alpha)
+        out[i] = state[0]
+    return out
+
+@jit
+def _ewm_compiled(values, state, alpha):
+    out = np.empty_like(values)
+    for i in range(values.shape[0]):
+        for k in range(values.shape[1]):
+            state[0, k], state[1, k] = _ewm_scalar(state[0, k], state[1, k], values[i, k], alpha)
+            out[i, k] = state[0, k]
+    return out
+
+# --- DESVIACIÓN MÓVIL SOBRE CELDAS PRESENTES (volatilidad de 02) ---
+
+@jit
+def _present_std_compiled(values, present, tail, window):
+    n_dates, n_cols = values.shape
+    out = np.empty((n_dates, n_cols))
+    for k in range(n_cols):
+        for i in range(n_dates):
+            x = values[i, k]
+            total = tail[k, 0]
+            for j in range(1, window - 1):
+                total = total + tail[k, j]
+            total = total + x
+            mean = total / window
+            d = tail[k, 0] - mean
+            squares = d * d
+            for j in range(1, window - 1):
+                d = tail[k, j] - mean
+                squares = squares + d * d
+            d = x - mean
+            squares = squares + d * d
+            out[i, k] = np.sqrt(squares / (window - 1))
+            if present[i, k]:
+                for j in range(window - 2):
+                    tail[k, j] = tail[k, j + 1]
+                tail[k, window - 2] = x
+    return out
+
+def previous_present_index(present: np.ndarray) -> np.ndarray:
+    """Para cada celda, la fila de la última celda presente ANTERIOR de su columna (-1 si no hay)."""
+    rows = np.where(present, np.arange(present.shape[0])[:, None], -1)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return np.vstack([np.full((1, present.shape[1]), -1), rows[:-1]])
+
+def _present_std_numpy(values, present, tail, window):
+    n_dates, n_cols = values.shape
+    # Las `window` últimas celdas presentes, encadenando "la anterior presente"
+    values_ext = np.vstack([tail.T, values])
+    present_ext = np.vstack([np.ones((window - 1, n_cols), dtype=bool), present])
+    previous_ext = previous_present_index(present_ext)
+    chain = [np.broadcast_to(np.arange(window - 1, window - 1 + n_dates)[:, None], (n_dates, n_cols))]
+    for _ in range(window - 1):
+        chain.append(np.take_along_axis(previous_ext, chain[-1], axis=0))
+    window_values = [np.take_along_axis(values_ext, idx, axis=0) for idx in reversed(chain)]  # de la más antigua a la actual
+    total = window_values[0].copy()
+    for v in window_values[1:]:
+        total = total + v
+    mean = total / window
+    squares = (window_values[0] - mean) ** 2
+    for v in window_values[1:]:
+        squares = squares + (v - mean) ** 2
+    out = np.sqrt(squares / (window - 1))
+
+    end = np.where(present_ext[-1], window - 2 + n_dates, previous_ext[-1])[None, :]
+    tail_idx = [end]
+    for _ in range(window - 2):
+        tail_idx.append(np.take_along_axis(previous_ext, tail_idx[-1], axis=0))
+    tail[:] = np.vstack([np.take_along_axis(values_ext, idx, axis=0) for idx in reversed(tail_idx)]).T
+    return out
+
+def present_rolling_std(values: np.ndarray, present: np.ndarray, tail: np.ndarray, window: int) -> np.ndarray:
+    """
+    Desviación típica muestral de cada celda junto con las `window - 1` celdas
+    presentes anteriores de su columna, en dos pasadas por ventana. `tail`
+    (columnas x window-1, de la más antigua a la más reciente) continúa desde
+    ejecuciones anteriores y se actualiza en sitio.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        if use_compiled():
+            return _present_std_compiled(values, np.ascontiguousarray(present), tail, window)
+        return _present_std_numpy(values, present, tail, window)
+
+# --- VENTANAS MÓVILES GENÉRICAS (semántica de pandas .rolling) ---
+
+@jit
+def _rolling_mean_std_compiled(values, window, min_periods):
+    n_dates, n_cols = values.shape
+    mean = np.full((n_dates, n_cols), np.nan)
+    std = np.full((n_dates, n_cols), np.nan)
+    for k in range(n_cols):
+        for i in range(n_dates):
+            start = max(0, i - window + 1)
+            count = 0
+            total = 0.0
+            for j in range(start, i + 1):
+                x = values[j, k]
+                if x == x:
+                    total += x
+                    count += 1
+            if count < min_periods or count == 0:
+                continue
+            m = total / count
+            mean[i, k] = m
+            if count > 1:
+                squares = 0.0
+                for j in range(start, i + 1):
+                    x = values[j, k]
+                    if x == x:
+                        squares += (x - m) * (x - m)
+                std[i, k] = np.sqrt(squares / (count - 1))
+    return mean, std
+
+def _rolling_mean_std_numpy(values, window, min_periods):
+    n_dates, n_cols = values.shape
+    mean = np.full((n_dates, n_cols), np.nan)
+    std = np.full((n_dates, n_cols), np.nan)
+    padded = np.vstack([np.full((window - 1, n_cols), np.nan), values])
+    for start in range(0, n_cols, NUMPY_BLOCK_COLUMNS):
+        block = slice(start, start + NUMPY_BLOCK_COLUMNS)
+        windows = sliding_window_view(padded[:, block], window, axis=0)  # (fechas, columnas, window)
+        valid = windows == windows
+        count = valid.sum(axis=-1)
+        m = np.where(valid, windows, 0.0).sum(axis=-1) / np.maximum(count, 1)
+        deviation = np.where(valid, windows - m[..., None], 0.0)
+        s = np.sqrt((deviation * deviation).sum(axis=-1) / np.maximum(count - 1, 1))
+        enough = (count >= min_periods) & (count > 0)
+        mean[:, block] = np.where(enough, m, np.nan)
+        std[:, block] = np.where(enough & (count > 1), s, np.nan)
+    return mean, std
+
+def rolling_mean_std(values: np.ndarray, window: int, min_periods: int = None):
+    """
+    Media y desviación típica muestral móviles por columnas en una sola llamada,
+    como `rolling(window, min_periods).mean()` / `.std()` de pandas (NaN ignorados).
+    Cada ventana se calcula en dos pasadas (sin la deriva de las sumas móviles).
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    if use_compiled():
+        return _rolling_mean_std_compiled(values, window, min_periods)
+    return _rolling_mean_std_numpy(values, window, min_periods)
+
+def rolling_zscore(values: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """(x - media móvil) / desviación móvil por columnas."""
+    mean, std = rolling_mean_std(values, window, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (np.asarray(values, dtype=np.float64) - mean) / std
+
+# --- BENCHMARK ---
+
+def _timed(func, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def _max_diff(a, b) -> float:
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    return float(np.nanmax(np.abs(a - b))) if np.isfinite(a).any() else 0.0
+
+def run_benchmark(n_dates: int = 1500, n_cols: int = 300, seed: int = 0):
+    """pandas frente a NumPy y Numba en los bucles calientes de 02, y el kernel completo de 02."""
+    from src.feature_engineering.feature_kernel import compute_long_features, _synthetic_long
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (n_dates, n_cols)), axis=0))
+    close[rng.random(close.shape) < 0.01] = np.nan
+    returns = np.log(close[1:] / close[:-1])
+    frame, returns_frame = pd.DataFrame(close), pd.DataFrame(returns)
+    present = np.ones(close.shape, dtype=bool)
+    alphas = tuple(1.0 / (1.0 + (span - 1) / 2.0) for span in (12, 26, 9))
+
+    def macd_state():
+        return np.vstack([np.full(n_cols, np.nan), np.ones(n_cols)] * 3)
+
+    def std_tail():
+        return np.full((n_cols, 6), np.nan)
+
+    def pandas_macd():
+        fast = frame.ewm(span=12, adjust=False).mean()
+        slow = frame.ewm(span=26, adjust=False).mean()
+        return fast, slow, (fast - slow).ewm(span=9, adjust=False).mean()
+
+    cases = [
+        ('EWM x3 (MACD)', pandas_macd, lambda: macd_ewm_chain(close, present, macd_state(), alphas), lambda r: r[2]),
+        ('std móvil 7', lambda: returns_frame.rolling(7).std(), lambda: present_rolling_std(returns, present[1:], std_tail(), 7), None),
+        ('z-score móvil 30', lambda: (returns_frame - returns_frame.rolling(30, min_periods=5).mean()) / returns_frame.rolling(30, min_periods=5).std(),
+         lambda: rolling_zscore(returns, 30, 5), None),
+    ]
+    print(f"📊 Matriz {n_dates} fechas x {n_cols} columnas | Numba: {'sí' if NUMBA_AVAILABLE else 'no instalado'}")
+    print(f"{'kernel':>18} | {'pandas (s)':>10} | {'NumPy (s)':>10} | {'Numba (s)':>10} | {'vs pandas':>9} | {'Numba = NumPy':>13}")
+    original = settings.NUMBA_KERNELS
+    try:
+        for name, reference, ours, pick in cases:
+            t_pandas, expected = _timed(reference)
+            settings.NUMBA_KERNELS = False
+            t_numpy, numpy_result = _timed(ours)
+            t_numba, numba_result, same = None, None, None
+            if NUMBA_AVAILABLE:
+                settings.NUMBA_KERNELS = True
+                ours()  # compilación (o carga de la caché de Numba)
+                t_numba, numba_result = _timed(ours)
+                same = np.array_equal(numpy_result, numba_result, equal_nan=True) if pick is None else \
+                    np.array_equal(pick(numpy_result), pick(numba_result), equal_nan=True)
+            expected = expected[2] if pick else expected
+            diff = _max_diff(pick(numpy_result) if pick else numpy_result, expected)
+            numba_col = f"{t_numba:>10.3f}" if t_numba is not None else f"{'-':>10}"
+            print(f"{name:>18} | {t_pandas:>10.3f} | {t_numpy:>10.3f} | {numba_col} | {diff:>9.1e} | {str(same):>13}")
+
+        df = _synthetic_long(n_cols, n_dates)
+        settings.NUMBA_KERNELS = False
+        t_numpy, (numpy_features, _) = _timed(lambda: compute_long_features(df), repeat=1)
+        line = f"   kernel de 02 completo ({len(df):,} filas): NumPy {t_numpy:.3f} s"
+        if NUMBA_AVAILABLE:
+            settings.NUMBA_KERNELS = True
+            t_numba, (numba_features, _) = _timed(lambda: compute_long_features(df), repeat=1)
+            same = numpy_features.equals(numba_features)
+            line += f" | Numba {t_numba:.3f} s ({t_numpy / t_numba:.1f}x) | idéntico: {same}"
+        print(line)
+    finally:
+        settings.NUMBA_KERNELS = original
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark()
@@ -0,0 +1,163 @@
+# src/feature_engineering/cross_sectional.py
+
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.feature_engineering.feature_kernel import to_wide
+
+# Features por ticker que se comparan contra el resto del universo el mismo día
+MOMENTUM_WINDOW = 30
+CROSS_SECTIONAL_BASES = ['log_return', 'volatility_7d', 'funding_rate', f'momentum_{MOMENTUM_WINDOW}d']
+CROSS_SECTIONAL_STATS = ['rank', 'pct', 'zscore']
+CROSS_SECTIONAL_COLUMNS = [f"cs_{stat}_{base}" for base in CROSS_SECTIONAL_BASES for stat in CROSS_SECTIONAL_STATS]
+
+# --- ESTADÍSTICOS POR FILA ---
+
+def row_ranks(matrix: np.ndarray) -> np.ndarray:
+    """
+    Rango de cada celda dentro de su fila (1 = menor, empates promediados, NaN
+    fuera), como `DataFrame.rank(axis=1)`: un solo argsort de toda la matriz.
+    """
+    n_rows, n_cols = matrix.shape
+    missing = np.isnan(matrix)
+    order = np.argsort(matrix, axis=1, kind='stable')  # los NaN quedan al final
+    ordered = np.take_along_axis(matrix, order, axis=1)
+    position = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+
+    # Tramos de valores iguales: cada celda toma la media de su primera y última posición
+    starts = np.ones((n_rows, n_cols), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends = np.ones((n_rows, n_cols), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    first = np.maximum.accumulate(np.where(starts, position, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, position, n_cols - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty((n_rows, n_cols))
+    np.put_along_axis(ranks, order, (first + last) / 2.0 + 1.0, axis=1)
+    ranks[missing] = np.nan
+    return ranks
+
+def cross_sectional_stats(matrix: np.ndarray, min_assets: int = None) -> dict:
+    """
+    Rango, percentil (rango / activos con dato, como `rank(pct=True)`) y z-score
+    (desviación muestral) de cada celda frente a su fila. Las filas con menos de
+    `min_assets` activos con dato quedan a NaN.
+    """
+    min_assets = min_assets or settings.CROSS_SECTION_MIN_ASSETS
+    valid = ~np.isnan(matrix)
+    count = valid.sum(axis=1, keepdims=True).astype(float)
+    values = np.where(valid, matrix, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = values.sum(axis=1, keepdims=True) / count
+        deviation = np.where(valid, matrix - mean, 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=1, keepdims=True) / (count - 1))
+        ranks = row_ranks(matrix)
+        stats = {
+            'rank': ranks,
+            'pct': ranks / count,
+            'zscore': np.where(valid, deviation / std, np.nan),
+        }
+    too_few = (count < min_assets)[:, 0]
+    for matrix_stat in stats.values():
+        matrix_stat[too_few] = np.nan
+    return stats
+
+# --- ETAPA DEL GRAFO ---
+
+def compute_cross_sectional(frame: pd.DataFrame, universe: list = None, min_assets: int = None) -> pd.DataFrame:
+    """
+    Añade a `frame` (largo: ticker, timestamp, close, log_return, volatility_7d,
+    funding_rate) el momentum y las columnas de CROSS_SECTIONAL_COLUMNS. Todo se
+    calcula sobre la matriz (fechas x tickers) del universo de una vez; los tickers
+    fuera del universo quedan a NaN.
+    """
+    universe = set(universe or settings.UNIVERSE_TICKERS)
+    positions = np.flatnonzero(frame['ticker'].isin(universe).to_numpy())
+    members = frame.iloc[positions]
+    close, _, (rows, cols), _ = to_wide(members['ticker'].to_numpy(), members['timestamp'].values, members['close'].to_numpy(float))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Momentum: log del cierre frente al de MOMENTUM_WINDOW días antes (NaN si falta alguno)
+        momentum = np.full(close.shape, np.nan)
+        momentum[MOMENTUM_WINDOW:] = np.log(close[MOMENTUM_WINDOW:] / close[:-MOMENTUM_WINDOW])
+
+    def to_long(matrix):
+        column = np.full(len(frame), np.nan)
+        column[positions] = matrix[rows, cols]
+        return column
+
+    momentum_col = CROSS_SECTIONAL_BASES[-1]
+    columns = {momentum_col: to_long(momentum)}
+    for base in CROSS_SECTIONAL_BASES:
+        if base == momentum_col:
+            matrix = momentum
+        else:
+            matrix = np.full(close.shape, np.nan)
+            matrix[rows, cols] = members[base].to_numpy(float)
+        for stat, values in cross_sectional_stats(matrix, min_assets).items():
+            columns[f"cs_{stat}_{base}"] = to_long(values)
+    return frame.assign(**columns)
+
+# --- BENCHMARK ---
+
+def _reference_pandas(frame: pd.DataFrame, min_assets: int) -> pd.DataFrame:
+    """Mismos estadísticos con groupby por fecha (implementación directa, para paridad)."""
+    out = frame[['ticker', 'timestamp']].copy()
+    by_day = frame.groupby('timestamp')
+    for base in CROSS_SECTIONAL_BASES:
+        grouped = by_day[base]
+        n = grouped.transform('count')
+        out[f"cs_rank_{base}"] = grouped.rank(method='average')
+        out[f"cs_pct_{base}"] = grouped.rank(method='average', pct=True)
+        out[f"cs_zscore_{base}"] = (frame[base] - grouped.transform('mean')) / grouped.transform('std')
+        for stat in CROSS_SECTIONAL_STATS:
+            out.loc[n < min_assets, f"cs_{stat}_{base}"] = np.nan
+    return out
+
+def run_benchmark(n_tickers: int = 500, n_days: int = 1500, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:04d}-USD" for i in range(n_tickers)]
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D', tz='UTC')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (n_days, n_tickers)), axis=0))
+    frame = pd.DataFrame({
+        'ticker': np.repeat(tickers, n_days),
+        'timestamp': np.tile(dates, n_tickers),
+        'close': close.T.ravel(),
+        'log_return': rng.normal(0, 0.03, n_days * n_tickers),
+        'volatility_7d': rng.random(n_days * n_tickers),
+        # funding con muchos empates (0 cuando no hay dato), como en producción
+        'funding_rate': np.round(rng.normal(0, 1e-4, n_days * n_tickers), 6) * (rng.random(n_days * n_tickers) < 0.7),
+    })
+    frame = frame.sample(frac=0.97, random_state=seed).sort_values(['ticker', 'timestamp']).reset_index(drop=True)
+    print(f"📊 {n_tickers} activos x {n_days} días ({len(frame):,} filas)")
+
+    start = time.perf_counter()
+    ours = compute_cross_sectional(frame, universe=tickers, min_assets=5)
+    t_ours = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = _reference_pandas(ours, min_assets=5)
+    t_reference = time.perf_counter() - start
+
+    worst = 0.0
+    for column in CROSS_SECTIONAL_COLUMNS:
+        a, b = ours[column].to_numpy(float), reference[column].to_numpy(float)
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            print(f"   ❌ {column}: NaN distintos")
+            worst = np.inf
+        worst = max(worst, np.nanmax(np.abs(a - b), initial=0.0))
+    print(f"   matriz (una pasada) {t_ours:.2f} s | groupby por fecha {t_reference:.2f} s ({t_reference / t_ours:.1f}x)")
+    print(f"   {'✅' if worst < 1e-9 else '❌'} máx |dif| frente a pandas: {worst:.2e}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark()
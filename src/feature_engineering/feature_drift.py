@@ -0,0 +1,285 @@
+# src/feature_engineering/feature_drift.py
+
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+import json
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.utils.compact_schema import expand_frame
+
+# Suavizado de proporciones vacías en el PSI (evita log(0))
+PSI_EPSILON = 1e-4
+
+# --- REFERENCIA (DATOS DE ENTRENAMIENTO) ---
+
+def build_reference(df: pd.DataFrame, features: list, bins: int = None) -> dict:
+    """
+    Por feature: bordes interiores en los cuantiles de los datos de entrenamiento
+    (bins de igual masa), proporción de cada bin (más los dos abiertos), tasa de
+    nulos y de ceros, media y desviación. Es el único momento en que se recorre
+    la historia; luego todo se compara contra este resumen.
+    """
+    bins = bins or settings.DRIFT_BINS
+    reference = {}
+    for feature in features:
+        values = df[feature].to_numpy(float)
+        finite = values[np.isfinite(values)]
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1)[1:-1])) if len(finite) else np.array([])
+        counts = np.bincount(np.searchsorted(edges, finite, side='right'), minlength=len(edges) + 1)
+        reference[feature] = {
+            'edges': edges.tolist(),
+            'proportions': (counts / max(len(finite), 1)).tolist(),
+            'rows': int(len(values)),
+            'null_rate': float(1 - len(finite) / max(len(values), 1)),
+            'zero_rate': float(np.mean(finite == 0)) if len(finite) else 0.0,
+            'mean': float(finite.mean()) if len(finite) else None,
+            'std': float(finite.std()) if len(finite) else None,
+        }
+    return reference
+
+# --- ESTADÍSTICOS SOBRE HISTOGRAMAS ---
+
+def histogram_sketch(values: np.ndarray, edges: np.ndarray) -> dict:
+    """Resumen O(bins) de un lote: conteos por bin, nulos, ceros, suma y suma de cuadrados."""
+    finite = values[np.isfinite(values)]
+    return {
+        'counts': np.bincount(np.searchsorted(edges, finite, side='right'), minlength=len(edges) + 1).tolist(),
+        'rows': int(len(values)),
+        'nulls': int(len(values) - len(finite)),
+        'zeros': int(np.count_nonzero(finite == 0)),
+        'sum': float(finite.sum()),
+        'sum_sq': float((finite * finite).sum()),
+    }
+
+def merge_sketches(sketches: list) -> dict:
+    merged = {'counts': np.sum([s['counts'] for s in sketches], axis=0).tolist()}
+    for key in ('rows', 'nulls', 'zeros', 'sum', 'sum_sq'):
+        merged[key] = sum(s[key] for s in sketches)
+    return merged
+
+def sketch_quantile(counts: np.ndarray, edges: np.ndarray, q: float) -> float:
+    """Cuantil aproximado a partir del histograma (interpolación lineal dentro del bin)."""
+    total = counts.sum()
+    if total == 0 or len(edges) == 0:
+        return None
+    cumulative = np.cumsum(counts) / total
+    k = int(np.searchsorted(cumulative, q))
+    if k == 0 or k == len(edges):
+        # Bins abiertos: el borde conocido más próximo
+        return float(edges[min(k, len(edges) - 1)])
+    below = cumulative[k - 1]
+    fraction = (q - below) / (cumulative[k] - below) if cumulative[k] > below else 0.0
+    return float(edges[k - 1] + fraction * (edges[k] - edges[k - 1]))
+
+def compare(sketch: dict, reference: dict) -> dict:
+    """PSI y KS (sobre los bins) de un resumen frente a la referencia, más la calidad de datos."""
+    counts = np.asarray(sketch['counts'], dtype=float)
+    observed = counts.sum()
+    expected = np.asarray(reference['proportions'])
+    if observed == 0:
+        return {'rows': sketch['rows'], 'psi': None, 'ks': None, 'null_rate': 1.0 if sketch['rows'] else None}
+    actual = counts / observed
+    p, r = np.maximum(actual, PSI_EPSILON), np.maximum(expected, PSI_EPSILON)
+    mean = sketch['sum'] / observed
+    return {
+        'rows': sketch['rows'],
+        'psi': float(np.sum((p - r) * np.log(p / r))),
+        # KS evaluado en los bordes de los bins: cota inferior del KS exacto
+        'ks': float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected)))),
+        'null_rate': sketch['nulls'] / sketch['rows'],
+        'zero_rate': sketch['zeros'] / observed,
+        'mean': mean,
+        'std': float(np.sqrt(max(sketch['sum_sq'] / observed - mean * mean, 0.0))),
+        'median': sketch_quantile(counts, np.asarray(reference['edges']), 0.5),
+    }
+
+def drift_status(result: dict, reference: dict) -> str:
+    psi = result.get('psi')
+    if psi is None:
+        # Filas pero todas nulas: es un problema de calidad, no falta de datos
+        if result.get('null_rate') is not None and result['null_rate'] > reference['null_rate'] + settings.DRIFT_ZERO_RATE_ALERT:
+            return 'alert'
+        return 'no_data'
+    zero_jump = (result.get('zero_rate') or 0) - reference['zero_rate'] > settings.DRIFT_ZERO_RATE_ALERT
+    if psi >= settings.DRIFT_PSI_ALERT or zero_jump or result['null_rate'] > reference['null_rate'] + settings.DRIFT_ZERO_RATE_ALERT:
+        return 'alert'
+    if psi >= settings.DRIFT_PSI_WARN:
+        return 'warn'
+    return 'ok'
+
+# --- MONITOR INCREMENTAL ---
+
+class FeatureDriftMonitor:
+    """
+    Deriva y calidad de las features del modelo frente a su referencia de
+    entrenamiento. El estado guarda la referencia, el resumen (histograma) de
+    cada uno de los últimos DRIFT_WINDOW_DAYS días y el historial de resultados;
+    cada ejecución solo resume los días nuevos (02 lee del almacén solo los
+    meses desde `pending_since`), sin releer features históricas. La referencia
+    se rehace cuando cambia el paquete del modelo.
+    """
+
+    def __init__(self, state_dir: str = None):
+        self.state_dir = state_dir or settings.DRIFT_STATE_DIR
+        self.state_path = os.path.join(self.state_dir, 'feature_drift.json')
+
+    def load(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def save(self, state: dict):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    @staticmethod
+    def _model_version(model_path: str) -> float:
+        return os.path.getmtime(model_path) if os.path.exists(model_path) else 0.0
+
+    def pending_since(self, features: list, model_path: str = None):
+        """
+        Desde qué día necesita filas `update`: None (historia completa) si hay que
+        rehacer la referencia, y si no el último día ya resumido.
+        """
+        model_path = model_path or settings.MODEL_PACKAGE_PATH
+        state = self.load()
+        if state.get('model_version') != self._model_version(model_path) or state.get('features') != list(features):
+            return None
+        return pd.Timestamp(state['last_day'])
+
+    def update(self, features_df: pd.DataFrame, features: list, model_path: str = None) -> dict:
+        """Incorpora los días de `features_df` posteriores al último visto. Devuelve el último informe."""
+        model_path = model_path or settings.MODEL_PACKAGE_PATH
+        state = self.load()
+        model_version = self._model_version(model_path)
+        if state.get('model_version') != model_version or state.get('features') != list(features):
+            # Referencia = lo que vio el entrenamiento: desde su inicio hasta la fecha del paquete
+            df = expand_frame(features_df)
+            until = pd.Timestamp(model_version, unit='s', tz='UTC') if model_version else df['timestamp'].max()
+            training = df[(df['timestamp'] >= pd.Timestamp(settings.DRIFT_REFERENCE_START, tz='UTC')) & (df['timestamp'] <= until)]
+            # Se monitoriza a partir del corte del entrenamiento: lo anterior es la propia referencia
+            state = {
+                'model_version': model_version, 'features': list(features),
+                'reference': build_reference(training, features) if not training.empty else None,
+                'reference_until': until.isoformat(), 'last_day': until.isoformat(), 'window': {}, 'history': {},
+            }
+            if training.empty:
+                logging.warning(f"⚠️ Deriva de features: no hay filas de entrenamiento hasta {until.date()}, sin referencia.")
+                self.save(state)
+                return self.latest(state)
+            logging.info(f"📐 Referencia de deriva: {len(training):,} filas de entrenamiento hasta {until.date()}.")
+            self.save(state)
+        if state['reference'] is None:
+            return self.latest(state)
+
+        new = expand_frame(features_df)
+        new = new[new['timestamp'] > pd.Timestamp(state['last_day'])]
+        if not new.empty:
+            window = OrderedDict(state['window'])
+            for day, rows in new.groupby(new['timestamp'].dt.normalize(), sort=True):
+                key = day.isoformat()
+                window[key] = {
+                    f: histogram_sketch(rows[f].to_numpy(float), np.asarray(state['reference'][f]['edges'])) for f in features
+                }
+                while len(window) > settings.DRIFT_WINDOW_DAYS:
+                    window.popitem(last=False)
+                state['history'][key] = self._report(window, state['reference'], features)
+            state['window'] = dict(window)
+            state['last_day'] = new['timestamp'].max().isoformat()
+            for key in sorted(state['history'])[:-settings.DRIFT_HISTORY_DAYS]:
+                del state['history'][key]
+            self.save(state)
+        return self.latest(state)
+
+    @staticmethod
+    def _report(window: dict, reference: dict, features: list) -> dict:
+        """Por feature: resultados del último día y de la ventana de días agregada."""
+        last_day = next(reversed(window))
+        report = {}
+        for f in features:
+            day = compare(window[last_day][f], reference[f])
+            rolling = compare(merge_sketches([sketches[f] for sketches in window.values()]), reference[f])
+            report[f] = {'day': day, 'window': rolling, 'status': drift_status(rolling, reference[f])}
+        return report
+
+    def latest(self, state: dict = None) -> dict:
+        """Informe del último día procesado (para el módulo de monitorización y el dashboard)."""
+        state = state if state is not None else self.load()
+        if state and state.get('reference') is None:
+            return {'status': 'no_reference', 'reference_until': state['reference_until']}
+        if not state.get('history'):
+            return {'status': 'no_data'}
+        day = max(state['history'])
+        report = state['history'][day]
+        statuses = [r['status'] for r in report.values()]
+        # Una feature sin datos en la ventana no se ha podido comprobar: el total no puede ser 'ok'
+        overall = 'alert' if 'alert' in statuses else 'warn' if 'warn' in statuses or 'no_data' in statuses else 'ok'
+        return {
+            'status': overall, 'day': day, 'window_days': len(state['window']),
+            'reference_until': state['reference_until'],
+            'alerts': sorted(f for f, r in report.items() if r['status'] == 'alert'),
+            'no_data': sorted(f for f, r in report.items() if r['status'] == 'no_data'),
+            'features': report,
+        }
+
+    def history(self, feature: str, metric: str = 'psi') -> pd.Series:
+        """Serie diaria de una métrica (de la ventana agregada) para una feature."""
+        state = self.load()
+        values = {day: report[feature]['window'].get(metric) for day, report in state.get('history', {}).items() if feature in report}
+        return pd.Series(values, dtype=float).sort_index()
+
+# --- DEMOSTRACIÓN ---
+
+def run_demo(n_tickers: int = 50, n_days: int = 400, seed: int = 0):
+    """Referencia sintética + 30 días en vivo en los que funding_rate pasa a rellenarse con ceros."""
+    import tempfile
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2022-01-01', periods=n_days, freq='D', tz='UTC')
+    df = pd.DataFrame({
+        'ticker': np.tile([f"T{i}" for i in range(n_tickers)], n_days),
+        'timestamp': np.repeat(dates, n_tickers),
+        'log_return': rng.normal(0, 0.03, n_days * n_tickers),
+        'funding_rate': rng.normal(1e-4, 1e-4, n_days * n_tickers),
+    })
+    features = ['log_return', 'funding_rate']
+    live_start = dates[-30]
+    drifted = (df['timestamp'] >= live_start) & (rng.random(len(df)) < 0.6)
+    df.loc[drifted, 'funding_rate'] = 0.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.joblib')
+        open(model_path, 'w').close()
+        os.utime(model_path, (live_start.timestamp() - 1, live_start.timestamp() - 1))
+        monitor = FeatureDriftMonitor(state_dir=tmp)
+        monitor.update(df[df['timestamp'] < live_start], features, model_path)
+        timings = []
+        for day in dates[-30:]:
+            start = time.perf_counter()
+            report = monitor.update(df[df['timestamp'] <= day], features, model_path)
+            timings.append(time.perf_counter() - start)
+        for f in features:
+            r = report['features'][f]
+            print(f"   {f:14s} PSI {r['window']['psi']:.3f}  KS {r['window']['ks']:.3f}  "
+                  f"ceros {r['window']['zero_rate']:.0%}  -> {r['status']}")
+        print(f"   {'✅' if report['alerts'] == ['funding_rate'] else '❌'} alertas: {report['alerts']} "
+              f"| {np.median(timings) * 1e3:.1f} ms/día, estado {os.path.getsize(monitor.state_path) / 1e3:.0f} KB")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--demo' in sys.argv:
+        run_demo()
+    else:
+        print(json.dumps(FeatureDriftMonitor().latest(), indent=2, default=str))
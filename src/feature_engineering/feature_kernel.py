@@ -0,0 +1,199 @@
+# src/feature_engineering/feature_kernel.py
+
+import pandas as pd
+import numpy as np
+import time
+import warnings
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.feature_engineering.compiled_kernels import macd_ewm_chain, present_rolling_std, previous_present_index
+
+TICKER_FEATURE_COLUMNS = [
+    'ema_26', 'macd', 'macd_signal', 'macd_hist', 'log_return',
+    'volatility_7d', 'price_to_ema_ratio', 'macd_norm'
+]
+
+EMA_FAST_SPAN = 12
+EMA_SLOW_SPAN = 26
+SIGNAL_SPAN = 9
+VOLATILITY_WINDOW = 7
+
+# Estado recursivo por ticker: escalares + cola de los últimos window-1 retornos
+STATE_SCALARS = ['last_close', 'ema_fast', 'ema_fast_wt', 'ema_slow', 'ema_slow_wt', 'signal', 'signal_wt']
+
+# Orden de las filas del estado de macd_ewm_chain
+EWM_STATE_KEYS = ['ema_fast', 'ema_fast_wt', 'ema_slow', 'ema_slow_wt', 'signal', 'signal_wt']
+
+def initial_state() -> dict:
+    return {
+        'last_close': np.nan,
+        'ema_fast': np.nan, 'ema_fast_wt': 1.0,
+        'ema_slow': np.nan, 'ema_slow_wt': 1.0,
+        'signal': np.nan, 'signal_wt': 1.0,
+        'return_tail': [np.nan] * (VOLATILITY_WINDOW - 1),
+        'bar_count': 0,
+        'last_raw_timestamp': None,
+    }
+
+def stack_states(states: list) -> dict:
+    """Lista de estados por ticker -> arrays (K,) y (K, window-1) para el kernel."""
+    stacked = {key: np.array([s[key] for s in states], dtype=float) for key in STATE_SCALARS}
+    stacked['return_tail'] = np.array([s['return_tail'] for s in states], dtype=float).reshape(len(states), VOLATILITY_WINDOW - 1)
+    return stacked
+
+def unstack_states(stacked: dict, states: list, bar_counts: np.ndarray) -> list:
+    """Arrays del kernel -> estados por ticker (serializables a JSON)."""
+    result = []
+    for k, state in enumerate(states):
+        new_state = dict(state)
+        for key in STATE_SCALARS:
+            new_state[key] = float(stacked[key][k])
+        new_state['return_tail'] = stacked['return_tail'][k].tolist()
+        new_state['bar_count'] = int(state['bar_count'] + bar_counts[k])
+        result.append(new_state)
+    return result
+
+# --- PIVOT / MELT ---
+
+def to_wide(tickers: np.ndarray, timestamps: np.ndarray, values: np.ndarray, ticker_order: list = None):
+    """
+    Pasa datos largos (una fila por ticker y fecha) a una matriz (fechas x tickers)
+    más la máscara de celdas presentes y los índices para volver a formato largo.
+    """
+    row_idx, dates = pd.factorize(timestamps, sort=True)
+    if ticker_order is None:
+        col_idx, ticker_order = pd.factorize(tickers, sort=True)
+    else:
+        col_idx = pd.Index(ticker_order).get_indexer(tickers)
+    matrix = np.full((len(dates), len(ticker_order)), np.nan)
+    present = np.zeros((len(dates), len(ticker_order)), dtype=bool)
+    matrix[row_idx, col_idx] = values
+    present[row_idx, col_idx] = True
+    return matrix, present, (row_idx, col_idx), list(ticker_order)
+
+# --- KERNEL ---
+
+def compute_wide_features(close: np.ndarray, present: np.ndarray, state: dict = None):
+    """
+    Calcula todas las características sobre una matriz de cierres (fechas x tickers),
+    vectorizada por columnas. `state` (arrays de `stack_states`) permite continuar
+    desde ejecuciones anteriores y solo avanza en las celdas presentes (un hueco
+    del ticker no cuenta como barra). Devuelve (dict columna -> matriz, estado).
+
+    Los retornos se calculan sobre toda la matriz de una vez; las EMAs y la
+    volatilidad van por compiled_kernels (Numba si está disponible, si no NumPy).
+    La volatilidad se calcula ventana a ventana (dos pasadas), por lo que cada
+    valor depende solo de sus 7 retornos: difiere de `rolling().std()` de pandas
+    como mucho en el último bit.
+    """
+    n_dates, n_tickers = close.shape
+    window = VOLATILITY_WINDOW
+    state = {k: np.array(v, copy=True) for k, v in (state or stack_states([initial_state()] * n_tickers)).items()}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # --- Retornos: cierre previo = última barra presente de la columna (o la del estado) ---
+        previous_row = previous_present_index(present)
+        closes_ext = np.vstack([state['last_close'][None, :], close])
+        log_return = np.log(close / np.take_along_axis(closes_ext, previous_row + 1, axis=0))
+        last_row = np.where(present[-1], n_dates - 1, previous_row[-1])
+        state['last_close'] = np.take_along_axis(closes_ext, (last_row + 1)[None, :], axis=0)[0]
+
+        # --- Volatilidad: las 7 últimas barras presentes (kernel compilado si hay Numba) ---
+        volatility = present_rolling_std(log_return, present, state['return_tail'], window)
+
+        # --- EMAs (recursivas): rápida, lenta y señal en una sola pasada por fechas ---
+        alphas = tuple(1.0 / (1.0 + (span - 1) / 2.0) for span in (EMA_FAST_SPAN, EMA_SLOW_SPAN, SIGNAL_SPAN))
+        ewm_state = np.vstack([state[key] for key in EWM_STATE_KEYS])
+        ema_fast, ema_slow, signal = macd_ewm_chain(close, present, ewm_state, alphas)
+        for key, row in zip(EWM_STATE_KEYS, ewm_state):
+            state[key] = row
+
+        macd = ema_fast - ema_slow
+        features = {
+            'ema_26': ema_slow,
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_hist': macd - signal,
+            'log_return': log_return,
+            'volatility_7d': volatility,
+            'price_to_ema_ratio': (close / ema_slow) - 1,
+            'macd_norm': macd / close,
+        }
+    return features, state
+
+def compute_long_features(df: pd.DataFrame, state: dict = None, ticker_order: list = None):
+    """
+    Atajo largo -> ancho -> largo: añade a `df` (ticker, timestamp, close, ...)
+    las columnas de TICKER_FEATURE_COLUMNS, en el mismo orden de filas.
+    Devuelve (DataFrame, estado).
+    """
+    close, present, (row_idx, col_idx), _ = to_wide(
+        df['ticker'].to_numpy(), df['timestamp'].values, df['close'].to_numpy(dtype=float), ticker_order
+    )
+    features, state = compute_wide_features(close, present, state)
+    out = df.copy()
+    for col in TICKER_FEATURE_COLUMNS:
+        out[col] = features[col][row_idx, col_idx]
+    return out, state
+
+# --- BENCHMARK ---
+
+def _reference_groupby_apply(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementación anterior de 02_prepare_features (groupby.apply por ticker)."""
+    def process_ticker_group(group):
+        group = group.sort_values(by='timestamp')
+        ema_slow = group['close'].ewm(span=26, adjust=False).mean()
+        ema_fast = group['close'].ewm(span=12, adjust=False).mean()
+        group['ema_26'] = ema_slow
+        group['macd'] = ema_fast - ema_slow
+        group['macd_signal'] = group['macd'].ewm(span=9, adjust=False).mean()
+        group['macd_hist'] = group['macd'] - group['macd_signal']
+        group['log_return'] = np.log(group['close'] / group['close'].shift(1))
+        group['volatility_7d'] = group['log_return'].rolling(7).std()
+        group['price_to_ema_ratio'] = (group['close'] / group['ema_26']) - 1
+        group['macd_norm'] = group['macd'] / group['close']
+        return group
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        return df.groupby('ticker', group_keys=False).apply(process_ticker_group)
+
+def _synthetic_long(n_tickers: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D', tz='UTC')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (n_days, n_tickers)), axis=0))
+    return pd.DataFrame({
+        'ticker': np.tile([f"T{i:04d}" for i in range(n_tickers)], n_days),
+        'timestamp': np.repeat(dates, n_tickers),
+        'close': close.ravel(),
+    })
+
+def run_benchmark(ticker_counts=(30, 100, 300, 1000), n_days: int = 1500):
+    """Compara groupby.apply frente al kernel ancho y verifica que coinciden."""
+    print(f"{'tickers':>8} | {'groupby.apply (s)':>18} | {'kernel ancho (s)':>17} | {'speedup':>8} | {'max |dif|':>10}")
+    for n_tickers in ticker_counts:
+        df = _synthetic_long(n_tickers, n_days)
+
+        start = time.perf_counter()
+        reference = _reference_groupby_apply(df)
+        t_reference = time.perf_counter() - start
+
+        start = time.perf_counter()
+        wide, _ = compute_long_features(df)
+        t_wide = time.perf_counter() - start
+
+        reference = reference.sort_values(['ticker', 'timestamp'])
+        wide = wide.sort_values(['ticker', 'timestamp'])
+        max_diff = max(
+            np.nanmax(np.abs(reference[col].to_numpy() - wide[col].to_numpy())) for col in TICKER_FEATURE_COLUMNS
+        )
+        print(f"{n_tickers:>8} | {t_reference:>18.3f} | {t_wide:>17.3f} | {t_reference / t_wide:>7.1f}x | {max_diff:>10.2e}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark()
@@ -0,0 +1,267 @@
+# src/feature_engineering/feature_memo.py
+
+import pandas as pd
+from sqlalchemy import text
+from datetime import datetime, timezone
+import hashlib
+import json
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.feature_engineering.feature_registry import TICKER_SOURCES, SOURCE_VALUE_COLUMNS
+from src.utils.db_retention import CATALOG_TABLE
+from src.utils.storage_backend import list_tables
+from src.utils.monthly_parquet import MonthlyParquetStore, split_months
+
+# Módulos cuyo código define el resultado: si cambian, la caché deja de valer
+CODE_MODULES = ['feature_registry.py', 'feature_kernel.py', 'compiled_kernels.py', 'cross_sectional.py', 'incremental_features.py', 'market_regime.py', 'model_features.py']
+
+# Dígitos significativos de las sumas de control: absorben el ruido de orden
+# de suma en las agregaciones paralelas sin ocultar cambios reales
+CHECKSUM_DIGITS = 12
+
+# --- HUELLAS ---
+
+def code_version(features: list, extra_files: list = None) -> str:
+    """Hash del código de las features (módulos de CODE_MODULES + `extra_files`) y de la lista pedida."""
+    digest = hashlib.sha256(json.dumps(list(features)).encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in [os.path.join(here, name) for name in CODE_MODULES] + list(extra_files or []):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def _partition_fingerprints(connection, table: str) -> dict:
+    """
+    Por partición (ticker, o año en las series de mercado): filas, primer y
+    último timestamp y suma de cada columna de valores.
+    """
+    partition = 'ticker' if table in TICKER_SOURCES else 'CAST(EXTRACT(YEAR FROM timestamp) AS INTEGER)'
+    sums = ', '.join(f"SUM({col}) AS sum_{col}" for col in SOURCE_VALUE_COLUMNS[table])
+    rows = connection.execute(text(
+        f"SELECT {partition} AS part, COUNT(*) AS n, MIN(timestamp) AS min_ts, MAX(timestamp) AS max_ts, {sums} "
+        f"FROM {table} GROUP BY {partition}"
+    )).fetchall()
+    partitions = {}
+    for part, n, min_ts, max_ts, *values in rows:
+        checksums = [None if v is None else float(f"{float(v):.{CHECKSUM_DIGITS}g}") for v in values]
+        partitions[str(part)] = [int(n), pd.Timestamp(min_ts).isoformat(), pd.Timestamp(max_ts).isoformat(), *checksums]
+    return partitions
+
+def fingerprint_sources(engine, tables: list) -> dict:
+    """Huella de cada tabla fuente: particiones en caliente + particiones archivadas en Parquet."""
+    fingerprint = {}
+    with engine.connect() as connection:
+        has_catalog = CATALOG_TABLE in list_tables(connection)
+        for table in dict.fromkeys(tables):
+            entry = {'partitions': _partition_fingerprints(connection, table)}
+            if has_catalog:
+                archived = connection.execute(
+                    text(f"SELECT partition_key, row_count, checksum FROM {CATALOG_TABLE} WHERE table_name = :t ORDER BY partition_key"),
+                    {'t': table}
+                ).fetchall()
+                entry['archive'] = [list(row) for row in archived]
+            fingerprint[table] = entry
+    return fingerprint
+
+def artifact_key(version: str, fingerprint: dict) -> str:
+    payload = json.dumps({'code': version, 'sources': fingerprint}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def diff_fingerprints(previous: dict, current: dict):
+    """
+    Compara dos huellas. Devuelve (tickers a recalcular, tickers desaparecidos)
+    o None si cambió algo común a todos los tickers (series de mercado, archivo
+    o el conjunto de tablas) y hay que recalcular completo.
+    """
+    if set(previous) != set(current):
+        return None
+    changed, dropped = set(), set()
+    for table, entry in current.items():
+        old = previous[table]
+        if old.get('archive') != entry.get('archive'):
+            return None
+        if table not in TICKER_SOURCES:
+            if old['partitions'] != entry['partitions']:
+                return None
+            continue
+        for ticker in set(old['partitions']) | set(entry['partitions']):
+            if ticker not in entry['partitions']:
+                dropped.add(ticker)
+            elif old['partitions'].get(ticker) != entry['partitions'][ticker]:
+                changed.add(ticker)
+    # Un ticker que sigue en alguna tabla (p. ej. sin funding) no ha desaparecido
+    still_present = {t for table in current if table in TICKER_SOURCES for t in current[table]['partitions']}
+    changed |= dropped & still_present
+    return changed, dropped - still_present
+
+def appended_since(previous: dict, current: dict):
+    """
+    Si entre dos huellas solo se añadieron filas al final de las particiones
+    (barras nuevas de la ejecución diaria), devuelve el último timestamp que ya
+    se conocía en la partición más atrasada que creció: las features cambian a
+    partir de él. None si hubo otro tipo de cambio (tickers nuevos o retirados,
+    historia corregida, archivado) o ninguno.
+    """
+    if set(previous) != set(current):
+        return None
+    starts = []
+    for table, entry in current.items():
+        old = previous[table]
+        if old.get('archive') != entry.get('archive') or set(old['partitions']) - set(entry['partitions']):
+            return None
+        known_until = max((pd.Timestamp(part[2]) for part in old['partitions'].values()), default=None)
+        for key, part in entry['partitions'].items():
+            before = old['partitions'].get(key)
+            if before == part:
+                continue
+            if before is None:
+                # Año nuevo de una serie de mercado: solo vale si empieza tras lo ya conocido
+                if table in TICKER_SOURCES or known_until is None or pd.Timestamp(part[1]) <= known_until:
+                    return None
+                starts.append(known_until)
+            elif before[1] == part[1] and part[0] > before[0] and pd.Timestamp(part[2]) > pd.Timestamp(before[2]):
+                starts.append(pd.Timestamp(before[2]))
+            else:
+                return None
+    return min(starts) if starts else None
+
+def edited_tickers(previous: dict, current: dict) -> set:
+    """
+    Tickers con barras corregidas en sitio: mismas filas y mismos extremos
+    temporales en asset_metrics pero otras sumas. El estado incremental, que
+    solo mira el número de barras, no lo detecta y hay que recalcularlos.
+    """
+    old = previous.get('asset_metrics', {}).get('partitions', {})
+    new = current.get('asset_metrics', {}).get('partitions', {})
+    return {t for t, part in new.items() if t in old and old[t][:3] == part[:3] and old[t] != part}
+
+# --- CACHÉ DE ARTEFACTOS ---
+
+class FeatureArtifactCache:
+    """
+    Artefactos de features ya calculados indexados por la clave de su huella.
+    Cada artefacto es un directorio con un parquet por mes (MonthlyParquetStore):
+    el de la ejecución diaria enlaza los meses que no cambian del artefacto
+    anterior y solo escribe los nuevos. Se expulsa el de uso más antiguo
+    mientras el total supere `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or settings.FEATURE_CACHE_DIR
+        self.max_bytes = settings.FEATURE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+
+    def _load_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {'entries': {}, 'outputs': {}}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+
+    def _save_index(self, index: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_path)
+
+    def store(self, key: str) -> MonthlyParquetStore:
+        return MonthlyParquetStore(os.path.join(self.cache_dir, key), key_column='ticker')
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def get(self, key: str, since=None, latest: bool = False) -> pd.DataFrame:
+        """Filas del artefacto desde `since` (y con `latest`, la última de cada ticker); None si no está."""
+        index = self._load_index()
+        if key not in index['entries'] or not self.store(key).exists():
+            return None
+        index['entries'][key]['last_used'] = self._now()
+        self._save_index(index)
+        return self.store(key).read(since=since, latest=latest)
+
+    def latest(self, version: str = None):
+        """(clave, entrada) del artefacto más reciente (de la versión de código `version`, si se indica)."""
+        index = self._load_index()
+        candidates = [
+            (entry['created_at'], key, entry) for key, entry in index['entries'].items()
+            if version in (None, entry['code_version']) and self.store(key).exists()
+        ]
+        if not candidates:
+            return None, None
+        _, key, entry = max(candidates)
+        return key, entry
+
+    def put(self, key: str, df: pd.DataFrame, version: str, fingerprint: dict, base_key: str = None) -> str:
+        """
+        Guarda el artefacto `key`. Con `base_key`, `df` sustituye los meses desde
+        el primero que cubre y el resto se enlaza del artefacto `base_key`.
+        """
+        months = split_months(df)
+        store = self.store(key)
+        if base_key is None:
+            store.commit(write=months, reset=True)
+        else:
+            base = self.store(base_key)
+            replaced = [m for m in base.months() if months and m >= min(months)]
+            store.commit(write=months, drop=replaced, base=base)
+        index = self._load_index()
+        now = self._now()
+        index['entries'][key] = {
+            'code_version': version, 'fingerprint': fingerprint,
+            'bytes': store.size_bytes(), 'created_at': now, 'last_used': now,
+        }
+        self._evict(index, keep=key)
+        self._save_index(index)
+        return store.directory
+
+    def _evict(self, index: dict, keep: str):
+        # Los meses enlazados entre artefactos cuentan en cada uno: el total es una cota por exceso
+        entries = index['entries']
+        total = sum(entry['bytes'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key]['bytes']
+            entries.pop(key)
+            self.store(key).remove()
+            # Artefactos del formato anterior (un único parquet por clave)
+            legacy = os.path.join(self.cache_dir, f"{key}.parquet")
+            if os.path.exists(legacy):
+                os.remove(legacy)
+            logging.info(f"🧹 Caché de features: expulsado {key}")
+
+    # --- Salidas publicadas ---
+
+    def publish(self, key: str, output_dir: str):
+        """Publica el artefacto `key` en `output_dir` enlazando sus meses (solo se añaden los que faltan)."""
+        MonthlyParquetStore(output_dir, key_column='ticker').commit(base=self.store(key))
+        self.mark_output(output_dir, key)
+
+    def output_is_current(self, output_dir: str, key: str) -> bool:
+        """True si `output_dir` sigue siendo exactamente el artefacto `key` que se publicó."""
+        published = self._load_index()['outputs'].get(os.path.abspath(output_dir))
+        output = MonthlyParquetStore(output_dir)
+        return published is not None and published['key'] == key and output.exists() and output.mtime() == published['mtime']
+
+    def mark_output(self, output_dir: str, key: str):
+        index = self._load_index()
+        index['outputs'][os.path.abspath(output_dir)] = {'key': key, 'mtime': MonthlyParquetStore(output_dir).mtime()}
+        self._save_index(index)
+
+if __name__ == "__main__":
+    cache = FeatureArtifactCache()
+    index = cache._load_index()
+    total = sum(entry['bytes'] for entry in index['entries'].values())
+    print(f"🗃️ Caché de features: {len(index['entries'])} artefactos, {total / 1e6:.1f} MB de {cache.max_bytes / 1e6:.0f} MB")
+    for key, entry in sorted(index['entries'].items(), key=lambda kv: kv[1]['last_used'], reverse=True):
+        print(f"   {key} | código {entry['code_version']} | {entry['bytes'] / 1e6:.1f} MB | último uso {entry['last_used']}")
@@ -0,0 +1,341 @@
+# src/feature_engineering/feature_registry.py
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text, bindparam
+import joblib
+import json
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.feature_engineering.feature_kernel import TICKER_FEATURE_COLUMNS
+from src.feature_engineering.asof_join import asof_join
+from src.feature_engineering.cross_sectional import CROSS_SECTIONAL_BASES, CROSS_SECTIONAL_COLUMNS, MOMENTUM_WINDOW, compute_cross_sectional
+from src.feature_engineering.incremental_features import BAR_COLUMNS, IncrementalFeatureStore
+from src.feature_engineering.market_regime import REGIME_COLUMNS, update_market_regime
+from src.utils.db_retention import read_table_range
+
+STRUCTURAL_COLUMNS = ['timestamp', 'ticker', 'open', 'high', 'low', 'close', 'volume']
+
+# Historia previa que se lee de cada serie macro para que el as-of join encuentre
+# la última observación (fines de semana largos y festivos)
+MACRO_FILL_DAYS = 7
+
+class FeatureSpec:
+    """
+    Nodo del grafo de features.
+      - name:     nombre del nodo
+      - outputs:  columnas que produce (por defecto, solo `name`)
+      - inputs:   nodos de los que depende
+      - source:   tabla de la que lee directamente (si la hay)
+      - lookback: barras previas que necesita de sus entradas; None = recursivo
+                  (EMAs), se cubre con el estado persistido y no con historia
+      - compute:  compute(ctx, frame) -> frame con las columnas de `outputs`
+      - cross_sectional: cada fila depende de los demás tickers del mismo día
+                  (no se puede calcular un subconjunto de tickers por separado)
+    """
+
+    def __init__(self, name: str, compute, inputs=(), source: str = None, lookback=0, outputs=None, cross_sectional: bool = False):
+        self.name = name
+        self.compute = compute
+        self.inputs = tuple(inputs)
+        self.source = source
+        self.lookback = lookback
+        self.outputs = tuple(outputs or (name,))
+        self.cross_sectional = cross_sectional
+
+    def __repr__(self):
+        return f"FeatureSpec({self.name!r}, inputs={list(self.inputs)}, source={self.source!r}, lookback={self.lookback})"
+
+# --- CARGADORES DE TABLAS ---
+
+def _where_clause(since=None, tickers=None):
+    conditions, params = [], {}
+    if since is not None:
+        conditions.append("timestamp >= :since"); params['since'] = pd.Timestamp(since).to_pydatetime()
+    if tickers is not None:
+        conditions.append("ticker IN :tickers"); params['tickers'] = list(tickers)
+    return (f" WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+def _normalize_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.normalize()
+    return df
+
+def _load_asset_metrics(engine, since=None, tickers=None) -> pd.DataFrame:
+    where, params = _where_clause(since, tickers)
+    query = text(f"SELECT {', '.join(BAR_COLUMNS)} FROM asset_metrics{where} ORDER BY ticker, timestamp")
+    if tickers is not None:
+        query = query.bindparams(bindparam('tickers', expanding=True))
+    return _normalize_timestamps(pd.read_sql(query, engine, params=params))
+
+def _load_funding(engine, since=None, tickers=None) -> pd.DataFrame:
+    # Los funding rates antiguos pueden estar archivados en Parquet (ver db_retention)
+    funding = read_table_range(engine, 'derivatives_funding_rates', start=since, columns=['ticker', 'funding_rate'])
+    if tickers is not None:
+        funding = funding[funding['ticker'].isin(list(tickers))]
+    funding = _normalize_timestamps(funding.sort_values('timestamp', kind='mergesort'))
+    # Hay un pago cada 8h; nos quedamos con el último del día para no duplicar barras diarias
+    return funding.drop_duplicates(subset=['ticker', 'timestamp'], keep='last')
+
+def _macro_loader(table: str, column: str):
+    def load(engine, since=None, tickers=None) -> pd.DataFrame:
+        # Serie de mercado: es la misma para todos los tickers
+        where, params = _where_clause(since)
+        return _normalize_timestamps(pd.read_sql(text(f"SELECT timestamp, close AS {column} FROM {table}{where}"), engine, params=params))
+    return load
+
+# tabla -> cargador(engine, since, tickers)
+SOURCES = {
+    'asset_metrics': _load_asset_metrics,
+    'derivatives_funding_rates': _load_funding,
+}
+
+# Tablas con una partición por ticker (el resto son series de mercado comunes a todos)
+TICKER_SOURCES = {'asset_metrics', 'derivatives_funding_rates'}
+
+# Columnas que entran en la huella (checksum) de cada tabla
+SOURCE_VALUE_COLUMNS = {
+    'asset_metrics': ['open', 'high', 'low', 'close', 'volume'],
+    'derivatives_funding_rates': ['funding_rate'],
+}
+
+# columna -> tabla de cierres macro
+MACRO_TABLES = {
+    'spy_close': 'macro_spy',
+    'vix_close': 'macro_vix',
+    'tnx_close': 'macro_tnx',
+    'dxy_close': 'macro_dx_y_nyb',
+    'gc_close': 'macro_gc',
+    'cl_close': 'macro_cl',
+}
+for _column, _table in MACRO_TABLES.items():
+    SOURCES[_table] = _macro_loader(_table, _column)
+    SOURCE_VALUE_COLUMNS[_table] = ['close']
+
+# --- FUNCIONES DE CÁLCULO ---
+
+def _compute_bars(ctx, frame):
+    # Con el kernel en el plan, el almacén incremental devuelve las barras junto a
+    # sus features: así asset_metrics no se lee dos veces
+    if 'ticker_kernel' in ctx.plan:
+        frame = IncrementalFeatureStore().update(
+            ctx.engine, full_rebuild=ctx.full_rebuild, rebuild_tickers=ctx.rebuild_tickers, since=ctx.start('asset_metrics')
+        )
+        if ctx.tickers is not None:
+            frame = frame[frame['ticker'].isin(ctx.tickers)]
+        return frame
+    return ctx.source('asset_metrics')
+
+def _compute_ticker_kernel(ctx, frame):
+    # Las columnas ya llegan con las barras (ver _compute_bars)
+    return frame
+
+def _compute_funding(ctx, frame):
+    funding = ctx.source('derivatives_funding_rates')
+    frame = pd.merge(frame, funding[['timestamp', 'ticker', 'funding_rate']], on=['timestamp', 'ticker'], how='left')
+    frame['funding_rate'] = frame['funding_rate'].fillna(0)
+    return frame
+
+def _compute_macro(ctx, frame):
+    # Todas las series macro del plan se alinean a la vez sobre el calendario
+    # cripto con un as-of join hacia atrás (cubre fines de semana y festivos);
+    # el resto de nodos macro encuentran su columna ya calculada
+    columns = [spec.name for spec in ctx.plan.nodes if spec.name in MACRO_TABLES and spec.name not in frame.columns]
+    if columns:
+        series = []
+        for col in columns:
+            macro_df = ctx.source(MACRO_TABLES[col])
+            series.append((macro_df['timestamp'], macro_df[col]))
+        values = asof_join(frame['timestamp'], series)
+        frame = frame.assign(**{col: values[:, k] for k, col in enumerate(columns)})
+    return frame
+
+def _compute_log_return_gc_close(ctx, frame):
+    frame['log_return_gc_close'] = np.log(frame['gc_close'] / frame.groupby('ticker')['gc_close'].shift(1))
+    return frame
+
+def _compute_cross_sectional(ctx, frame):
+    # Rango, percentil y z-score de cada ticker frente al universo del mismo día
+    return compute_cross_sectional(frame)
+
+def _compute_market_regime(ctx, frame):
+    # Vector de régimen del día (tabla gnn_market_regime, puesta al día incrementalmente)
+    regime = update_market_regime(ctx.engine, full_rebuild=ctx.full_rebuild, since=ctx.since)
+    return pd.merge(frame, regime, on='timestamp', how='left')
+
+# --- REGISTRO ---
+
+REGISTRY = {}
+
+def register(spec: FeatureSpec) -> FeatureSpec:
+    """Da de alta un nodo; cada una de sus columnas de salida resuelve a él."""
+    for output in spec.outputs:
+        if output in REGISTRY and REGISTRY[output].name != spec.name:
+            raise ValueError(f"La columna '{output}' ya la produce el nodo '{REGISTRY[output].name}'")
+        REGISTRY[output] = spec
+    REGISTRY[spec.name] = spec
+    return spec
+
+register(FeatureSpec('bars', _compute_bars, source='asset_metrics', outputs=STRUCTURAL_COLUMNS))
+register(FeatureSpec('ticker_kernel', _compute_ticker_kernel, inputs=['bars'], lookback=None, outputs=TICKER_FEATURE_COLUMNS))
+register(FeatureSpec('funding_rate', _compute_funding, inputs=['bars'], source='derivatives_funding_rates'))
+for _column, _table in MACRO_TABLES.items():
+    register(FeatureSpec(_column, _compute_macro, inputs=['bars'], source=_table, lookback=MACRO_FILL_DAYS))
+register(FeatureSpec(
+    'cross_sectional', _compute_cross_sectional, inputs=['ticker_kernel', 'funding_rate'], lookback=MOMENTUM_WINDOW,
+    outputs=[CROSS_SECTIONAL_BASES[-1]] + CROSS_SECTIONAL_COLUMNS, cross_sectional=True
+))
+register(FeatureSpec(
+    'market_regime', _compute_market_regime, inputs=['bars', 'funding_rate'], outputs=REGIME_COLUMNS, cross_sectional=True
+))
+register(FeatureSpec('log_return_gc_close', _compute_log_return_gc_close, inputs=['gc_close'], lookback=1))
+
+# --- RESOLUCIÓN DEL GRAFO ---
+
+def _deeper(a, b):
+    """Máximo de dos profundidades donde None (recursivo) es infinito."""
+    return None if a is None or b is None else max(a, b)
+
+class FeaturePlan:
+    """
+    Subgrafo mínimo para producir `features`, en orden topológico. Solo se leen
+    las tablas de sus nodos y solo se ejecutan sus funciones.
+    """
+
+    def __init__(self, features: list):
+        unknown = [f for f in features if f not in REGISTRY]
+        if unknown:
+            raise KeyError(f"Features sin registrar: {unknown}")
+        self.features = list(features)
+        self.nodes = []
+        visiting = set()
+
+        def visit(spec):
+            if spec in self.nodes:
+                return
+            if spec.name in visiting:
+                raise ValueError(f"Ciclo en el grafo de features en '{spec.name}'")
+            visiting.add(spec.name)
+            for dep in spec.inputs:
+                visit(REGISTRY[dep])
+            visiting.discard(spec.name)
+            self.nodes.append(spec)
+
+        visit(REGISTRY['bars'])  # las barras fijan las filas (ticker, timestamp)
+        for feature in self.features:
+            visit(REGISTRY[feature])
+
+    def __contains__(self, name: str) -> bool:
+        return any(spec.name == name for spec in self.nodes)
+
+    @property
+    def cross_sectional(self) -> bool:
+        """True si algún nodo compara tickers entre sí: el plan solo se puede evaluar con el universo completo."""
+        return any(spec.cross_sectional for spec in self.nodes)
+
+    @property
+    def sources(self) -> list:
+        return [spec.source for spec in self.nodes if spec.source]
+
+    def history_depth(self, with_state: bool = False) -> dict:
+        """
+        Barras de historia que necesita cada tabla fuente antes del primer día
+        pedido: suma de los lookbacks a lo largo de cada camino. None si algún
+        nodo del camino es recursivo; con `with_state`, los nodos recursivos
+        cuentan 0 porque continúan desde el estado incremental persistido.
+        """
+        depth = {}
+
+        def visit(spec, extra):
+            lookback = 0 if with_state and spec.lookback is None else spec.lookback
+            total = None if extra is None or lookback is None else extra + lookback
+            if spec.source:
+                depth[spec.source] = _deeper(depth.get(spec.source, 0), total)
+            for dep in spec.inputs:
+                visit(REGISTRY[dep], total)
+
+        for feature in self.features:
+            visit(REGISTRY[feature], 0)
+        return depth
+
+    def evaluate(self, engine, full_rebuild: bool = False, since=None, tickers: list = None, rebuild_tickers: list = None) -> pd.DataFrame:
+        """
+        Ejecuta el plan y devuelve un frame largo ordenado por (ticker, timestamp)
+        con las columnas estructurales y las features pedidas. Con `since`, cada
+        tabla se lee desde `since` menos su profundidad de historia (los nodos
+        recursivos parten del estado incremental) y se devuelven solo las filas
+        desde `since`. Con `tickers`, solo se calculan esos tickers;
+        `rebuild_tickers` descarta su estado incremental y los recalcula desde cero.
+        """
+        if tickers is not None and self.cross_sectional:
+            logging.warning(" -> Plan con features transversales evaluado sobre un subconjunto de tickers: se comparan solo entre ellos.")
+        ctx = FeatureContext(engine, self, full_rebuild=full_rebuild, since=since, tickers=tickers, rebuild_tickers=rebuild_tickers)
+        frame = None
+        for spec in self.nodes:
+            logging.info(f" -> Nodo '{spec.name}'")
+            frame = spec.compute(ctx, frame)
+        frame = frame.sort_values(['ticker', 'timestamp'], kind='mergesort')
+        if since is not None:
+            frame = frame[frame['timestamp'] >= pd.Timestamp(since)]
+        columns = list(dict.fromkeys(STRUCTURAL_COLUMNS + self.features))
+        return frame[columns].reset_index(drop=True)
+
+class FeatureContext:
+    """Estado de una evaluación: conexión, plan y tablas ya leídas (cada una, una sola vez)."""
+
+    def __init__(self, engine, plan: FeaturePlan, full_rebuild: bool = False, since=None, tickers: list = None, rebuild_tickers: list = None):
+        self.engine = engine
+        self.plan = plan
+        self.full_rebuild = full_rebuild
+        self.since = pd.Timestamp(since) if since is not None else None
+        self.tickers = sorted(tickers) if tickers is not None else None
+        self.rebuild_tickers = rebuild_tickers
+        self._depth = plan.history_depth(with_state=True)
+        self._loaded = {}
+
+    def start(self, table: str):
+        """Primer timestamp que hay que leer de `table` (None = toda la historia)."""
+        if self.since is None or self._depth.get(table) is None:
+            return None
+        return self.since - pd.Timedelta(days=self._depth[table])
+
+    def source(self, table: str) -> pd.DataFrame:
+        if table not in self._loaded:
+            self._loaded[table] = SOURCES[table](self.engine, since=self.start(table), tickers=self.tickers)
+        return self._loaded[table]
+
+def resolve(features: list) -> FeaturePlan:
+    return FeaturePlan(features)
+
+def load_model_features(model_path: str = None) -> list:
+    """
+    Features del paquete del modelo (sin el prefijo 'num__' del ColumnTransformer).
+    Si no hay paquete, se usa notebooks/important_features.json.
+    """
+    model_path = model_path or settings.MODEL_PACKAGE_PATH
+    feature_list = None
+    if os.path.exists(model_path):
+        try:
+            feature_list = joblib.load(model_path).get('feature_list')
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo leer la lista de features del modelo: {e}")
+    if feature_list is None:
+        with open(settings.MODEL_FEATURES_FALLBACK_PATH, 'r') as f:
+            feature_list = json.load(f)
+    return [col.split('__')[1] if '__' in col else col for col in feature_list]
+
+if __name__ == "__main__":
+    features = sys.argv[1:] or load_model_features()
+    plan = resolve(features)
+    print(f"📋 {len(features)} features -> {len(plan.nodes)} nodos")
+    for spec in plan.nodes:
+        print(f"   {spec}")
+    print(f"🗄️ Tablas: {plan.sources}")
+    print(f"📏 Historia por tabla (barras, None = toda la historia): {plan.history_depth()}")
+    print(f"📏 Con estado incremental (ejecución diaria): {plan.history_depth(with_state=True)}")
@@ -0,0 +1,269 @@
+# src/feature_engineering/incremental_features.py
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text, bindparam
+import json
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.feature_engineering.feature_kernel import (
+    TICKER_FEATURE_COLUMNS, initial_state, stack_states, unstack_states,
+    compute_wide_features, compute_long_features
+)
+from src.utils.monthly_parquet import MonthlyParquetStore, month_of, split_months
+
+BAR_COLUMNS = ['ticker', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+def compute_ticker_features(close: np.ndarray, state: dict = None):
+    """
+    Calcula las características de un solo ticker para `close` (en orden temporal)
+    continuando desde `state` (None = desde el principio). Devuelve
+    (dict columna -> array, nuevo estado).
+    """
+    state = state if state is not None else initial_state()
+    close = np.asarray(close, dtype=float)[:, None]
+    features, stacked = compute_wide_features(close, np.ones(close.shape, dtype=bool), stack_states([state]))
+    new_state = unstack_states(stacked, [state], [len(close)])[0]
+    return {col: features[col][:, 0] for col in TICKER_FEATURE_COLUMNS}, new_state
+
+# --- ALMACÉN DE ESTADO ---
+
+class IncrementalFeatureStore:
+    """
+    Guarda, por ticker, las características ya calculadas y el estado recursivo
+    tras la última barra. En cada ejecución solo se leen de la base de datos y
+    se procesan las barras posteriores a ese estado.
+    Si el número de barras en la base de datos no cuadra con el estado (p. ej.
+    un backfill de histórico) el ticker se recalcula completo.
+
+    Las filas van en un parquet por mes (MonthlyParquetStore): la ejecución
+    diaria solo reescribe los meses que reciben barras y `load(since)` solo lee
+    los meses desde `since`. Un ticker recalculado (o nuevo) escribe su historia
+    anterior al mes de su última barra en un fichero propio ('ticker:<t>') y su
+    corte en los metadatos; las filas viejas que queden en meses anteriores al
+    corte se ignoran al leer. Estados y cortes van en el manifiesto, así que
+    filas y estado se confirman juntos.
+    """
+
+    def __init__(self, state_dir: str = None):
+        self.state_dir = state_dir or settings.FEATURE_STATE_DIR
+        self.store = MonthlyParquetStore(os.path.join(self.state_dir, 'ticker_features'))
+        # Formato anterior (un único parquet + JSON): se recalcula y se borra al guardar
+        self.legacy_paths = [os.path.join(self.state_dir, name) for name in ('ticker_features.parquet', 'ticker_state.json')]
+
+    def states(self) -> dict:
+        """Estado por ticker, sin leer ninguna fila."""
+        return self.store.manifest()['meta'].get('states', {})
+
+    def load(self, since=None):
+        """(características desde `since` o todas, estados)."""
+        manifest = self.store.manifest()
+        states = manifest['meta'].get('states', {})
+        cutoffs = manifest['meta'].get('cutoffs', {})
+        start = None if since is None else month_of(since)
+        parts = [
+            self.store.read_file(f"ticker:{ticker}", manifest=manifest) for ticker, cutoff in sorted(cutoffs.items())
+            if f"ticker:{ticker}" in manifest['files'] and (start is None or start < cutoff)
+        ]
+        for month in self.store.months(manifest):
+            if start is not None and month < start:
+                continue
+            rows = self.store.read_file(month, manifest=manifest)
+            hidden = [ticker for ticker, cutoff in cutoffs.items() if month < cutoff]
+            parts.append(rows[rows['ticker'].isin(list(states)) & ~rows['ticker'].isin(hidden)])
+        parts = [rows for rows in parts if not rows.empty]
+        if not parts:
+            return pd.DataFrame(columns=BAR_COLUMNS + TICKER_FEATURE_COLUMNS), states
+        features_df = pd.concat(parts, ignore_index=True)
+        if since is not None:
+            features_df = features_df[features_df['timestamp'] >= since]
+        features_df = features_df.sort_values(['ticker', 'timestamp'], kind='mergesort')
+        return features_df.reset_index(drop=True), states
+
+    def save(self, new_rows: pd.DataFrame, states: dict, rebuilt: list = (), dropped: list = (), reset: bool = False):
+        """
+        Confirma las filas nuevas. Solo se reescriben los meses que reciben filas
+        (y, en un ticker recalculado, su propio fichero); `reset` rehace el almacén.
+        """
+        manifest = self.store.manifest()
+        cutoffs = {} if reset else dict(manifest['meta'].get('cutoffs', {}))
+        write, drop = {}, []
+        for ticker in dropped:
+            cutoffs.pop(ticker, None)
+            drop.append(f"ticker:{ticker}")
+        purge = set(rebuilt) | set(dropped)
+        months = split_months(new_rows)
+        existing = [] if reset else self.store.months(manifest)
+        for ticker in ([] if reset else rebuilt):
+            rows = new_rows[new_rows['ticker'] == ticker]
+            cutoff = month_of(rows['timestamp'].max())
+            history = rows[rows['timestamp'] < pd.Timestamp(cutoff + '-01', tz='UTC')]
+            cutoffs[ticker] = cutoff
+            if history.empty:
+                drop.append(f"ticker:{ticker}")
+            else:
+                write[f"ticker:{ticker}"] = history
+            # Sus filas anteriores al corte ya están en su fichero; las de meses
+            # posteriores (si su historia se acortó) hay que purgarlas
+            months = {m: (r if m >= cutoff else r[r['ticker'] != ticker]) for m, r in months.items()}
+            for month in existing:
+                if month > cutoff:
+                    months.setdefault(month, new_rows.iloc[:0])
+        for month, rows in months.items():
+            old = self.store.read_file(month, manifest=manifest) if month in existing else None
+            if old is not None:
+                # Fuera las filas sustituidas y las que ya tapa un corte
+                stale = purge | {t for t, cutoff in cutoffs.items() if month < cutoff} | (set(old['ticker'].unique()) - set(states))
+                rows = pd.concat([old[~old['ticker'].isin(list(stale))], rows], ignore_index=True)
+            if rows.empty:
+                drop.append(month)
+                continue
+            write[month] = rows.sort_values(['ticker', 'timestamp'], kind='mergesort').reset_index(drop=True)
+        self.store.commit(write=write, drop=drop, meta={'states': states, 'cutoffs': cutoffs}, reset=reset)
+        for path in self.legacy_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _load_bars(engine, tickers: list, since=None) -> pd.DataFrame:
+        if not tickers:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        where = "ticker IN :tickers" + (" AND timestamp > :since" if since is not None else "")
+        query = text(
+            f"SELECT {', '.join(BAR_COLUMNS)} FROM asset_metrics WHERE {where} ORDER BY ticker, timestamp"
+        ).bindparams(bindparam('tickers', expanding=True))
+        params = {'tickers': list(tickers)}
+        if since is not None:
+            params['since'] = since.to_pydatetime()
+        bars = pd.read_sql(query, engine, params=params)
+        bars['timestamp'] = pd.to_datetime(bars['timestamp'], utc=True)
+        return bars
+
+    @staticmethod
+    def _process(bars: pd.DataFrame, states: dict) -> pd.DataFrame:
+        """
+        Barras nuevas de varios tickers -> filas de características, en una sola
+        pasada del kernel ancho (fechas x tickers). Actualiza `states` en sitio.
+        """
+        tickers = sorted(bars['ticker'].unique())
+        previous = [states[t] for t in tickers]
+        rows, stacked = compute_long_features(bars[BAR_COLUMNS], stack_states(previous), ticker_order=tickers)
+        bar_counts = bars['ticker'].value_counts().reindex(tickers).to_numpy()
+        last_timestamps = bars.groupby('ticker')['timestamp'].max()
+        for ticker, new_state in zip(tickers, unstack_states(stacked, previous, bar_counts)):
+            new_state['last_raw_timestamp'] = last_timestamps[ticker].isoformat()
+            states[ticker] = new_state
+        rows['timestamp'] = rows['timestamp'].dt.normalize()
+        return rows
+
+    def update(self, engine, full_rebuild: bool = False, rebuild_tickers: list = None, since=None) -> pd.DataFrame:
+        """
+        Actualiza el almacén con las barras nuevas y devuelve todas las características por ticker
+        (o solo las filas desde `since`, leyendo solo sus meses). `rebuild_tickers` fuerza el recálculo completo de esos
+        tickers (p. ej. barras corregidas en sitio, que no cambian el número de barras).
+        """
+        states = {} if full_rebuild else self.states()
+
+        db_counts = pd.read_sql(
+            "SELECT ticker, COUNT(*) AS bar_count FROM asset_metrics GROUP BY ticker", engine
+        ).set_index('ticker')['bar_count'].to_dict()
+
+        to_rebuild = [t for t in db_counts if t not in states or t in set(rebuild_tickers or [])]
+        to_update = [t for t, n in db_counts.items() if t not in to_rebuild and n != states[t]['bar_count']]
+        dropped = [t for t in states if t not in db_counts]
+
+        pending = []
+        if to_update:
+            resume_from = min(pd.Timestamp(states[t]['last_raw_timestamp']) for t in to_update)
+            new_bars = dict(tuple(self._load_bars(engine, to_update, resume_from).groupby('ticker', sort=False)))
+            # También los tickers sin barras nuevas: un backfill cambia el recuento sin añadir nada al final
+            for ticker in list(to_update):
+                bars = new_bars.get(ticker, pd.DataFrame(columns=BAR_COLUMNS))
+                bars = bars[bars['timestamp'] > pd.Timestamp(states[ticker]['last_raw_timestamp'])]
+                if states[ticker]['bar_count'] + len(bars) != db_counts[ticker]:
+                    logging.warning(f" -> {ticker}: el histórico cambió por detrás del estado. Recalculando completo.")
+                    to_rebuild.append(ticker)
+                    continue
+                pending.append(bars)
+
+        for ticker in dropped:
+            states.pop(ticker, None)
+        for ticker in to_rebuild:
+            states[ticker] = initial_state()
+        if to_rebuild:
+            pending.append(self._load_bars(engine, to_rebuild))
+
+        pending = [bars for bars in pending if not bars.empty]
+        new_rows = self._process(pd.concat(pending, ignore_index=True), states) if pending else None
+        logging.info(
+            f"Features incrementales: {0 if new_rows is None else len(new_rows)} filas nuevas "
+            f"({len(to_update)} tickers actualizados, {len(to_rebuild)} recalculados)."
+        )
+        if new_rows is not None or dropped:
+            # Si se recalcula todo (o no había almacén) se rehace en meses, sin ficheros por ticker
+            reset = set(to_rebuild) >= set(db_counts)
+            new_rows = new_rows if new_rows is not None else pd.DataFrame(columns=BAR_COLUMNS + TICKER_FEATURE_COLUMNS)
+            self.save(new_rows, states, rebuilt=to_rebuild, dropped=dropped, reset=reset)
+        return self.load(since)[0]
+
+# --- PRUEBA DE PARIDAD ---
+
+def check_parity(bars: pd.DataFrame, splits=(1, 5, 30)) -> bool:
+    """
+    Comprueba, ticker a ticker, que procesar la historia de una vez y procesar
+    un prefijo + (estado serializado a JSON) + las últimas N barras da
+    exactamente los mismos valores, bit a bit.
+    """
+    ok = True
+    for ticker, group in bars.sort_values(['ticker', 'timestamp'], kind='mergesort').groupby('ticker'):
+        close = group['close'].to_numpy(dtype=float)
+        full, full_state = compute_ticker_features(close)
+        for n_new in splits:
+            if n_new >= len(close):
+                continue
+            _, state = compute_ticker_features(close[:-n_new])
+            state = json.loads(json.dumps(state))
+            tail, inc_state = compute_ticker_features(close[-n_new:], state)
+            for col in TICKER_FEATURE_COLUMNS:
+                if not np.array_equal(full[col][-n_new:], tail[col], equal_nan=True):
+                    logging.error(f"❌ {ticker}: '{col}' difiere con {n_new} barras nuevas")
+                    ok = False
+            if json.dumps(inc_state) != json.dumps(full_state):
+                logging.error(f"❌ {ticker}: el estado final difiere con {n_new} barras nuevas")
+                ok = False
+    return ok
+
+def _synthetic_bars(n_tickers: int = 5, n_days: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', periods=n_days, freq='D', tz='UTC')
+    frames = []
+    for i in range(n_tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, n_days)))
+        frames.append(pd.DataFrame({'ticker': f"T{i}", 'timestamp': dates, 'close': close}))
+    return pd.concat(frames, ignore_index=True)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--parity' in sys.argv:
+        bars = _synthetic_bars()
+        if '--synthetic' not in sys.argv:
+            from src.utils.db_connector import create_db_engine
+            engine = create_db_engine()
+            if engine:
+                bars = pd.read_sql("SELECT ticker, timestamp, close FROM asset_metrics ORDER BY ticker, timestamp", engine)
+        ok = check_parity(bars)
+        print("✅ Paridad incremental = completo (bit a bit)" if ok else "❌ Paridad incremental rota")
+        sys.exit(0 if ok else 1)
+
+    from src.utils.db_connector import create_db_engine
+    engine = create_db_engine()
+    if engine:
+        df = IncrementalFeatureStore().update(engine, full_rebuild='--full' in sys.argv)
+        print(f"📊 Almacén de features: {len(df)} filas, {df['ticker'].nunique()} tickers")
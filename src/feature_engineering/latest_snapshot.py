@@ -0,0 +1,140 @@
+# src/feature_engineering/latest_snapshot.py
+
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.utils.compact_schema import latest_per_ticker, expand_frame, expand_timestamps
+from src.utils.monthly_parquet import MonthlyParquetStore
+
+def feature_store(store_dir: str = None) -> MonthlyParquetStore:
+    """Almacén completo que publica 02 (un parquet por mes, ver MODEL_INPUT_DIR)."""
+    return MonthlyParquetStore(store_dir or settings.MODEL_INPUT_DIR, key_column='ticker')
+
+def read_feature_store(columns: list = None, since=None, latest: bool = False, store_dir: str = None) -> pd.DataFrame:
+    """
+    Features publicadas por 02 desde `since` (todas si no se indica), leyendo solo
+    esos meses; con `latest`, también los meses con la última fila de cada ticker.
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(['ticker', 'timestamp'] + list(columns)))
+    df = feature_store(store_dir).read(since=since, columns=columns, latest=latest)
+    if df is None:
+        raise FileNotFoundError(f"No hay features publicadas en {store_dir or settings.MODEL_INPUT_DIR}")
+    return df
+
+def write_latest_snapshot(latest: pd.DataFrame, lineage: str, path: str = None) -> pd.DataFrame:
+    """
+    Escribe el último vector de características por ticker (`latest_per_ticker`
+    del frame de 02, una fila por ticker) con la clave del artefacto del que sale
+    (`lineage`). Se escribe en un temporal y se mueve encima (atómico): 03 nunca
+    lee un snapshot a medias.
+    """
+    path = path or settings.LATEST_SNAPSHOT_PATH
+    snapshot = latest.reset_index()
+    snapshot['lineage'] = lineage
+    tmp = path + '.tmp'
+    snapshot.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return snapshot
+
+def read_latest_snapshot(columns: list = None, path: str = None, store_dir: str = None) -> pd.DataFrame:
+    """
+    Snapshot (índice = ticker, ordenado) con las columnas pedidas, en una sola
+    lectura pequeña. Devuelve None si no existe, es anterior al almacén completo
+    (02 lo escribe justo después), le falta alguna columna o tiene nulos en ellas.
+    La clave de origen queda en `df.attrs['lineage']`.
+    """
+    path = path or settings.LATEST_SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
+    if os.path.getmtime(path) < feature_store(store_dir).mtime():
+        return None
+    try:
+        snapshot = pd.read_parquet(path, columns=None if columns is None else ['ticker', 'lineage'] + list(columns))
+    except Exception:
+        # Columnas que no están en el snapshot (modelo nuevo): se usa el almacén completo
+        return None
+    if columns is not None and snapshot[columns].isna().any().any():
+        return None
+    lineage = snapshot.pop('lineage')
+    snapshot = expand_frame(snapshot.set_index('ticker').sort_index())
+    snapshot.attrs['lineage'] = lineage.iloc[0] if len(lineage) else None
+    return snapshot
+
+def load_latest_features(columns: list, as_of=None, path: str = None, store_dir: str = None) -> pd.DataFrame:
+    """
+    Último vector por ticker para la decisión diaria (índice = ticker; como en la
+    caché caliente, `columns` puede incluir 'timestamp'): el snapshot si vale; si
+    no, los meses del almacén completo con la última fila de cada ticker. Con una
+    fecha pasada (`as_of`, backfill) se lee el almacén entero y se toma la última
+    fila de cada ticker hasta esa fecha.
+    """
+    if as_of is None:
+        snapshot = read_latest_snapshot(columns, path, store_dir)
+        if snapshot is not None:
+            return snapshot
+        logging.info("📚 Snapshot de features no disponible: se leen los últimos meses del almacén completo")
+    features_df = read_feature_store(columns, latest=as_of is None, store_dir=store_dir)
+    if as_of is not None:
+        features_df = expand_timestamps(features_df)
+        as_of = pd.Timestamp(as_of)
+        as_of = as_of.tz_localize('UTC') if as_of.tzinfo is None else as_of.tz_convert('UTC')
+        features_df = features_df[features_df['timestamp'] <= as_of]
+    return latest_per_ticker(features_df)[list(columns)]
+
+# --- BENCHMARK ---
+
+def run_benchmark(n_tickers: int = 300, n_days: int = 1500, seed: int = 0):
+    """Snapshot y últimos meses frente a leer el almacén completo + groupby().last() en un directorio temporal."""
+    import tempfile
+    from src.utils.compact_schema import compact_frame
+    from src.utils.monthly_parquet import split_months
+
+    rng = np.random.default_rng(seed)
+    features = [f"f{i}" for i in range(15)]
+    columns = features + ['timestamp']
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D', tz='UTC')
+    frame = pd.DataFrame(rng.normal(size=(n_tickers * n_days, len(features))), columns=features)
+    frame.insert(0, 'timestamp', np.tile(dates, n_tickers))
+    frame.insert(0, 'ticker', np.repeat([f"T{i:04d}-USD" for i in range(n_tickers)], n_days))
+    frame = frame.sample(frac=0.9, random_state=seed).reset_index(drop=True)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store_dir, snapshot_path = os.path.join(workdir, 'full'), os.path.join(workdir, 'latest.parquet')
+        written = compact_frame(frame) if settings.COMPACT_SCHEMA else frame
+        feature_store(store_dir).commit(write=split_months(written), reset=True)
+        write_latest_snapshot(latest_per_ticker(written), 'benchmark', snapshot_path)
+        print(f"📊 {n_tickers} activos x {n_days} días: almacén {feature_store(store_dir).size_bytes() / 1e6:.1f} MB, "
+              f"snapshot {os.path.getsize(snapshot_path) / 1e3:.0f} KB")
+
+        start = time.perf_counter()
+        full = latest_per_ticker(read_feature_store(store_dir=store_dir))[columns]
+        t_full = time.perf_counter() - start
+        start = time.perf_counter()
+        months = latest_per_ticker(read_feature_store(columns, latest=True, store_dir=store_dir))[columns]
+        t_months = time.perf_counter() - start
+        start = time.perf_counter()
+        fast = load_latest_features(columns, path=snapshot_path, store_dir=store_dir)
+        t_fast = time.perf_counter() - start
+
+        same = fast.index.equals(full.index) and fast.equals(full) and months.equals(full)
+        print(f"   almacén completo {t_full * 1000:.0f} ms | últimos meses {t_months * 1000:.0f} ms | "
+              f"snapshot {t_fast * 1000:.1f} ms ({t_full / t_fast:.0f}x)")
+        print(f"   {'✅' if same else '❌'} mismos vectores por ticker (lineage {fast.attrs['lineage']})")
+
+        as_of = dates[n_days // 2]
+        backfill = load_latest_features(columns, as_of=as_of, path=snapshot_path, store_dir=store_dir)
+        print(f"   {'✅' if (backfill['timestamp'] <= as_of).all() else '❌'} backfill a {as_of.date()} desde el almacén completo")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark()
@@ -0,0 +1,288 @@
+# src/feature_engineering/market_regime.py
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text, bindparam, inspect
+import json
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.feature_engineering.feature_kernel import to_wide
+from src.feature_engineering.compiled_kernels import previous_present_index, rolling_mean_std
+from src.utils.db_retention import read_table_range
+from src.utils.db_streaming import BulkCopyWriter
+
+REGIME_TABLE = 'gnn_market_regime'
+
+# Vector de régimen (features globales del GNN), una fila por día
+REGIME_COLUMNS = [
+    'btc_dominance', 'eth_dominance', 'market_return', 'market_breadth', 'return_dispersion',
+    'market_volatility_7d', 'market_volatility_30d', 'dollar_volume', 'liquidity_ratio_7_30',
+    'funding_mean', 'funding_dispersion', 'active_assets',
+]
+
+REGIME_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {REGIME_TABLE} (timestamp TIMESTAMPTZ PRIMARY KEY, "
+    + ', '.join(f"{col} DOUBLE PRECISION" for col in REGIME_COLUMNS) + ");"
+)
+
+SHORT_WINDOW, LONG_WINDOW = 7, 30
+
+def initial_regime_state() -> dict:
+    return {
+        'last_day': None,
+        'bar_count': 0,
+        'last_close': {},
+        # Últimos LONG_WINDOW - 1 días de las series que entran en ventanas móviles
+        'market_return_tail': [],
+        'dollar_volume_tail': [],
+    }
+
+# --- CÁLCULO ---
+
+def compute_regime(bars: pd.DataFrame, funding: pd.DataFrame, state: dict) -> pd.DataFrame:
+    """
+    Vector de régimen de los días de `bars` (ticker, timestamp, close, volume; ya
+    filtrado al universo), continuando desde `state`, que se actualiza en sitio.
+    Todo va sobre matrices (días x tickers):
+      - dominancia BTC/ETH: su cuota del volumen en dólares del universo
+      - retorno de mercado (media equiponderada de log-retornos), amplitud
+        (fracción de activos al alza) y dispersión entre activos
+      - volatilidad 7d/30d del retorno de mercado y liquidez (volumen 7d / 30d)
+      - funding medio y su dispersión entre activos
+    """
+    tickers = sorted(set(bars['ticker']) | set(state['last_close']))
+    close, present, (rows, cols), _ = to_wide(bars['ticker'].to_numpy(), bars['timestamp'].values, bars['close'].to_numpy(float), tickers)
+    days = pd.DatetimeIndex(np.unique(bars['timestamp'].values)).tz_localize('UTC')
+    volume = np.full(close.shape, np.nan)
+    volume[rows, cols] = bars['volume'].to_numpy(float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Cierre previo: última barra presente de la columna (o la del estado)
+        last_close = np.array([state['last_close'].get(t, np.nan) for t in tickers])
+        closes_ext = np.vstack([last_close[None, :], close])
+        log_return = np.log(close / np.take_along_axis(closes_ext, previous_present_index(present) + 1, axis=0))
+        latest = np.take_along_axis(closes_ext, (np.where(present, np.arange(len(days))[:, None], -1).max(axis=0) + 1)[None, :], axis=0)[0]
+        state['last_close'] = {t: float(v) for t, v in zip(tickers, latest) if v == v}
+
+        dollar = np.where(present, close * volume, 0.0)
+        total = dollar.sum(axis=1)
+        share = {t: dollar[:, tickers.index(t)] / total if t in tickers else np.full(len(days), np.nan) for t in ('BTC-USD', 'ETH-USD')}
+
+        valid = ~np.isnan(log_return)
+        n_returns = valid.sum(axis=1)
+        returns = np.where(valid, log_return, 0.0)
+        market_return = returns.sum(axis=1) / n_returns
+        deviation = np.where(valid, log_return - market_return[:, None], 0.0)
+        dispersion = np.sqrt((deviation * deviation).sum(axis=1) / (n_returns - 1))
+        breadth = (returns > 0).sum(axis=1) / n_returns
+
+        # Ventanas móviles sobre la cola guardada + los días nuevos
+        n_tail = len(state['market_return_tail'])
+        series = np.column_stack([
+            np.concatenate([state['market_return_tail'], market_return]),
+            np.concatenate([state['dollar_volume_tail'], total]),
+        ])
+        mean_short, std_short = rolling_mean_std(series, SHORT_WINDOW)
+        mean_long, std_long = rolling_mean_std(series, LONG_WINDOW)
+        state['market_return_tail'] = series[-(LONG_WINDOW - 1):, 0].tolist()
+        state['dollar_volume_tail'] = series[-(LONG_WINDOW - 1):, 1].tolist()
+
+        # Funding: media diaria por ticker -> media y dispersión entre activos
+        funding_mean = funding_dispersion = np.full(len(days), np.nan)
+        if not funding.empty:
+            daily = funding.groupby(['timestamp', 'ticker'], sort=False)['funding_rate'].mean().reset_index()
+            daily = daily[daily['timestamp'].isin(days)]
+            if not daily.empty:
+                day_idx = days.get_indexer(daily['timestamp'])
+                col_idx = pd.Index(tickers).get_indexer(daily['ticker'])
+                rates = np.full(close.shape, np.nan)
+                keep = col_idx >= 0
+                rates[day_idx[keep], col_idx[keep]] = daily['funding_rate'].to_numpy(float)[keep]
+                has_rate = ~np.isnan(rates)
+                n_rates = has_rate.sum(axis=1)
+                funding_mean = np.where(has_rate, rates, 0.0).sum(axis=1) / n_rates
+                rate_dev = np.where(has_rate, rates - funding_mean[:, None], 0.0)
+                funding_dispersion = np.sqrt((rate_dev * rate_dev).sum(axis=1) / (n_rates - 1))
+
+        regime = pd.DataFrame({
+            'timestamp': days,
+            'btc_dominance': share['BTC-USD'],
+            'eth_dominance': share['ETH-USD'],
+            'market_return': market_return,
+            'market_breadth': breadth,
+            'return_dispersion': dispersion,
+            'market_volatility_7d': std_short[n_tail:, 0],
+            'market_volatility_30d': std_long[n_tail:, 0],
+            'dollar_volume': total,
+            'liquidity_ratio_7_30': mean_short[n_tail:, 1] / mean_long[n_tail:, 1],
+            'funding_mean': funding_mean,
+            'funding_dispersion': funding_dispersion,
+            'active_assets': present.sum(axis=1).astype(float),
+        })
+    return regime
+
+# --- CONSTRUCTOR INCREMENTAL ---
+
+class MarketRegimeBuilder:
+    """
+    Mantiene la tabla gnn_market_regime. Guarda, junto al estado de features por
+    ticker, el último día procesado, el último cierre de cada activo y las colas
+    de las series móviles; en cada ejecución solo lee de asset_metrics y del
+    funding (caliente + archivado) los días posteriores, más el último día ya
+    escrito, que se recalcula por si le llegaron datos tarde. Si cambia el número de
+    barras ya procesadas (backfill) o la tabla no cuadra con el estado, se
+    reconstruye completa.
+    """
+
+    def __init__(self, state_dir: str = None, universe: list = None):
+        self.state_dir = state_dir or settings.FEATURE_STATE_DIR
+        self.state_path = os.path.join(self.state_dir, 'market_regime_state.json')
+        self.universe = sorted(universe or settings.UNIVERSE_TICKERS)
+
+    def load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return initial_regime_state()
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def save_state(self, state: dict):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _bar_count(self, connection, until=None) -> int:
+        query = "SELECT COUNT(*) FROM asset_metrics WHERE ticker IN :tickers"
+        params = {'tickers': self.universe}
+        if until is not None:
+            query += " AND timestamp < :until"; params['until'] = until.to_pydatetime()
+        return connection.execute(text(query).bindparams(bindparam('tickers', expanding=True)), params).scalar()
+
+    def _is_consistent(self, engine, state: dict) -> bool:
+        if state['last_day'] is None:
+            return False
+        next_day = pd.Timestamp(state['last_day']) + pd.Timedelta(days=1)
+        with engine.connect() as connection:
+            if REGIME_TABLE not in inspect(connection).get_table_names():
+                return False
+            stored = connection.execute(
+                text(f"SELECT COUNT(*) FROM {REGIME_TABLE} WHERE timestamp = :day"),
+                {'day': pd.Timestamp(state['last_day']).to_pydatetime()}
+            ).scalar()
+            if stored != 1:
+                return False
+            return self._bar_count(connection, until=next_day) == state['bar_count']
+
+    def update(self, engine, full_rebuild: bool = False) -> int:
+        """Calcula y guarda los días nuevos. Devuelve cuántos días se escribieron."""
+        state = self.load_state()
+        if not full_rebuild and not self._is_consistent(engine, state):
+            if state['last_day'] is not None:
+                logging.warning(" -> Régimen de mercado: el histórico cambió por detrás del estado. Reconstruyendo completo.")
+            full_rebuild = True
+        if full_rebuild:
+            state = initial_regime_state()
+        since = None if state['last_day'] is None else pd.Timestamp(state['last_day']) + pd.Timedelta(days=1)
+
+        query = "SELECT ticker, timestamp, close, volume FROM asset_metrics WHERE ticker IN :tickers"
+        params = {'tickers': self.universe}
+        if since is not None:
+            query += " AND timestamp >= :since"; params['since'] = since.to_pydatetime()
+        bars = pd.read_sql(text(query + " ORDER BY timestamp").bindparams(bindparam('tickers', expanding=True)), engine, params=params)
+        if bars.empty:
+            return 0
+        bars['timestamp'] = pd.to_datetime(bars['timestamp'], utc=True).dt.normalize()
+        # Una barra por ticker y día (la última), como el resto del pipeline diario
+        bars = bars.drop_duplicates(subset=['ticker', 'timestamp'], keep='last')
+
+        funding = read_table_range(engine, 'derivatives_funding_rates', start=since, columns=['ticker', 'funding_rate'])
+        funding = funding[funding['ticker'].isin(self.universe)]
+        funding['timestamp'] = pd.to_datetime(funding['timestamp'], utc=True).dt.normalize()
+
+        # El último día se recalcula en la siguiente ejecución (funding y barra del día
+        # pueden llegar más tarde): el estado se guarda cerrado en el día anterior
+        last_day = bars['timestamp'].max()
+        settled_bars = bars[bars['timestamp'] < last_day]
+        parts = []
+        if not settled_bars.empty:
+            parts.append(compute_regime(settled_bars, funding, state))
+        settled = json.loads(json.dumps(state))
+        parts.append(compute_regime(bars[bars['timestamp'] == last_day], funding, state))
+        regime = pd.concat(parts, ignore_index=True)
+
+        with engine.begin() as connection:
+            connection.execute(text(REGIME_DDL))
+            if full_rebuild:
+                connection.execute(text(f"DELETE FROM {REGIME_TABLE}"))
+            else:
+                connection.execute(text(f"DELETE FROM {REGIME_TABLE} WHERE timestamp >= :since"), {'since': since.to_pydatetime()})
+            BulkCopyWriter(connection, REGIME_TABLE, ['timestamp'] + REGIME_COLUMNS).write(regime)
+            if not settled_bars.empty:
+                settled['last_day'] = settled_bars['timestamp'].max().isoformat()
+                settled['bar_count'] = self._bar_count(connection, until=last_day)
+        self.save_state(settled)
+        logging.info(f"🌐 Régimen de mercado: {len(regime)} días {'(reconstrucción completa)' if full_rebuild else 'nuevos'} hasta {last_day.date()}.")
+        return len(regime)
+
+def load_market_regime(engine, since=None) -> pd.DataFrame:
+    """Vector de régimen por día (features globales para los datasets del GNN y el grafo de features)."""
+    where, params = '', {}
+    if since is not None:
+        where = " WHERE timestamp >= :since"; params['since'] = pd.Timestamp(since).to_pydatetime()
+    regime = pd.read_sql(text(f"SELECT timestamp, {', '.join(REGIME_COLUMNS)} FROM {REGIME_TABLE}{where} ORDER BY timestamp"), engine, params=params)
+    regime['timestamp'] = pd.to_datetime(regime['timestamp'], utc=True).dt.normalize()
+    return regime
+
+def update_market_regime(engine, full_rebuild: bool = False, since=None) -> pd.DataFrame:
+    """Pone al día la tabla y devuelve el vector de régimen (desde `since`, si se indica)."""
+    MarketRegimeBuilder().update(engine, full_rebuild=full_rebuild)
+    return load_market_regime(engine, since=since)
+
+# --- PARIDAD / BENCHMARK ---
+
+def check_incremental(days: int = 160, split: int = 120) -> bool:
+    """Construir en dos tandas (estado incremental) = construir de una vez, sobre la base golden sintética."""
+    import tempfile
+    from src.feature_engineering.model_features import GOLDEN_TICKERS, _golden_engine, _seed_golden_db
+    with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as incr_dir:
+        engine = _golden_engine(full_dir)
+        _seed_golden_db(engine, days)
+        start = time.perf_counter()
+        MarketRegimeBuilder(universe=GOLDEN_TICKERS).update(engine)
+        t_full = time.perf_counter() - start
+        reference = load_market_regime(engine)
+        engine.dispose()
+
+        engine = _golden_engine(incr_dir)
+        _seed_golden_db(engine, split)
+        builder = MarketRegimeBuilder(universe=GOLDEN_TICKERS)
+        builder.update(engine)
+        _seed_golden_db(engine, days, first_day=split)
+        start = time.perf_counter()
+        added = builder.update(engine)
+        t_incremental = time.perf_counter() - start
+        incremental = load_market_regime(engine)
+        engine.dispose()
+
+    same = reference['timestamp'].equals(incremental['timestamp']) and np.allclose(
+        reference[REGIME_COLUMNS].to_numpy(float), incremental[REGIME_COLUMNS].to_numpy(float), rtol=1e-12, atol=0, equal_nan=True
+    )
+    print(f"   completo {t_full * 1e3:.0f} ms ({len(reference)} días) | incremental {t_incremental * 1e3:.0f} ms ({added} días)")
+    print(f"   {'✅' if same else '❌'} incremental = completo")
+    return same
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--check' in sys.argv:
+        sys.exit(0 if check_incremental() else 1)
+    from src.utils.db_connector import create_db_engine
+    MarketRegimeBuilder().update(create_db_engine(), full_rebuild='--full' in sys.argv)
@@ -0,0 +1,250 @@
+# src/feature_engineering/model_features.py
+
+import pandas as pd
+import numpy as np
+import tempfile
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.utils.compact_schema import compact_frame, expand_frame, FLOAT32_RTOL
+from src.feature_engineering.feature_registry import MACRO_TABLES, STRUCTURAL_COLUMNS, resolve
+from src.feature_engineering.feature_memo import (
+    FeatureArtifactCache, appended_since, artifact_key, code_version, diff_fingerprints, edited_tickers, fingerprint_sources
+)
+
+# Las 15 features del modelo (mismo orden que el feature_list del paquete, sin 'num__')
+MODEL_FEATURES = [
+    'close', 'macd_signal', 'macd_hist', 'funding_rate',
+    'spy_close', 'vix_close', 'tnx_close', 'dxy_close',
+    'gc_close', 'cl_close', 'log_return', 'volatility_7d',
+    'price_to_ema_ratio', 'macd_norm', 'log_return_gc_close'
+]
+
+GOLDEN_PATH = os.path.join(project_root, 'data', 'golden', 'model_features_golden.parquet')
+
+# Punto único de cálculo de las features del modelo: 02 (inferencia diaria) y el
+# entrenamiento (replica_model) llaman a build_model_frame, de modo que ambos
+# usan el mismo grafo de features y comparten los artefactos de la caché.
+
+def finalize_model_frame(master_df: pd.DataFrame, model_features: list) -> pd.DataFrame:
+    """Proyecta a las features del modelo, corrige el look-ahead y limpia (por ticker)."""
+    final_cols_to_keep = list(dict.fromkeys(STRUCTURAL_COLUMNS + model_features))
+    model_ready_df = master_df[final_cols_to_keep].copy()
+
+    # Corrección de look-ahead bias
+    feature_cols_only = [col for col in model_features if col in model_ready_df.columns]
+    model_ready_df[feature_cols_only] = model_ready_df.groupby('ticker')[feature_cols_only].shift(1)
+
+    model_ready_df.dropna(inplace=True)
+
+    # Verificación final de duplicados
+    duplicates = model_ready_df.duplicated(subset=['timestamp', 'ticker']).sum()
+    if duplicates > 0:
+        logging.error(f"¡ALERTA! Se encontraron {duplicates} duplicados incluso después del nuevo proceso.")
+        model_ready_df.drop_duplicates(subset=['timestamp', 'ticker'], keep='last', inplace=True)
+
+    return model_ready_df.reset_index(drop=True)
+
+class FeatureBuild:
+    """Plan de features + huella de sus fuentes + clave del artefacto resultante."""
+
+    def __init__(self, engine, features: list):
+        self.engine = engine
+        self.features = list(features)
+        self.plan = resolve(self.features)
+        self.version = code_version(self.features)
+        self.fingerprint = fingerprint_sources(engine, self.plan.sources)
+        self.key = artifact_key(self.version, self.fingerprint)
+
+def build_model_frame(build: FeatureBuild, full_rebuild: bool = False, cache: FeatureArtifactCache = None,
+                      since=None, latest: bool = False) -> pd.DataFrame:
+    """
+    Frame listo para el modelo (features desplazadas una barra por ticker), memoizado:
+    si ninguna fuente cambió se reutiliza el artefacto; si solo cambiaron algunos
+    tickers, se recalculan esos y se empalman con el último artefacto; si solo
+    llegaron barras nuevas, se reescriben los meses desde la primera que cambia.
+    Devuelve las filas desde `since` (todas si no se indica; con `latest`, también
+    la última de cada ticker) tal como se guardan (compacto si COMPACT_SCHEMA).
+    """
+    cache = cache or FeatureArtifactCache()
+    plan, engine, features = build.plan, build.engine, build.features
+    if not full_rebuild:
+        model_ready_df = cache.get(build.key, since=since, latest=latest)
+        if model_ready_df is not None:
+            logging.info(f" -> Artefacto {build.key} en caché, se omite el cálculo.")
+            return model_ready_df
+
+    # Las features por ticker se calculan incrementalmente desde el estado guardado
+    # (EMAs, cola de retornos, último cierre) con el kernel ancho de feature_kernel
+    previous_key, previous = (None, None) if full_rebuild else cache.latest()
+    edited = edited_tickers(previous['fingerprint'], build.fingerprint) if previous else set()
+    if edited:
+        logging.info(f" -> Barras corregidas en sitio en {sorted(edited)}: se recalculan desde cero.")
+    same_code = previous is not None and previous['code_version'] == build.version
+    appended = appended_since(previous['fingerprint'], build.fingerprint) if same_code and not edited else None
+    diff = None
+    # Con features transversales un ticker nuevo o corregido cambia las de todos: no se empalma
+    if same_code and appended is None and not plan.cross_sectional:
+        diff = diff_fingerprints(previous['fingerprint'], build.fingerprint)
+    base_key = None
+    if appended is not None:
+        # Ejecución diaria: solo llegaron barras nuevas. Se recalculan los días desde la
+        # última barra conocida (incluida), leyendo de cada tabla solo su ventana de
+        # historia (lookback del plan + margen) sobre el estado incremental. Del artefacto
+        # anterior solo se lee el mes del empalme: los meses previos se enlazan tal cual
+        splice_start = pd.Timestamp(appended)
+        splice_start = (splice_start.tz_localize('UTC') if splice_start.tzinfo is None else splice_start.tz_convert('UTC')).normalize()
+        window_start = splice_start - pd.Timedelta(days=settings.DAILY_LOOKBACK_MARGIN_DAYS)
+        splice_month = splice_start.replace(day=1)
+        logging.info(f" -> Barras nuevas desde {splice_start.date()}: se recalcula la ventana desde {window_start.date()} sobre el artefacto {previous_key}...")
+        previous_df = expand_frame(cache.get(previous_key, since=splice_month))
+        recent = finalize_model_frame(plan.evaluate(engine, since=window_start), features)
+        model_ready_df = pd.concat(
+            [previous_df[previous_df['timestamp'] < splice_start], recent[recent['timestamp'] >= splice_start]], ignore_index=True
+        )
+        model_ready_df = model_ready_df.sort_values(['ticker', 'timestamp'], kind='mergesort').reset_index(drop=True)
+        base_key = previous_key
+    elif diff is not None:
+        changed, dropped = diff
+        logging.info(f" -> Recalculando {len(changed)} tickers con cambios ({len(dropped)} retirados) sobre el artefacto {previous_key}...")
+        previous_df = expand_frame(cache.get(previous_key))
+        previous_df = previous_df[~previous_df['ticker'].isin(changed | dropped)]
+        parts = [previous_df]
+        if changed:
+            parts.append(finalize_model_frame(plan.evaluate(engine, tickers=sorted(changed), rebuild_tickers=sorted(edited)), features))
+        model_ready_df = pd.concat([p for p in parts if not p.empty] or parts, ignore_index=True)
+        model_ready_df = model_ready_df.sort_values(['ticker', 'timestamp'], kind='mergesort').reset_index(drop=True)
+    else:
+        logging.info(" -> Calculando características por ticker y uniendo con datos macro...")
+        master_df = plan.evaluate(engine, full_rebuild=full_rebuild, rebuild_tickers=sorted(edited))
+        model_ready_df = finalize_model_frame(master_df, features)
+    if settings.COMPACT_SCHEMA:
+        model_ready_df = compact_frame(model_ready_df)
+    cache.put(build.key, model_ready_df, build.version, build.fingerprint, base_key=base_key)
+    if base_key is not None or since is not None or latest:
+        # En memoria solo están los meses recalculados: el resto se lee del artefacto
+        return cache.store(build.key).read(since=since, latest=latest)
+    return model_ready_df
+
+def load_training_frame(engine, features: list = None, since=None) -> pd.DataFrame:
+    """Features del modelo para entrenar: el mismo artefacto que publica 02, expandido y opcionalmente desde `since`."""
+    build = FeatureBuild(engine, features or MODEL_FEATURES)
+    # Solo se leen los meses del artefacto desde `since`
+    since = None if since is None else pd.Timestamp(since, tz='UTC')
+    return expand_frame(build_model_frame(build, since=since)).reset_index(drop=True)
+
+# --- SUITE DE PARIDAD (GOLDEN FILE) ---
+
+GOLDEN_TICKERS = ['BTC-USD', 'ETH-USD', 'SOL-USD']
+GOLDEN_DAYS = 160
+
+def _seed_golden_db(engine, days: int, first_day: int = 0, seed: int = 7):
+    """Días [first_day, days) de una serie sintética determinista (fechas fijas) en las tablas fuente del modelo."""
+    from src.utils.db_streaming import BulkCopyWriter
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=GOLDEN_DAYS, freq='D', tz='UTC')
+    tables = {'asset_metrics': [], 'derivatives_funding_rates': []}
+    for ticker in GOLDEN_TICKERS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, GOLDEN_DAYS)))
+        tables['asset_metrics'].append(pd.DataFrame({
+            'ticker': ticker, 'timestamp': dates, 'open': close, 'high': close * 1.01,
+            'low': close * 0.99, 'close': close, 'volume': rng.integers(1, 10**6, GOLDEN_DAYS).astype(float),
+        }))
+        funding_ts = pd.date_range(dates[0], dates[-1], freq='8h')
+        tables['derivatives_funding_rates'].append(pd.DataFrame({
+            'ticker': ticker, 'timestamp': funding_ts, 'funding_rate': rng.normal(0, 1e-4, len(funding_ts)),
+        }))
+    weekdays = dates[dates.dayofweek < 5]
+    for table in MACRO_TABLES.values():
+        close = rng.random(len(weekdays)) + 1
+        tables[table] = [pd.DataFrame({'timestamp': weekdays, 'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0})]
+    start = dates[first_day - 1] if first_day else dates[0] - pd.Timedelta(days=1)
+    with engine.begin() as connection:
+        for table, frames in tables.items():
+            df = pd.concat(frames, ignore_index=True)
+            df = df[(df['timestamp'] > start) & (df['timestamp'] <= dates[days - 1])]
+            BulkCopyWriter(connection, table, list(df.columns)).write(df)
+
+def _golden_engine(workdir: str):
+    """Base embebida, estado incremental y caché de features dentro de `workdir`."""
+    from src.utils.db_connector import create_db_engine
+    settings.DB_BACKEND = 'duckdb'
+    settings.EMBEDDED_DB_PATH = os.path.join(workdir, 'golden.duckdb')
+    settings.FEATURE_STATE_DIR = os.path.join(workdir, 'feature_state')
+    settings.FEATURE_CACHE_DIR = os.path.join(workdir, 'feature_cache')
+    return create_db_engine()
+
+def _same(a: pd.DataFrame, b: pd.DataFrame, rtol: float = 0.0) -> bool:
+    a = a.sort_values(['ticker', 'timestamp']).reset_index(drop=True)
+    b = b.sort_values(['ticker', 'timestamp']).reset_index(drop=True)
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    if not (a['ticker'].astype(str).equals(b['ticker'].astype(str)) and a['timestamp'].equals(b['timestamp'])):
+        return False
+    numeric = [c for c in a.columns if c not in ('ticker', 'timestamp')]
+    return np.allclose(a[numeric].to_numpy(float), b[numeric].to_numpy(float), rtol=rtol, atol=0, equal_nan=True)
+
+def run_golden_suite(write: bool = False) -> bool:
+    """
+    Paridad de las features del modelo sobre datos sintéticos deterministas:
+      1. kernel completo (grafo + finalize) = golden file (bit a bit)
+      2. ruta incremental (estado + caché, con barras nuevas) = cálculo completo
+      3. entrenamiento (load_training_frame) = artefacto de inferencia, sin recalcular
+      4. cada ticker calculado por separado = el mismo ticker en el cálculo conjunto
+    """
+    ok = True
+    rtol = FLOAT32_RTOL if settings.COMPACT_SCHEMA else 0.0
+    with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as incr_dir:
+        engine = _golden_engine(full_dir)
+        _seed_golden_db(engine, GOLDEN_DAYS)
+        build = FeatureBuild(engine, MODEL_FEATURES)
+        reference = finalize_model_frame(build.plan.evaluate(engine, full_rebuild=True), MODEL_FEATURES)
+        if write:
+            os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+            reference.to_parquet(GOLDEN_PATH, index=False)
+            logging.info(f"💾 Golden file escrito: {GOLDEN_PATH} ({reference.shape})")
+        golden = pd.read_parquet(GOLDEN_PATH)
+        checks = {'kernel = golden file': _same(reference, golden)}
+
+        for ticker in GOLDEN_TICKERS:
+            alone = finalize_model_frame(build.plan.evaluate(engine, full_rebuild=True, tickers=[ticker]), MODEL_FEATURES)
+            if not _same(alone, reference[reference['ticker'] == ticker]):
+                checks[f"{ticker} aislado = conjunto"] = False
+        checks.setdefault('tickers aislados = conjunto', True)
+
+        engine.dispose()
+        # Inferencia diaria: primero sin los 20 últimos días, luego llegan y se calculan sobre el estado
+        engine = _golden_engine(incr_dir)
+        _seed_golden_db(engine, GOLDEN_DAYS - 20)
+        first = FeatureBuild(engine, MODEL_FEATURES)
+        build_model_frame(first)
+        _seed_golden_db(engine, GOLDEN_DAYS, first_day=GOLDEN_DAYS - 20)
+        build = FeatureBuild(engine, MODEL_FEATURES)
+        production = expand_frame(build_model_frame(build))
+        checks['incremental = completo'] = _same(production, golden, rtol)
+
+        # Los meses anteriores al empalme son los mismos ficheros del artefacto anterior
+        cache = FeatureArtifactCache()
+        before, after = cache.store(first.key).manifest()['files'], cache.store(build.key).manifest()['files']
+        checks['meses sin cambios reutilizados'] = sum(before[m] == after.get(m) for m in before) == len(before) - 1
+        created = cache.latest()[1]['created_at']
+        training = load_training_frame(engine)
+        checks['entrenamiento = inferencia'] = _same(training, production) and cache.latest()[1]['created_at'] == created
+        engine.dispose()
+
+    for name, passed in checks.items():
+        print(f"   {'✅' if passed else '❌'} {name}")
+        ok &= passed
+    return ok
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ok = run_golden_suite(write='--write-golden' in sys.argv)
+    print("✅ Features del modelo en paridad" if ok else "❌ Paridad de features rota")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,733 @@
+# src/feature_engineering/online_indicators.py
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text, bindparam
+from collections import deque
+import math
+import time
+import json
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.feature_engineering.feature_kernel import (
+    TICKER_FEATURE_COLUMNS, EMA_FAST_SPAN, EMA_SLOW_SPAN, SIGNAL_SPAN, VOLATILITY_WINDOW, initial_state
+)
+from src.feature_engineering.parallel_indicators import INDICATOR_COLUMNS
+
+NAN = float('nan')
+
+# Umbral de TA-Lib para considerar cero una varianza o una suma de ganancias/pérdidas
+TA_EPSILON = 1e-14
+
+# Tolerancia relativa frente a TA-Lib en la comprobación de paridad (ver nota de FMA abajo)
+TALIB_RTOL = 1e-9
+
+# Cada indicador guarda su estado en atributos con __slots__ (sin __dict__ por objeto)
+# y lo serializa como una lista plana de números: state() / load(state).
+# Los de TA-Lib reproducen su semilla (SMA de las primeras barras), su arranque y su
+# orden de operaciones; solo difieren en el último bit cuando la librería C se compiló
+# con FMA (multiplicación-suma fusionada), que Python no expone. Los del kernel de 02
+# son idénticos bit a bit.
+
+def _is_nan(x) -> bool:
+    return x != x
+
+# --- PRIMITIVAS ---
+
+class Ewm:
+    """Media exponencial adjust=False de pandas (recursión del kernel de 02, NaN incluidos)."""
+    __slots__ = ('alpha', 'value', 'weight')
+
+    def __init__(self, span: int):
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self.value = NAN
+        self.weight = 1.0
+
+    def update(self, x: float) -> float:
+        if self.value == self.value:
+            self.weight = self.weight * (1.0 - self.alpha)
+            if x == x:
+                if self.value != x:
+                    self.value = (self.weight * self.value + self.alpha * x) / (self.weight + self.alpha)
+                self.weight = 1.0
+        elif x == x:
+            self.value = x
+            self.weight = 1.0
+        return self.value
+
+    def state(self) -> list:
+        return [self.value, self.weight]
+
+    def load(self, state: list):
+        self.value, self.weight = float(state[0]), float(state[1])
+        return self
+
+class Ema:
+    """EMA de TA-Lib: semilla = SMA de las primeras `period` barras, luego (x - ema) * k + ema."""
+    __slots__ = ('period', 'k', 'value', 'count', 'total')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.value = NAN
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, x: float) -> float:
+        if self.count >= self.period:
+            self.value = ((x - self.value) * self.k) + self.value
+            return self.value
+        if self.count == 0 and _is_nan(x):
+            return NAN
+        self.total += x
+        self.count += 1
+        if self.count == self.period:
+            self.value = self.total / self.period
+            return self.value
+        return NAN
+
+    def state(self) -> list:
+        return [self.value, self.count, self.total]
+
+    def load(self, state: list):
+        self.value, self.count, self.total = float(state[0]), int(state[1]), float(state[2])
+        return self
+
+class Macd:
+    """
+    MACD de TA-Lib. La EMA lenta se siembra con las primeras `slow` barras y la
+    rápida con las últimas `fast` de esas mismas barras; la señal es una EMA de
+    TA-Lib sobre la línea MACD. Las tres salidas empiezan a la vez (barra slow+signal-2).
+    """
+    __slots__ = ('fast_period', 'slow_period', 'k_fast', 'k_slow', 'fast', 'slow', 'signal', 'warmup')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast_period, self.slow_period = fast, slow
+        self.k_fast, self.k_slow = 2.0 / (fast + 1), 2.0 / (slow + 1)
+        self.fast = NAN
+        self.slow = NAN
+        self.signal = Ema(signal)
+        self.warmup = []
+
+    def update(self, x: float):
+        if self.warmup is not None:
+            if not self.warmup and _is_nan(x):
+                return NAN, NAN, NAN
+            self.warmup.append(x)
+            if len(self.warmup) < self.slow_period:
+                return NAN, NAN, NAN
+            slow_total = 0.0
+            for v in self.warmup:
+                slow_total += v
+            fast_total = 0.0
+            for v in self.warmup[self.slow_period - self.fast_period:]:
+                fast_total += v
+            self.slow = slow_total / self.slow_period
+            self.fast = fast_total / self.fast_period
+            self.warmup = None
+        else:
+            self.fast = ((x - self.fast) * self.k_fast) + self.fast
+            self.slow = ((x - self.slow) * self.k_slow) + self.slow
+        macd = self.fast - self.slow
+        signal = self.signal.update(macd)
+        if _is_nan(signal) and self.signal.count < self.signal.period:
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+    def state(self) -> list:
+        return [self.fast, self.slow, *self.signal.state(), self.warmup]
+
+    def load(self, state: list):
+        self.fast, self.slow = float(state[0]), float(state[1])
+        self.signal.load(state[2:5])
+        self.warmup = None if state[5] is None else [float(v) for v in state[5]]
+        return self
+
+class Rsi:
+    """RSI de TA-Lib (suavizado de Wilder sembrado con la media de las primeras `period` diferencias)."""
+    __slots__ = ('period', 'previous', 'gain', 'loss', 'count')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous = NAN
+        self.gain = 0.0
+        self.loss = 0.0
+        self.count = 0
+
+    def _value(self) -> float:
+        total = self.gain + self.loss
+        return 100.0 * (self.gain / total) if not (-TA_EPSILON < total < TA_EPSILON) else 0.0
+
+    def update(self, x: float) -> float:
+        if self.count == 0:
+            if _is_nan(x):
+                return NAN
+            self.previous = x
+            self.count = 1
+            return NAN
+        diff = x - self.previous
+        self.previous = x
+        if self.count <= self.period:
+            if diff < 0:
+                self.loss -= diff
+            else:
+                self.gain += diff
+            self.count += 1
+            if self.count <= self.period:
+                return NAN
+            self.loss /= self.period
+            self.gain /= self.period
+            return self._value()
+        self.loss *= (self.period - 1)
+        self.gain *= (self.period - 1)
+        if diff < 0:
+            self.loss -= diff
+        else:
+            self.gain += diff
+        self.loss /= self.period
+        self.gain /= self.period
+        return self._value()
+
+    def state(self) -> list:
+        return [self.previous, self.gain, self.loss, self.count]
+
+    def load(self, state: list):
+        self.previous, self.gain, self.loss, self.count = float(state[0]), float(state[1]), float(state[2]), int(state[3])
+        return self
+
+class Atr:
+    """ATR de TA-Lib: media simple de los primeros `period` true ranges y luego suavizado de Wilder."""
+    __slots__ = ('period', 'previous_close', 'value', 'total', 'count')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous_close = NAN
+        self.value = NAN
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self.count == 0:
+            if _is_nan(high) or _is_nan(low) or _is_nan(close):
+                return NAN
+            self.previous_close = close
+            self.count = 1
+            return NAN
+        greatest = high - low
+        above = abs(self.previous_close - high)
+        below = abs(self.previous_close - low)
+        if above > greatest:
+            greatest = above
+        if below > greatest:
+            greatest = below
+        self.previous_close = close
+        if self.count <= self.period:
+            self.total += greatest
+            self.count += 1
+            if self.count <= self.period:
+                return NAN
+            self.value = self.total / self.period
+            return self.value
+        self.value = (self.value * (self.period - 1) + greatest) / self.period
+        return self.value
+
+    def state(self) -> list:
+        return [self.previous_close, self.value, self.total, self.count]
+
+    def load(self, state: list):
+        self.previous_close, self.value, self.total, self.count = float(state[0]), float(state[1]), float(state[2]), int(state[3])
+        return self
+
+class Bollinger:
+    """
+    Bandas de Bollinger de TA-Lib (SMA y desviación poblacional): sumas móviles de
+    x y x² que suman la barra nueva, dan el resultado y restan la más antigua.
+    """
+    __slots__ = ('period', 'nbdev', 'ring', 'total', 'total2')
+
+    def __init__(self, period: int = 20, nbdev: float = 2.0):
+        self.period = period
+        self.nbdev = nbdev
+        self.ring = deque(maxlen=period - 1)
+        self.total = 0.0
+        self.total2 = 0.0
+
+    def update(self, x: float):
+        if not self.ring and self.total == 0.0 and _is_nan(x):
+            return NAN, NAN, NAN
+        if len(self.ring) < self.period - 1:
+            self.ring.append(x)
+            self.total += x
+            self.total2 += x * x
+            return NAN, NAN, NAN
+        self.total += x
+        middle = self.total / self.period
+        oldest = self.ring[0]
+        self.total -= oldest
+        self.total2 += x * x
+        mean2 = self.total2 / self.period
+        self.total2 -= oldest * oldest
+        mean2 -= middle * middle
+        std = math.sqrt(mean2) if not mean2 < TA_EPSILON else 0.0
+        self.ring.append(x)
+        band = std * self.nbdev
+        return middle + band, middle, middle - band
+
+    def state(self) -> list:
+        return [self.total, self.total2, list(self.ring)]
+
+    def load(self, state: list):
+        self.total, self.total2 = float(state[0]), float(state[1])
+        self.ring = deque((float(v) for v in state[2]), maxlen=self.period - 1)
+        return self
+
+class RollingStd:
+    """
+    Desviación típica muestral de las últimas `window` observaciones, en dos
+    pasadas sobre la ventana (coste fijo por barra, igual que la volatilidad del kernel).
+    """
+    __slots__ = ('window', 'ring')
+
+    def __init__(self, window: int = VOLATILITY_WINDOW):
+        self.window = window
+        self.ring = deque([NAN] * (window - 1), maxlen=window - 1)
+
+    def update(self, x: float) -> float:
+        values = list(self.ring)
+        values.append(x)
+        self.ring.append(x)
+        total = values[0]
+        for v in values[1:]:
+            total = total + v
+        mean = total / self.window
+        # d * d y no d ** 2: el ** de Python pasa por pow() y no siempre coincide con el cuadrado de numpy
+        d = values[0] - mean
+        squares = d * d
+        for v in values[1:]:
+            d = v - mean
+            squares = squares + d * d
+        return math.sqrt(squares / (self.window - 1)) if squares == squares else NAN
+
+    def state(self) -> list:
+        return list(self.ring)
+
+    def load(self, state: list):
+        self.ring = deque((float(v) for v in state), maxlen=self.window - 1)
+        return self
+
+class Obv:
+    """On-Balance Volume de TA-Lib (arranca con el volumen de la primera barra)."""
+    __slots__ = ('value', 'previous')
+
+    def __init__(self):
+        self.value = NAN
+        self.previous = NAN
+
+    def update(self, close: float, volume: float) -> float:
+        if _is_nan(self.previous) and _is_nan(self.value):
+            if _is_nan(close) or _is_nan(volume):
+                return NAN
+            self.value, self.previous = volume, close
+            return self.value
+        if close > self.previous:
+            self.value += volume
+        elif close < self.previous:
+            self.value -= volume
+        self.previous = close
+        return self.value
+
+    def state(self) -> list:
+        return [self.value, self.previous]
+
+    def load(self, state: list):
+        self.value, self.previous = float(state[0]), float(state[1])
+        return self
+
+# --- CONJUNTOS POR TICKER ---
+
+class OnlineIndicatorSet:
+    """Los indicadores TA-Lib de technical_indicators (INDICATOR_COLUMNS) para un ticker, barra a barra."""
+    __slots__ = ('ema_12', 'ema_26', 'macd', 'rsi', 'bbands', 'obv', 'atr')
+
+    def __init__(self):
+        self.ema_12, self.ema_26 = Ema(12), Ema(26)
+        self.macd = Macd(12, 26, 9)
+        self.rsi = Rsi(14)
+        self.bbands = Bollinger(20, 2.0)
+        self.obv = Obv()
+        self.atr = Atr(14)
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> tuple:
+        """Una barra nueva -> valores en el orden de INDICATOR_COLUMNS."""
+        macd, signal, hist = self.macd.update(close)
+        upper, middle, lower = self.bbands.update(close)
+        return (
+            self.ema_12.update(close), self.ema_26.update(close), macd, signal, hist,
+            self.rsi.update(close), upper, middle, lower,
+            self.obv.update(close, volume), self.atr.update(high, low, close),
+        )
+
+    def warm_start(self, open_, high, low, close, volume):
+        """Recorre un histórico (arrays en orden temporal) para dejar el estado en su última barra."""
+        for row in zip(open_, high, low, close, volume):
+            self.update(*(float(v) for v in row))
+        return self
+
+    def state(self) -> dict:
+        return {name: getattr(self, name).state() for name in self.__slots__}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        indicators = cls()
+        for name in cls.__slots__:
+            getattr(indicators, name).load(state[name])
+        return indicators
+
+class OnlineTickerFeatures:
+    """
+    Las features por ticker de 02 (TICKER_FEATURE_COLUMNS) barra a barra, con
+    el mismo estado que persiste IncrementalFeatureStore: se arranca desde el
+    JSON del almacén y cada barra nueva cuesta O(1).
+    """
+    __slots__ = ('fast', 'slow', 'signal', 'volatility', 'last_close', 'bar_count')
+
+    def __init__(self):
+        self.fast, self.slow, self.signal = Ewm(EMA_FAST_SPAN), Ewm(EMA_SLOW_SPAN), Ewm(SIGNAL_SPAN)
+        self.volatility = RollingStd(VOLATILITY_WINDOW)
+        self.last_close = NAN
+        self.bar_count = 0
+
+    def update(self, close: float) -> dict:
+        ratio = _safe_div(close, self.last_close)
+        # np.log y no math.log: math.log (libm) no coincide bit a bit con el log vectorizado del kernel
+        if ratio > 0:
+            log_return = float(np.log(ratio))
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_return = float(np.log(np.float64(ratio)))
+        self.last_close = close
+        self.bar_count += 1
+        ema_fast = self.fast.update(close)
+        ema_slow = self.slow.update(close)
+        signal = self.signal.update(ema_fast - ema_slow)
+        macd = ema_fast - ema_slow
+        return {
+            'ema_26': ema_slow,
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_hist': macd - signal,
+            'log_return': log_return,
+            'volatility_7d': self.volatility.update(log_return),
+            'price_to_ema_ratio': _safe_div(close, ema_slow) - 1,
+            'macd_norm': _safe_div(macd, close),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """Desde un estado de IncrementalFeatureStore / feature_kernel."""
+        features = cls()
+        features.last_close = float(state['last_close'])
+        features.fast.load([state['ema_fast'], state['ema_fast_wt']])
+        features.slow.load([state['ema_slow'], state['ema_slow_wt']])
+        features.signal.load([state['signal'], state['signal_wt']])
+        features.volatility.load(state['return_tail'])
+        features.bar_count = int(state['bar_count'])
+        return features
+
+    def state(self) -> dict:
+        state = initial_state()
+        state.update({
+            'last_close': self.last_close,
+            'ema_fast': self.fast.value, 'ema_fast_wt': self.fast.weight,
+            'ema_slow': self.slow.value, 'ema_slow_wt': self.slow.weight,
+            'signal': self.signal.value, 'signal_wt': self.signal.weight,
+            'return_tail': list(self.volatility.ring),
+            'bar_count': self.bar_count,
+        })
+        return state
+
+def _safe_div(a: float, b: float) -> float:
+    """División con la semántica de numpy (inf/NaN en vez de ZeroDivisionError)."""
+    if b:
+        return a / b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / b)
+
+# --- FLUJO EN VIVO ---
+
+class LiveFeatureStream:
+    """
+    Mantiene, por ticker, las features de 02 y los indicadores TA-Lib al día con
+    cada barra que llega. Se arranca desde el estado del almacén incremental
+    (features de 02) y recorriendo el histórico de OHLCV (indicadores TA-Lib).
+
+    Las dos familias consumen la misma secuencia de barras: las filas de
+    asset_metrics en orden, que es lo que cuenta el almacén (`bar_count`).
+    `indicator_bars` lleva la cuenta del lado TA-Lib y `misaligned()` dice qué
+    tickers no terminan en la misma barra en ambos lados.
+
+    Es la pieza para un consumidor de barras en vivo; el pipeline batch (02,
+    technical_indicators) sigue con sus kernels vectorizados y solo comparte con
+    esta clase el formato del estado, cuya equivalencia comprueba `--parity`.
+    """
+
+    def __init__(self):
+        self.features = {}
+        self.indicators = {}
+        self.indicator_bars = {}
+
+    @classmethod
+    def warm_start(cls, engine, store=None, tickers: list = None):
+        """
+        Features de 02 desde el estado del almacén más las barras posteriores a su
+        `last_raw_timestamp` (el almacén se pone al día cuando corre 02, no en
+        cada barra); indicadores TA-Lib recorriendo el histórico completo. Si el
+        histórico cambió por detrás del estado, las features se recorren desde el
+        principio, como haría el almacén.
+        """
+        from src.feature_engineering.incremental_features import IncrementalFeatureStore
+        store = store or IncrementalFeatureStore()
+        states = store.states()
+        stream = cls()
+        selected = sorted(states if tickers is None else tickers)
+        for ticker in selected:
+            if ticker in states:
+                stream.features[ticker] = OnlineTickerFeatures.from_state(states[ticker])
+        if not selected:
+            return stream
+        query = text(
+            "SELECT ticker, timestamp, open, high, low, close, volume FROM asset_metrics "
+            "WHERE ticker IN :tickers ORDER BY ticker, timestamp"
+        ).bindparams(bindparam('tickers', expanding=True))
+        bars = pd.read_sql(query, engine, params={'tickers': selected})
+        bars['timestamp'] = pd.to_datetime(bars['timestamp'], utc=True)
+        replayed = 0
+        for ticker, group in bars.groupby('ticker', sort=False):
+            close = group['close'].to_numpy(dtype=float)
+            state = states.get(ticker)
+            if state is None:
+                features, pending = OnlineTickerFeatures(), close
+            else:
+                newer = (group['timestamp'] > pd.Timestamp(state['last_raw_timestamp'])).to_numpy()
+                if state['bar_count'] + newer.sum() == len(group):
+                    features, pending = stream.features[ticker], close[newer]
+                else:
+                    logging.warning(f" -> {ticker}: el histórico cambió por detrás del estado del almacén. Se recorre completo.")
+                    features, pending = OnlineTickerFeatures(), close
+            for value in pending:
+                features.update(float(value))
+            replayed += len(pending)
+            stream.features[ticker] = features
+            stream.indicators[ticker] = OnlineIndicatorSet().warm_start(
+                *(group[col].to_numpy(dtype=float) for col in ['open', 'high', 'low', 'close', 'volume'])
+            )
+            stream.indicator_bars[ticker] = len(group)
+        misaligned = stream.misaligned()
+        if misaligned:
+            logging.error(f"❌ Features de 02 e indicadores no terminan en la misma barra: {misaligned}")
+        logging.info(f"🔌 Flujo en vivo arrancado para {len(stream.features)} tickers ({replayed} barras posteriores al almacén).")
+        return stream
+
+    def misaligned(self) -> list:
+        """Tickers con ambas familias cuya última barra no es la misma (distinto número de barras)."""
+        return sorted(
+            ticker for ticker in set(self.features) & set(self.indicators)
+            if self.features[ticker].bar_count != self.indicator_bars.get(ticker)
+        )
+
+    def on_bar(self, ticker: str, open_: float, high: float, low: float, close: float, volume: float):
+        """
+        Consume una barra nueva del ticker. Devuelve (features de 02, indicadores
+        TA-Lib) como dos dicts: ambas familias tienen ema_26/macd/macd_signal/macd_hist
+        con semánticas distintas (pandas adjust=False frente a la semilla SMA de TA-Lib).
+        """
+        # Un ticker puede tener estado de 02 sin barras en asset_metrics (o al revés)
+        if ticker not in self.features:
+            self.features[ticker] = OnlineTickerFeatures()
+        if ticker not in self.indicators:
+            self.indicators[ticker] = OnlineIndicatorSet()
+            self.indicator_bars[ticker] = 0
+        features = self.features[ticker].update(close)
+        indicators = dict(zip(INDICATOR_COLUMNS, self.indicators[ticker].update(open_, high, low, close, volume)))
+        self.indicator_bars[ticker] += 1
+        return features, indicators
+
+    def snapshot(self) -> str:
+        """Estado completo en JSON compacto (se recupera con `restore`)."""
+        snapshot = {}
+        for ticker in sorted(set(self.features) | set(self.indicators)):
+            entry = snapshot[ticker] = {}
+            if ticker in self.features:
+                entry['features'] = self.features[ticker].state()
+            if ticker in self.indicators:
+                entry['indicators'] = self.indicators[ticker].state()
+                entry['indicator_bars'] = self.indicator_bars[ticker]
+        return json.dumps(snapshot, separators=(',', ':'))
+
+    @classmethod
+    def restore(cls, snapshot: str):
+        """Flujo con el estado de un `snapshot()` anterior, sin releer la base de datos."""
+        stream = cls()
+        for ticker, entry in json.loads(snapshot).items():
+            if 'features' in entry:
+                stream.features[ticker] = OnlineTickerFeatures.from_state(entry['features'])
+            if 'indicators' in entry:
+                stream.indicators[ticker] = OnlineIndicatorSet.from_state(entry['indicators'])
+                stream.indicator_bars[ticker] = entry['indicator_bars']
+        return stream
+
+# --- PARIDAD Y BENCHMARK ---
+
+def _synthetic_ohlcv(n_bars: int, seed: int = 0, leading_nan: int = 3) -> dict:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    spread = np.abs(rng.normal(0, 0.01, n_bars)) * close
+    bars = {
+        'open': close * (1 + rng.normal(0, 0.002, n_bars)), 'high': close + spread, 'low': close - spread,
+        'close': close, 'volume': rng.integers(1, 10_000, n_bars).astype(float),
+    }
+    for values in bars.values():
+        values[:leading_nan] = np.nan
+    return bars
+
+def check_parity(n_bars: int = 600, seeds=range(5)) -> bool:
+    """
+    Compara OnlineIndicatorSet frente a TA-Lib (compute_indicator_block, mismas
+    barras de arranque y error relativo <= TALIB_RTOL) y OnlineTickerFeatures
+    frente al kernel de 02 (bit a bit), con una serialización del estado a JSON
+    a mitad de la serie.
+    """
+    from src.feature_engineering.parallel_indicators import compute_indicator_block
+    from src.feature_engineering.incremental_features import compute_ticker_features
+    ok = True
+    for seed in seeds:
+        bars = _synthetic_ohlcv(n_bars, seed)
+        o, h, l, c, v = (bars[k] for k in ['open', 'high', 'low', 'close', 'volume'])
+        cut = n_bars // 2
+
+        reference = compute_indicator_block(o, h, l, c, v)
+        indicators = OnlineIndicatorSet()
+        rows = [indicators.update(*map(float, row)) for row in zip(o[:cut], h[:cut], l[:cut], c[:cut], v[:cut])]
+        indicators = OnlineIndicatorSet.from_state(json.loads(json.dumps(indicators.state())))
+        rows += [indicators.update(*map(float, row)) for row in zip(o[cut:], h[cut:], l[cut:], c[cut:], v[cut:])]
+        online = np.array(rows).T
+        for i, col in enumerate(INDICATOR_COLUMNS):
+            same_warmup = np.array_equal(np.isnan(reference[i]), np.isnan(online[i]))
+            if not same_warmup or not np.allclose(reference[i], online[i], rtol=TALIB_RTOL, atol=0, equal_nan=True):
+                diff = np.nanmax(np.abs(reference[i] - online[i]))
+                logging.error(f"❌ seed {seed}: '{col}' difiere de TA-Lib (máx. {diff:.3e})")
+                ok = False
+
+        kernel, kernel_state = compute_ticker_features(c)
+        features = OnlineTickerFeatures()
+        rows = [features.update(float(x)) for x in c[:cut]]
+        features = OnlineTickerFeatures.from_state(json.loads(json.dumps(features.state())))
+        rows += [features.update(float(x)) for x in c[cut:]]
+        for col in TICKER_FEATURE_COLUMNS:
+            if not np.array_equal(kernel[col], np.array([r[col] for r in rows]), equal_nan=True):
+                logging.error(f"❌ seed {seed}: '{col}' difiere del kernel de 02")
+                ok = False
+        if json.dumps(features.state()) != json.dumps({**kernel_state, 'last_raw_timestamp': None}):
+            logging.error(f"❌ seed {seed}: el estado final difiere del kernel de 02")
+            ok = False
+
+        # El flujo en vivo restaurado desde su snapshot sigue igual que sin interrumpir
+        stream, resumed = LiveFeatureStream(), None
+        outputs, resumed_outputs = [], []
+        for i, row in enumerate(zip(o, h, l, c, v)):
+            if i == cut:
+                resumed = LiveFeatureStream.restore(stream.snapshot())
+            outputs.append(stream.on_bar('T', *map(float, row)))
+            if resumed is not None:
+                resumed_outputs.append(resumed.on_bar('T', *map(float, row)))
+        if json.dumps(outputs[cut:]) != json.dumps(resumed_outputs) or stream.snapshot() != resumed.snapshot():
+            logging.error(f"❌ seed {seed}: LiveFeatureStream.restore no recupera el snapshot")
+            ok = False
+    return ok
+
+def check_warm_start(n_bars: int = 300, seeds=range(2)) -> bool:
+    """
+    Arranque en vivo sobre una base embebida temporal: el almacén incremental se
+    actualiza con dos tercios de la historia y llegan más barras (una de ellas
+    intradía, segunda fila del mismo día) antes de `warm_start`. Ambas familias
+    deben terminar en la misma barra y con el mismo estado que recorrer toda la
+    historia de una vez.
+    """
+    import tempfile
+    from src.config import settings
+    from src.utils.db_connector import create_db_engine
+    from src.utils.db_streaming import BulkCopyWriter
+    from src.feature_engineering.incremental_features import IncrementalFeatureStore, compute_ticker_features
+    ok = True
+    with tempfile.TemporaryDirectory() as workdir:
+        settings.DB_BACKEND = 'duckdb'
+        settings.EMBEDDED_DB_PATH = os.path.join(workdir, 'warm_start.duckdb')
+        engine = create_db_engine()
+        frames = []
+        for seed in seeds:
+            bars = pd.DataFrame(_synthetic_ohlcv(n_bars, seed, leading_nan=0))
+            bars.insert(0, 'timestamp', pd.date_range('2024-01-01', periods=n_bars, freq='D', tz='UTC'))
+            bars.insert(0, 'ticker', f"T{seed}")
+            frames.append(bars)
+        bars = pd.concat(frames, ignore_index=True)
+        extra = bars[bars['ticker'] == 'T0'].iloc[[-5]].assign(timestamp=lambda df: df['timestamp'] + pd.Timedelta(hours=12))
+        bars = pd.concat([bars, extra]).sort_values(['ticker', 'timestamp'], kind='mergesort').reset_index(drop=True)
+        cut = bars['timestamp'] < bars['timestamp'].min() + pd.Timedelta(days=2 * n_bars // 3)
+        store = IncrementalFeatureStore(os.path.join(workdir, 'feature_state'))
+        for i, part in enumerate([bars[cut], bars[~cut]]):
+            with engine.begin() as connection:
+                BulkCopyWriter(connection, 'asset_metrics', list(part.columns)).write(part)
+            if i == 0:
+                # El almacén se queda en la primera parte: el resto llega después de 02
+                store.update(engine)
+        stream = LiveFeatureStream.warm_start(engine, store)
+        engine.dispose()
+
+    if stream.misaligned():
+        logging.error(f"❌ warm_start: features e indicadores en barras distintas {stream.misaligned()}")
+        ok = False
+    for ticker, group in bars.groupby('ticker'):
+        _, kernel_state = compute_ticker_features(group['close'].to_numpy(dtype=float))
+        if json.dumps(stream.features[ticker].state()) != json.dumps({**kernel_state, 'last_raw_timestamp': None}):
+            logging.error(f"❌ warm_start {ticker}: las features de 02 no llegan a la última barra")
+            ok = False
+        reference = OnlineIndicatorSet().warm_start(*(group[col].to_numpy(dtype=float) for col in ['open', 'high', 'low', 'close', 'volume']))
+        if json.dumps(stream.indicators[ticker].state()) != json.dumps(reference.state()) or stream.indicator_bars[ticker] != len(group):
+            logging.error(f"❌ warm_start {ticker}: los indicadores no llegan a la última barra")
+            ok = False
+    return ok
+
+def run_benchmark(n_bars: int = 20_000):
+    bars = _synthetic_ohlcv(n_bars, leading_nan=0)
+    rows = list(zip(*(bars[k].tolist() for k in ['open', 'high', 'low', 'close', 'volume'])))
+    indicators, features = OnlineIndicatorSet(), OnlineTickerFeatures()
+    start = time.perf_counter()
+    for row in rows:
+        indicators.update(*row)
+    per_bar_ta = (time.perf_counter() - start) / n_bars * 1e6
+    start = time.perf_counter()
+    for row in rows:
+        features.update(row[3])
+    per_bar_kernel = (time.perf_counter() - start) / n_bars * 1e6
+    state_bytes = len(json.dumps({'features': features.state(), 'indicators': indicators.state()}, separators=(',', ':')))
+    print(f"⚡ {n_bars:,} barras en vivo")
+    print(f"   indicadores TA-Lib (11 columnas): {per_bar_ta:6.1f} µs/barra")
+    print(f"   features de 02 (8 columnas):      {per_bar_kernel:6.1f} µs/barra")
+    print(f"   estado serializado por ticker:    {state_bytes} bytes")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--parity' in sys.argv:
+        ok = check_parity()
+        print("✅ Paridad online = batch" if ok else "❌ Paridad online rota")
+        aligned = check_warm_start()
+        print("✅ warm_start: features e indicadores en la misma barra" if aligned else "❌ warm_start desalineado")
+        ok &= aligned
+        sys.exit(0 if ok else 1)
+    run_benchmark()
@@ -0,0 +1,358 @@
+# src/feature_engineering/rolling_correlation.py
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text
+import tempfile
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+
+class RollingCorrelationEngine:
+    """
+    Covarianzas móviles de los retornos diarios de todos los pares de activos.
+
+    Se guardan, para cada par (i, j) y sobre los días de la ventana en que ambos
+    tienen retorno, el número de días y las sumas de x_i, x_i² y x_i·x_j (matrices
+    N x N). Cada día nuevo suma su producto exterior y resta el del día que sale
+    de la ventana: O(N²) por día en vez de O(N²·W). Cada `refresh_every` días las
+    sumas se recalculan desde los retornos de la ventana para que no acumulen
+    error de redondeo.
+
+    Los retornos son pct_change del cierre diario, como en AnalyticsService; un
+    activo sin dato un día no cuenta en los pares de ese día (correlación por
+    pares, como DataFrame.corr).
+
+    El último día sincronizado es provisional (su cierre diario puede cambiar
+    con barras que llegan más tarde, como en MarketRegimeBuilder): `sync` lo
+    deshace con `pop` y lo vuelve a añadir con los datos actuales.
+    """
+
+    SUMS = ['count', 'sum_x', 'sum_xx', 'sum_xy']
+
+    def __init__(self, window: int = None, min_periods: int = None, state_dir: str = None, refresh_every: int = None):
+        self.window = window or settings.CORRELATION_WINDOW
+        self.min_periods = min_periods or settings.CORRELATION_MIN_PERIODS
+        self.refresh_every = refresh_every or self.window
+        self.state_dir = state_dir or settings.CORRELATION_STATE_DIR
+        self.state_path = os.path.join(self.state_dir, f"correlation_state_w{self.window}.npz")
+        self.tickers = []
+        self.dates = []
+        self.returns = np.empty((0, 0))
+        self.last_close = np.empty(0)
+        self.sums = {name: np.zeros((0, 0)) for name in self.SUMS}
+        self.pushes_since_refresh = 0
+        self.provisional = False
+        # Lo necesario para deshacer el último push: fila y fecha que salieron de la
+        # ventana (o None), último cierre conocido y contador de refresco anteriores
+        self._undo = None
+
+    # --- Universo de activos ---
+
+    def _ensure_tickers(self, tickers: list):
+        new = [t for t in tickers if t not in self._index]
+        if not new:
+            return
+        n_old, n_new = len(self.tickers), len(self.tickers) + len(new)
+        self.tickers = self.tickers + new
+        self._index.update({t: n_old + k for k, t in enumerate(new)})
+        self.returns = np.hstack([self.returns, np.full((len(self.returns), len(new)), np.nan)])
+        self.last_close = np.concatenate([self.last_close, np.full(len(new), np.nan)])
+        for name, matrix in self.sums.items():
+            grown = np.zeros((n_new, n_new))
+            grown[:n_old, :n_old] = matrix
+            self.sums[name] = grown
+
+    @property
+    def _index(self) -> dict:
+        if not hasattr(self, '_ticker_index') or len(self._ticker_index) != len(self.tickers):
+            self._ticker_index = {t: k for k, t in enumerate(self.tickers)}
+        return self._ticker_index
+
+    # --- Actualización ---
+
+    @staticmethod
+    def _outer_sums(returns: np.ndarray) -> dict:
+        """Sumas por pares de un bloque de días (filas) de retornos con NaN."""
+        present = (returns == returns).astype(np.float64)
+        values = np.where(present > 0, returns, 0.0)
+        return {
+            'count': present.T @ present,
+            'sum_x': values.T @ present,
+            'sum_xx': (values * values).T @ present,
+            'sum_xy': values.T @ values,
+        }
+
+    def _apply(self, rows: np.ndarray, signs: np.ndarray):
+        """Suma (signo +1) o resta (-1) de las sumas los días de `rows` con un producto de rango bajo."""
+        present = (rows == rows).astype(np.float64)
+        values = np.where(present > 0, rows, 0.0)
+        weighted_present = present * signs[:, None]
+        weighted_values = values * signs[:, None]
+        self.sums['count'] += present.T @ weighted_present
+        self.sums['sum_x'] += values.T @ weighted_present
+        self.sums['sum_xx'] += (values * values).T @ weighted_present
+        self.sums['sum_xy'] += values.T @ weighted_values
+
+    def refresh(self):
+        """Recalcula las sumas exactas desde los retornos de la ventana."""
+        n = len(self.tickers)
+        self.sums = self._outer_sums(self.returns) if len(self.returns) else {name: np.zeros((n, n)) for name in self.SUMS}
+        self.pushes_since_refresh = 0
+
+    def push(self, date, closes: pd.Series):
+        """Añade un día: `closes` es el cierre de cada ticker (índice = ticker) en `date`."""
+        closes = closes.dropna()
+        self._ensure_tickers(list(closes.index))
+        full = len(self.returns) == self.window
+        self._undo = {
+            'evicted': self.returns[0].copy() if full else None,
+            'evicted_date': self.dates[0] if full else None,
+            'last_close': self.last_close.copy(),
+            'pushes_since_refresh': self.pushes_since_refresh,
+        }
+        close = np.full(len(self.tickers), np.nan)
+        close[[self._index[t] for t in closes.index]] = closes.to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row = close / self.last_close - 1
+        self.last_close = np.where(close == close, close, self.last_close)
+
+        if full:
+            # Entra el día nuevo y sale el más antiguo en una sola actualización
+            self._apply(np.vstack([row, self.returns[0]]), np.array([1.0, -1.0]))
+            self.returns = self.returns[1:]
+            self.dates = self.dates[1:]
+        else:
+            self._apply(row[None, :], np.array([1.0]))
+        self.returns = np.vstack([self.returns, row[None, :]])
+        self.dates.append(pd.Timestamp(date).date().isoformat())
+        self.pushes_since_refresh += 1
+        if self.pushes_since_refresh >= self.refresh_every:
+            self.refresh()
+
+    def pop(self):
+        """Deshace el último push (solo uno: el estado para deshacer no se encadena)."""
+        if self._undo is None:
+            raise ValueError("no hay un push que deshacer")
+        undo, self._undo = self._undo, None
+        row = self.returns[-1]
+        if undo['evicted'] is not None:
+            # Sale el día deshecho y vuelve el que había salido de la ventana
+            self._apply(np.vstack([undo['evicted'], row]), np.array([1.0, -1.0]))
+            self.returns = np.vstack([undo['evicted'][None, :], self.returns[:-1]])
+            self.dates = [undo['evicted_date']] + self.dates[:-1]
+        else:
+            self._apply(row[None, :], np.array([-1.0]))
+            self.returns = self.returns[:-1]
+            self.dates = self.dates[:-1]
+        self.last_close = undo['last_close']
+        self.pushes_since_refresh = undo['pushes_since_refresh']
+        self.provisional = False
+
+    def sync(self, engine) -> int:
+        """
+        Lee de asset_metrics el día provisional y los posteriores y los añade
+        (el provisional se deshace antes). Devuelve cuántos días se añadieron.
+        """
+        with engine.connect() as connection:
+            last_ts = connection.execute(text("SELECT MAX(timestamp) FROM asset_metrics")).scalar()
+        if last_ts is None:
+            return 0
+        last_day = pd.Timestamp(last_ts)
+        if last_day.tzinfo is not None:
+            last_day = last_day.tz_convert('UTC').tz_localize(None)
+        last_day = last_day.normalize()
+        if self.dates:
+            since = pd.Timestamp(self.dates[-1])
+            if not self.provisional:
+                since += pd.Timedelta(days=1)
+        else:
+            # Primer arranque: la ventana más el día previo (para el primer retorno)
+            since = last_day - pd.Timedelta(days=self.window)
+        if since > last_day:
+            return 0
+        query = text("SELECT ticker, timestamp, close FROM asset_metrics WHERE timestamp >= :since ORDER BY timestamp")
+        bars = pd.read_sql(query, engine, params={'since': since.to_pydatetime()})
+        if bars.empty:
+            return 0
+        bars['date'] = pd.to_datetime(bars['timestamp'], utc=True).dt.tz_localize(None).dt.normalize()
+        # Una barra por ticker y día (la última), como el resto del pipeline diario
+        daily = bars.drop_duplicates(subset=['ticker', 'date'], keep='last')
+        closes = daily.pivot(index='date', columns='ticker', values='close').sort_index()
+        if self.provisional:
+            self.pop()
+        for date, row in closes.iterrows():
+            self.push(date, row)
+        self.provisional = True
+        return len(closes)
+
+    # --- Consultas ---
+
+    def _moments(self):
+        count, sum_x, sum_xx, sum_xy = (self.sums[name] for name in self.SUMS)
+        cov = count * sum_xy - sum_x * sum_x.T
+        var = count * sum_xx - sum_x * sum_x
+        return count, cov, var
+
+    def _frame(self, matrix: np.ndarray, tickers: list = None) -> pd.DataFrame:
+        df = pd.DataFrame(matrix, index=self.tickers, columns=self.tickers)
+        if tickers is not None:
+            tickers = [t for t in tickers if t in self._index]
+            df = df.loc[tickers, tickers]
+        return df
+
+    def correlation_matrix(self, tickers: list = None) -> pd.DataFrame:
+        count, cov, var = self._moments()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+        corr[count < self.min_periods] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(count) >= self.min_periods, 1.0, np.nan))
+        return self._frame(corr, tickers)
+
+    def beta_matrix(self, tickers: list = None) -> pd.DataFrame:
+        """beta[i, j] = cov(i, j) / var(j): sensibilidad de i a j (fila sobre columna)."""
+        count, cov, var = self._moments()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = cov / var.T
+        beta[count < self.min_periods] = np.nan
+        return self._frame(beta, tickers)
+
+    def edges(self, threshold: float = None) -> pd.DataFrame:
+        """
+        Aristas del grafo de activos (ticker_a < ticker_b, como gnn_correlations):
+        pares con |correlación| >= `threshold`, con su correlación, las dos betas
+        y los días en común.
+        """
+        threshold = settings.CORRELATION_EDGE_THRESHOLD if threshold is None else threshold
+        corr = self.correlation_matrix().to_numpy()
+        beta = self.beta_matrix().to_numpy()
+        names = np.array(self.tickers)
+        a, b = np.nonzero(names[:, None] < names[None, :])
+        keep = np.abs(corr[a, b]) >= threshold
+        a, b = a[keep], b[keep]
+        return pd.DataFrame({
+            'ticker_a': names[a], 'ticker_b': names[b], 'correlation': corr[a, b],
+            'beta_a_b': beta[a, b], 'beta_b_a': beta[b, a], 'overlap_days': self.sums['count'][a, b].astype(int),
+            'date': self.dates[-1] if self.dates else None,
+        })
+
+    # --- Persistencia ---
+
+    def save(self):
+        """Escribe en un temporal único del mismo directorio y lo mueve encima (atómico, sin carreras entre procesos)."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f, tickers=np.array(self.tickers, dtype=str), dates=np.array(self.dates, dtype=str),
+                    returns=self.returns, last_close=self.last_close,
+                    pushes_since_refresh=np.array(self.pushes_since_refresh), **self.sums, **self._undo_arrays()
+                )
+            os.replace(tmp_path, self.state_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _undo_arrays(self) -> dict:
+        if not self.provisional or self._undo is None:
+            return {}
+        undo = self._undo
+        return {
+            'undo_evicted': np.empty(0) if undo['evicted'] is None else undo['evicted'],
+            'undo_evicted_date': np.array('' if undo['evicted_date'] is None else undo['evicted_date']),
+            'undo_last_close': undo['last_close'],
+            'undo_pushes_since_refresh': np.array(undo['pushes_since_refresh']),
+        }
+
+    @classmethod
+    def load(cls, **kwargs):
+        engine = cls(**kwargs)
+        if not os.path.exists(engine.state_path):
+            return engine
+        with np.load(engine.state_path) as data:
+            engine.tickers = data['tickers'].tolist()
+            engine.dates = data['dates'].tolist()
+            engine.returns = data['returns'].reshape(len(engine.dates), len(engine.tickers))
+            engine.last_close = data['last_close']
+            engine.sums = {name: data[name] for name in cls.SUMS}
+            engine.pushes_since_refresh = int(data['pushes_since_refresh'])
+            if 'undo_last_close' in data.files:
+                evicted = data['undo_evicted']
+                engine._undo = {
+                    'evicted': evicted if len(evicted) else None,
+                    'evicted_date': str(data['undo_evicted_date']) or None,
+                    'last_close': data['undo_last_close'],
+                    'pushes_since_refresh': int(data['undo_pushes_since_refresh']),
+                }
+                engine.provisional = True
+        return engine
+
+def refresh_correlations(engine) -> RollingCorrelationEngine:
+    """
+    Carga el estado, añade los días nuevos de asset_metrics y lo guarda. Lo
+    ejecuta el pipeline (correlation_sync_task); la API solo lee el estado con load().
+    """
+    correlations = RollingCorrelationEngine.load()
+    added = correlations.sync(engine)
+    if added:
+        correlations.save()
+        logging.info(f"🔗 Correlaciones móviles: {added} días hasta {correlations.dates[-1]} (provisional), {len(correlations.tickers)} activos (ventana {correlations.window}).")
+    return correlations
+
+# --- BENCHMARK ---
+
+def run_benchmark(n_tickers: int = 300, n_days: int = 200, window: int = 30, seed: int = 0):
+    """Actualización incremental frente a recalcular `pct_change().corr()` cada día, y paridad con pandas."""
+    import tempfile
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=n_days, freq='D')
+    market = rng.normal(0, 0.03, n_days)[:, None]
+    close = 100 * np.exp(np.cumsum(market + rng.normal(0, 0.02, (n_days, n_tickers)), axis=0))
+    close[rng.random(close.shape) < 0.02] = np.nan
+    closes = pd.DataFrame(close, index=dates, columns=[f"T{i:04d}" for i in range(n_tickers)])
+    print(f"📊 {n_tickers} activos, {n_days} días, ventana {window}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        correlations = RollingCorrelationEngine(window=window, min_periods=10, state_dir=tmp)
+        start = time.perf_counter()
+        for date, row in closes.iterrows():
+            correlations.push(date, row)
+        t_incremental = (time.perf_counter() - start) / n_days
+
+        # Mismo retorno que el motor: un día sin dato no tiene retorno y el siguiente cubre el hueco
+        returns = closes.ffill().pct_change(fill_method=None).where(closes.notna())
+        start = time.perf_counter()
+        for i in range(window, n_days + 1):
+            reference = returns.iloc[max(1, i - window):i].corr(min_periods=10)
+        t_recompute = (time.perf_counter() - start) / (n_days - window + 1)
+        reference = returns.iloc[-window:].corr(min_periods=10)
+
+        ours = correlations.correlation_matrix(list(closes.columns))
+        diff = np.nanmax(np.abs(ours.to_numpy() - reference.to_numpy()))
+        same_mask = np.array_equal(np.isnan(ours.to_numpy()), np.isnan(reference.to_numpy()))
+        print(f"   por día: incremental {t_incremental * 1e3:7.2f} ms | recálculo pandas {t_recompute * 1e3:7.2f} ms "
+              f"({t_recompute / t_incremental:.1f}x)")
+        print(f"   frente a pandas .corr(): máx |dif| {diff:.2e}, mismos NaN: {same_mask}")
+
+        correlations.save()
+        restored = RollingCorrelationEngine.load(window=window, min_periods=10, state_dir=tmp)
+        print(f"   estado restaurado idéntico: {restored.correlation_matrix(list(closes.columns)).equals(ours)} "
+              f"({os.path.getsize(restored.state_path) / 1e6:.1f} MB)")
+        print(f"   aristas |corr| >= 0.3: {len(correlations.edges(0.3)):,}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--sync' in sys.argv:
+        from src.utils.db_connector import create_db_engine
+        refresh_correlations(create_db_engine())
+    else:
+        run_benchmark()
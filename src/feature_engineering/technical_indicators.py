@@ -1,7 +1,6 @@
 # src/feature_engineering/technical_indicators.py
 
 import pandas as pd
-import talib
 from sqlalchemy import text
 import sys, os
 
@@ -9,31 +8,62 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path: sys.path.insert(0, project_root)
 
 from src.utils.db_connector import create_db_engine
+from src.utils.db_streaming import iter_ticker_frames, BulkCopyWriter
+from src.feature_engineering.parallel_indicators import (
+    ParallelIndicatorEngine, compute_indicator_block, INPUT_COLUMNS, INDICATOR_COLUMNS
+)
+
+# Filas que se acumulan (varios tickers) antes de mandarlas al pool en modo streaming
+STREAMING_BATCH_ROWS = 250_000
+
+FEATURE_COLUMNS = [
+    'ticker', 'timestamp', 'ema_12', 'ema_26', 'macd', 'macd_signal',
+    'macd_hist', 'rsi_14', 'bb_upper', 'bb_middle', 'bb_lower', 'obv', 'atr_14'
+]
 
 def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula un conjunto de indicadores técnicos usando TA-Lib en un DataFrame de un solo ticker.
     """
-    df_out = df.copy().set_index('timestamp')
+    block = compute_indicator_block(*(df[col].to_numpy(dtype='float64') for col in INPUT_COLUMNS))
+    df_out = df.copy()
+    for i, col in enumerate(INDICATOR_COLUMNS):
+        df_out[col] = block[i]
+    return df_out
 
-    # Medias Móviles y MACD
-    df_out['ema_12'] = talib.EMA(df_out['close'], timeperiod=12)
-    df_out['ema_26'] = talib.EMA(df_out['close'], timeperiod=26)
-    df_out['macd'], df_out['macd_signal'], df_out['macd_hist'] = talib.MACD(df_out['close'], fastperiod=12, slowperiod=26, signalperiod=9)
-    
-    # RSI
-    df_out['rsi_14'] = talib.RSI(df_out['close'], timeperiod=14)
-    
-    # Bandas de Bollinger
-    df_out['bb_upper'], df_out['bb_middle'], df_out['bb_lower'] = talib.BBANDS(df_out['close'], timeperiod=20)
-    
-    # Indicadores de Volumen y Volatilidad
-    df_out['obv'] = talib.OBV(df_out['close'], df_out['volume'].astype(float))
-    df_out['atr_14'] = talib.ATR(df_out['high'], df_out['low'], df_out['close'], timeperiod=14)
-    
-    return df_out.reset_index()
+def _generate_technical_features_streaming(engine, table_name):
+    """
+    Modo streaming: lee 'asset_metrics' ticker a ticker con un cursor de servidor,
+    agrupa tickers en lotes de ~STREAMING_BATCH_ROWS filas, calcula cada lote en
+    el pool de procesos y lo envía directamente con COPY.
+    La memoria queda acotada por el tamaño del lote, no por el del universo.
+    """
+    sql_query = "SELECT ticker, timestamp, open, high, low, close, volume FROM asset_metrics ORDER BY ticker, timestamp"
+
+    with engine.connect() as connection, ParallelIndicatorEngine() as indicator_engine:
+        with connection.begin() as transaction:
+            connection.execute(text(f"TRUNCATE TABLE {table_name};"))
+            writer = BulkCopyWriter(connection, table_name, FEATURE_COLUMNS)
+            tickers_done = 0
 
-def generate_technical_features():
+            def flush(batch):
+                indicators_df = indicator_engine.compute(pd.concat(batch, ignore_index=True)).dropna()
+                indicators_df['obv'] = indicators_df['obv'].astype('int64')
+                writer.write(indicators_df)
+
+            batch, batch_rows = [], 0
+            for ticker, ticker_df in iter_ticker_frames(engine, sql_query):
+                batch.append(ticker_df)
+                batch_rows += len(ticker_df)
+                tickers_done += 1
+                if batch_rows >= STREAMING_BATCH_ROWS:
+                    flush(batch)
+                    batch, batch_rows = [], 0
+            if batch:
+                flush(batch)
+            print(f"  -> {tickers_done} ticker(s) procesados; {writer.rows_written} registros guardados en '{table_name}'.")
+
+def generate_technical_features(streaming: bool = True):
     """
     Carga los datos de mercado, calcula indicadores técnicos para cada activo
     y los guarda en la tabla 'technical_indicators'.
@@ -44,6 +74,14 @@ def generate_technical_features():
     engine = create_db_engine()
     if not engine: return
 
+    if streaming:
+        try:
+            _generate_technical_features_streaming(engine, table_name)
+            print(f"[TAREA COMPLETADA]: Generación de '{table_name}' finalizada.")
+        except Exception as e:
+            print(f"[ERROR EN TAREA]: Falló la generación de indicadores técnicos. Error: {e}")
+        return
+
     try:
         sql_query = "SELECT * FROM asset_metrics ORDER BY ticker, timestamp;"
         market_data_df = pd.read_sql(sql_query, engine)
@@ -54,16 +92,13 @@ def generate_technical_features():
 
         print(f"  -> Procesando {market_data_df['ticker'].nunique()} ticker(s)...")
         
-        # Agrupamos por ticker y aplicamos la función de cálculo
-        indicators_df = market_data_df.groupby('ticker', group_keys=False).apply(calculate_technical_indicators)
+        # Todos los tickers a la vez, repartidos entre procesos (ver parallel_indicators)
+        with ParallelIndicatorEngine() as indicator_engine:
+            indicators_df = indicator_engine.compute(market_data_df)
         
         indicators_df.dropna(inplace=True)
 
-        feature_columns = [
-            'ticker', 'timestamp', 'ema_12', 'ema_26', 'macd', 'macd_signal',
-            'macd_hist', 'rsi_14', 'bb_upper', 'bb_middle', 'bb_lower', 'obv', 'atr_14'
-        ]
-        final_df = indicators_df[feature_columns]
+        final_df = indicators_df[FEATURE_COLUMNS]
 
         with engine.connect() as connection:
             with connection.begin() as transaction:
@@ -77,4 +112,4 @@ def generate_technical_features():
         print(f"[ERROR EN TAREA]: Falló la generación de indicadores técnicos. Error: {e}")
 
 if __name__ == "__main__":
-    generate_technical_features()
\ No newline at end of file
+    generate_technical_features(streaming='--no-streaming' not in sys.argv)
\ No newline at end of file
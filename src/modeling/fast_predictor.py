@@ -0,0 +1,180 @@
+# src/modeling/fast_predictor.py
+
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+import logging
+from scipy.special import expit
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+
+class FastPredictor:
+    """
+    Predictor compilado para la arquitectura del paquete (ver
+    replica_model.build_exact_model_architecture):
+
+        StandardScaler -> PCA -> LGBMClassifier  (+ LogisticRegression meta)
+
+    El escalado y la proyección PCA son lineales, así que se pliegan en una sola
+    transformación afín Z = X @ W + b calculada al cargar. El booster de LightGBM
+    se llama directamente sobre un array float64 contiguo (sin la validación del
+    Pipeline/ColumnTransformer ni del envoltorio sklearn) y el meta-modelo, una
+    regresión logística de una variable, se evalúa en forma cerrada.
+    """
+
+    name = 'fast'
+
+    def __init__(self, features: list, weights: np.ndarray, offset: np.ndarray, booster, meta_coef: float, meta_intercept: float):
+        self.features = list(features)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.offset = np.ascontiguousarray(offset, dtype=np.float64)
+        self.booster = booster
+        self.meta_coef = float(meta_coef)
+        self.meta_intercept = float(meta_intercept)
+
+    @classmethod
+    def from_package(cls, package: dict) -> 'FastPredictor':
+        """
+        Construye el predictor a partir del paquete del modelo. Lanza ValueError si
+        la arquitectura no es la esperada (el llamante sigue entonces con sklearn).
+        """
+        pipeline = package['primary_model_pipeline']
+        steps = dict(pipeline.steps)
+        if list(steps) != ['preprocessor', 'pca', 'classifier']:
+            raise ValueError(f"pasos del pipeline no soportados: {list(steps)}")
+        preprocessor, pca, classifier = steps['preprocessor'], steps['pca'], steps['classifier']
+
+        # Solo el StandardScaler de las numéricas puede producir columnas
+        scaler, columns = None, None
+        for name, transformer, selected in preprocessor.transformers_:
+            if name == 'remainder' or len(selected) == 0:
+                continue
+            if scaler is not None or type(transformer).__name__ != 'StandardScaler':
+                raise ValueError(f"transformador no soportado: {name}={transformer}")
+            scaler, columns = transformer, list(selected)
+        if scaler is None:
+            raise ValueError("el preprocesador no tiene StandardScaler")
+        if getattr(pca, 'whiten', False):
+            raise ValueError("PCA con whiten no soportado")
+        if list(classifier.classes_) != [0, 1]:
+            raise ValueError(f"clasificador no binario: {classifier.classes_}")
+
+        meta = package['meta_model']
+        if type(meta).__name__ != 'LogisticRegression' or meta.coef_.shape != (1, 1) or list(meta.classes_) != [0, 1]:
+            raise ValueError("meta-modelo no soportado (se espera LogisticRegression binaria de una variable)")
+
+        features = [col.split('__')[1] for col in package['feature_list']]
+        if features != columns:
+            raise ValueError("la lista de features no coincide con las columnas del escalador")
+
+        # ((X - mu) / sigma - m) @ C.T  ==  X @ (C / sigma).T - (mu / sigma + m) @ C.T
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(columns))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(columns))
+        components = pca.components_
+        weights = (components / scale).T
+        offset = -(mean / scale + pca.mean_) @ components.T
+        return cls(features, weights, offset, classifier.booster_, meta.coef_[0, 0], meta.intercept_[0])
+
+    def _as_array(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(dtype=np.float64)
+        return np.ascontiguousarray(X, dtype=np.float64)
+
+    def transform(self, X) -> np.ndarray:
+        """Entrada del booster (escalado + PCA) en una sola multiplicación."""
+        Z = self._as_array(X) @ self.weights
+        Z += self.offset
+        return Z
+
+    def predict(self, X) -> dict:
+        """Probabilidades del primario, clase (argmax) y confianza del meta-modelo."""
+        buy = self.booster.predict(self.transform(X))
+        sell = 1.0 - buy
+        return {
+            'primary_proba': np.column_stack([sell, buy]),
+            'primary_preds': (buy > sell).astype(np.int64),
+            'meta_confidence': expit(np.maximum(sell, buy) * self.meta_coef + self.meta_intercept),
+        }
+
+def sklearn_predict(package: dict, X: pd.DataFrame) -> dict:
+    """Camino de referencia: Pipeline + meta-modelo de sklearn."""
+    primary_proba = package['primary_model_pipeline'].predict_proba(X)
+    meta_features = pd.DataFrame({'primary_model_prob': primary_proba.max(axis=1)}, index=X.index)
+    return {
+        'primary_proba': primary_proba,
+        'primary_preds': np.argmax(primary_proba, axis=1),
+        'meta_confidence': package['meta_model'].predict_proba(meta_features)[:, 1],
+    }
+
+def max_difference(fast: dict, reference: dict) -> float:
+    """Mayor diferencia absoluta en probabilidades; inf si cambia alguna clase."""
+    if not np.array_equal(fast['primary_preds'], reference['primary_preds']):
+        return np.inf
+    return max(
+        np.max(np.abs(fast['primary_proba'] - reference['primary_proba']), initial=0.0),
+        np.max(np.abs(fast['meta_confidence'] - reference['meta_confidence']), initial=0.0),
+    )
+
+def synthetic_inputs(package: dict, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Filas con la media y dispersión con las que se entrenó el escalador."""
+    scaler = package['primary_model_pipeline'].named_steps['preprocessor'].named_transformers_['num']
+    rng = np.random.default_rng(seed)
+    values = scaler.mean_ + rng.normal(size=(n_rows, len(scaler.mean_))) * scaler.scale_
+    return pd.DataFrame(values, columns=[col.split('__')[1] for col in package['feature_list']])
+
+def build_fast_predictor(package: dict):
+    """
+    Predictor compilado validado contra sklearn sobre una muestra sintética, o None
+    si está desactivado, la arquitectura no es compatible o no pasa la paridad.
+    """
+    if not settings.FAST_PREDICTOR:
+        return None
+    try:
+        predictor = FastPredictor.from_package(package)
+    except (ValueError, KeyError, AttributeError) as e:
+        logging.warning(f"⚠️ Predictor rápido no disponible ({e}); se usa el pipeline de sklearn")
+        return None
+    sample = synthetic_inputs(package, settings.FAST_PREDICTOR_CHECK_ROWS)
+    difference = max_difference(predictor.predict(sample), sklearn_predict(package, sample))
+    if difference > settings.FAST_PREDICTOR_MAX_DIFF:
+        logging.warning(f"⚠️ Predictor rápido descartado: difiere de sklearn en {difference:.2e}")
+        return None
+    return predictor
+
+# --- BENCHMARK ---
+
+def run_benchmark(batch_sizes=(1, 1_000, 1_000_000), repeats: int = 20):
+    import joblib
+    package = joblib.load(settings.MODEL_PACKAGE_PATH)
+    predictor = FastPredictor.from_package(package)
+    print(f"📊 {len(predictor.features)} features -> {predictor.weights.shape[1]} componentes, "
+          f"{predictor.booster.num_trees()} árboles")
+
+    def timed(fn, n):
+        times = []
+        for _ in range(n):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return result, np.median(times)
+
+    for n_rows in batch_sizes:
+        X = synthetic_inputs(package, n_rows, seed=n_rows)
+        n = repeats if n_rows <= 10_000 else 2
+        reference, t_sklearn = timed(lambda: sklearn_predict(package, X), n)
+        fast, t_fast = timed(lambda: predictor.predict(X), n)
+        difference = max_difference(fast, reference)
+        unit = 'ms' if t_sklearn < 1 else 's'
+        factor = 1000 if unit == 'ms' else 1
+        print(f"   {n_rows:>9,} filas: sklearn {t_sklearn * factor:.2f} {unit} | rápido {t_fast * factor:.2f} {unit} "
+              f"({t_sklearn / t_fast:.1f}x) | {'✅' if difference <= settings.FAST_PREDICTOR_MAX_DIFF else '❌'} máx |dif| {difference:.1e}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark()
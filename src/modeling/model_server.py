@@ -0,0 +1,245 @@
+# src/modeling/model_server.py
+
+import pandas as pd
+import numpy as np
+import joblib
+import hashlib
+import threading
+import shutil
+import tempfile
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.modeling.fast_predictor import build_fast_predictor
+from src.modeling.onnx_model import onnx_predictor_for
+
+def file_digest(path: str) -> str:
+    """sha256 del artefacto (en bloques, sin cargarlo entero en memoria)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class LoadedModel:
+    """
+    Una versión cargada del paquete del modelo. Es inmutable: un llamante que toma
+    una instancia usa el mismo primario, meta-modelo, umbral y lista de features
+    aunque el servidor recargue entre medias.
+
+    `backend` puntúa en lugar del Pipeline de sklearn: el OnnxPredictor (con el
+    que el paquete puede ser solo su lista de features y su umbral) o, por
+    defecto, el FastPredictor si la arquitectura lo admite.
+    """
+
+    def __init__(self, package: dict, digest: str, load_seconds: float, backend=None):
+        self.package = package
+        self.primary_model = package.get('primary_model_pipeline')
+        self.meta_model = package.get('meta_model')
+        self.optimal_threshold = package['optimal_threshold']
+        self.feature_list = package['feature_list']
+        self.features = [col.split('__')[1] for col in self.feature_list]
+        # Camino compilado (escalado+PCA afín, booster directo); None -> Pipeline de sklearn
+        self.backend = backend if backend is not None else build_fast_predictor(package)
+        self.digest = digest
+        self.version = digest[:12]
+        self.load_seconds = load_seconds
+        self.loaded_at = pd.Timestamp.now(tz='UTC')
+
+    def predict(self, X: pd.DataFrame) -> dict:
+        """
+        Predicción por lotes sobre X (columnas = self.features, float64): probabilidades
+        del primario, clase, confianza del meta-modelo y si supera el umbral óptimo.
+        """
+        if self.backend is not None:
+            output = self.backend.predict(X)
+        else:
+            primary_proba = self.primary_model.predict_proba(X)
+            meta_features = pd.DataFrame({'primary_model_prob': primary_proba.max(axis=1)}, index=X.index)
+            output = {
+                'primary_proba': primary_proba,
+                'primary_preds': np.argmax(primary_proba, axis=1),
+                'meta_confidence': self.meta_model.predict_proba(meta_features)[:, 1],
+            }
+        output['passes_threshold'] = output['meta_confidence'] >= self.optimal_threshold
+        return output
+
+class ModelServer:
+    """
+    Mantiene el paquete del modelo en memoria dentro de un proceso de larga vida
+    (worker de Celery, API web) y lo recarga cuando cambia el artefacto.
+
+    Cada petición hace un `os.stat` del fichero (microsegundos); solo si cambian
+    mtime o tamaño se calcula el sha256, y solo si cambia el contenido se carga la
+    versión nueva. La carga se hace fuera del objeto en servicio y se publica con
+    una única asignación, así que las peticiones concurrentes ven la versión
+    anterior o la nueva completa, nunca una mezcla. Si la carga falla (p. ej. el
+    fichero se está escribiendo) se sigue sirviendo la versión anterior y no se
+    reintenta hasta que el fichero vuelva a cambiar.
+
+    Con MODEL_BACKEND='onnx' se sirve el .onnx de al lado si se exportó de este
+    mismo contenido (sin unpickle); si no, se carga el joblib y se exporta.
+    """
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or settings.MODEL_PACKAGE_PATH
+        self._model = None
+        self._stat = None
+        # (firma, sha256) de la última carga fallida: no se reintenta hasta que cambie
+        self._failed = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _file_stat(self):
+        stat = os.stat(self.model_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def current(self) -> LoadedModel:
+        """Versión en servicio, recargando antes si el artefacto ha cambiado en disco."""
+        stat = self._file_stat()
+        if self._is_stale(stat):
+            with self._lock:
+                if self._is_stale(stat):
+                    self._reload(stat)
+        return self._model
+
+    def _is_stale(self, stat) -> bool:
+        if self._model is None:
+            return True
+        return stat != self._stat and (self._failed is None or stat != self._failed[0])
+
+    def _reload(self, stat):
+        digest = file_digest(self.model_path)
+        if self._model is not None and digest == self._model.digest:
+            # Mismo contenido (touch, copia idéntica): solo se actualiza la firma
+            self._stat, self._failed = stat, None
+            return
+        if self._model is not None and self._failed is not None and self._failed[1] == digest:
+            # Mismo contenido que ya falló con otra firma (touch): no se reintenta la carga
+            self._failed = (stat, digest)
+            return
+        start = time.perf_counter()
+        try:
+            model = self._load(digest, start)
+        except Exception as e:
+            if self._model is None:
+                raise
+            self._failed = (stat, digest)
+            logging.warning(f"⚠️ No se pudo recargar el modelo ({e}); se sigue sirviendo v{self._model.version}")
+            return
+        previous = self._model
+        self._model, self._stat, self._failed = model, stat, None
+        self.loads += 1
+        if previous is None:
+            logging.info(f"🧠 Modelo cargado v{model.version} en {model.load_seconds * 1000:.0f} ms")
+        else:
+            logging.info(f"🔄 Modelo recargado v{previous.version} -> v{model.version} en {model.load_seconds * 1000:.0f} ms")
+
+    def _load(self, digest: str, start: float) -> LoadedModel:
+        if settings.MODEL_BACKEND == 'onnx':
+            predictor = onnx_predictor_for(self.model_path, digest)
+            if predictor is not None:
+                return LoadedModel(predictor.package(), digest, time.perf_counter() - start, backend=predictor)
+        package = joblib.load(self.model_path)
+        backend = onnx_predictor_for(self.model_path, digest, package) if settings.MODEL_BACKEND == 'onnx' else None
+        return LoadedModel(package, digest, time.perf_counter() - start, backend=backend)
+
+    def predict(self, X: pd.DataFrame) -> dict:
+        return self.current().predict(X)
+
+    def status(self) -> dict:
+        model = self._model
+        if model is None:
+            return {'status': 'not_loaded', 'model_path': self.model_path}
+        return {
+            'status': 'loaded',
+            'model_path': self.model_path,
+            'version': model.version,
+            'loaded_at': model.loaded_at.isoformat(),
+            'load_ms': round(model.load_seconds * 1000, 1),
+            'loads': self.loads,
+            'backend': model.backend.name if model.backend is not None else 'sklearn',
+            'features': model.features,
+        }
+
+# Instancia global: vive lo que viva el proceso que la importa
+model_server = ModelServer()
+
+def save_model_package(package: dict, path: str):
+    """
+    Escribe el paquete en un temporal del mismo directorio y lo mueve encima del
+    destino (`os.replace` es atómico), para que el servidor nunca lea un fichero a medias.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.joblib.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(package, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# --- BENCHMARK ---
+
+def run_benchmark(n_rows: int = 50, repeats: int = 20, seed: int = 0):
+    """
+    Latencia de inferencia con carga en frío (joblib.load + predict, lo que hacía
+    cada script) frente al servidor caliente, y comprobación de la recarga en
+    caliente sobre una copia temporal del paquete.
+    """
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'model.joblib')
+        shutil.copy(settings.MODEL_PACKAGE_PATH, path)
+        server = ModelServer(path)
+        start = time.perf_counter()
+        features = server.current().features
+        t_first = time.perf_counter() - start
+        X = pd.DataFrame(rng.normal(size=(n_rows, len(features))), columns=features)
+
+        cold = []
+        for _ in range(max(3, repeats // 4)):
+            start = time.perf_counter()
+            package = joblib.load(path)
+            LoadedModel(package, '', 0.0).predict(X)
+            cold.append(time.perf_counter() - start)
+        warm = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            server.predict(X)
+            warm.append(time.perf_counter() - start)
+        t_cold, t_warm = np.median(cold), np.median(warm)
+        print(f"📊 {n_rows} filas x {len(features)} features")
+        print(f"   primera carga del proceso (imports + load): {t_first * 1000:.0f} ms")
+        print(f"   en frío (load + predict): {t_cold * 1000:.1f} ms | servidor caliente: {t_warm * 1000:.1f} ms ({t_cold / t_warm:.1f}x)")
+
+        # touch sin cambio de contenido: no recarga
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        server.current()
+        untouched = server.loads == 1
+        # paquete nuevo escrito atómicamente: recarga y las predicciones cambian de versión
+        package = joblib.load(path)
+        package['optimal_threshold'] = float(package['optimal_threshold']) + 0.01
+        save_model_package(package, path)
+        before = server.loads
+        reloaded = server.current()
+        print(f"   {'✅' if untouched else '❌'} touch sin cambios no recarga | "
+              f"{'✅' if server.loads == before + 1 and reloaded.optimal_threshold == package['optimal_threshold'] else '❌'} "
+              f"recarga al cambiar el artefacto (v{reloaded.version})")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--status' in sys.argv:
+        model_server.current()
+        print(model_server.status())
+    else:
+        run_benchmark()
@@ -0,0 +1,349 @@
+# src/modeling/onnx_model.py
+
+import pandas as pd
+import numpy as np
+import json
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.modeling.fast_predictor import FastPredictor, sklearn_predict, max_difference, synthetic_inputs
+
+# onnx / onnxruntime son opcionales: sin ellos el servidor usa el predictor nativo
+try:
+    import onnx
+    from onnx import helper, numpy_helper, TensorProto
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# ai.onnx.ml 5: TreeEnsemble con umbrales, hojas y salida en double (el
+# TreeEnsembleRegressor de ai.onnx.ml 3 devuelve siempre float32)
+OPSET_IMPORTS = [('', 17), ('ai.onnx.ml', 5)]
+IR_VERSION = 10
+
+PACKAGE_PATHS = [
+    settings.MODEL_PACKAGE_PATH,
+    os.path.join(project_root, 'models', 'ULTRA_MODEL_REPLICA_EXPANDED.joblib'),
+]
+
+def onnx_path_for(model_path: str) -> str:
+    """El grafo ONNX vive junto al paquete: models/X.joblib -> models/X.onnx"""
+    return os.path.splitext(model_path)[0] + '.onnx'
+
+# --- CONVERSIÓN ---
+
+def _tree_ensemble_node(booster, input_name: str, output_name: str):
+    """
+    Nodo TreeEnsemble (suma de hojas = score bruto de LightGBM) a partir de
+    `dump_model()`, en double para que los cortes y la suma sean los de LightGBM.
+    Solo splits numéricos '<='; los valores ausentes siguen la regla de LightGBM:
+    missing_type None -> NaN se trata como 0.0, NaN -> rama por defecto.
+    """
+    dump = booster.dump_model()
+    nodes = {key: [] for key in ('featureids', 'splits', 'missing', 'trueids', 'trueleafs', 'falseids', 'falseleafs')}
+    leaf_weights, roots = [], []
+
+    def add_leaf(node):
+        leaf_weights.append(float(node['leaf_value']))
+        return len(leaf_weights) - 1
+
+    def add_branch(node):
+        """Añade el split y sus hijos; devuelve (índice, es_hoja) de `node`."""
+        if 'leaf_value' in node:
+            return add_leaf(node), 1
+        if node['decision_type'] != '<=':
+            raise ValueError(f"split no soportado: {node['decision_type']}")
+        threshold = float(node['threshold'])
+        if node['missing_type'] == 'None':
+            missing = int(0.0 <= threshold)
+        elif node['missing_type'] == 'NaN':
+            missing = int(node['default_left'])
+        else:
+            raise ValueError(f"missing_type no soportado: {node['missing_type']}")
+        row = len(nodes['featureids'])
+        for key, value in (('featureids', node['split_feature']), ('splits', threshold), ('missing', missing),
+                           ('trueids', 0), ('trueleafs', 0), ('falseids', 0), ('falseleafs', 0)):
+            nodes[key].append(value)
+        nodes['trueids'][row], nodes['trueleafs'][row] = add_branch(node['left_child'])
+        nodes['falseids'][row], nodes['falseleafs'][row] = add_branch(node['right_child'])
+        return row, 0
+
+    for tree in dump['tree_info']:
+        structure = tree['tree_structure']
+        if 'leaf_value' in structure:
+            # Árbol de una sola hoja: split ficticio con las dos ramas a la misma hoja
+            leaf = add_leaf(structure)
+            for key, value in (('featureids', 0), ('splits', 0.0), ('missing', 0),
+                               ('trueids', leaf), ('trueleafs', 1), ('falseids', leaf), ('falseleafs', 1)):
+                nodes[key].append(value)
+            roots.append(len(nodes['featureids']) - 1)
+        else:
+            roots.append(add_branch(structure)[0])
+
+    return helper.make_node(
+        'TreeEnsemble', [input_name], [output_name], domain='ai.onnx.ml',
+        n_targets=1, aggregate_function=1, post_transform=0, tree_roots=roots,
+        nodes_featureids=nodes['featureids'],
+        nodes_modes=numpy_helper.from_array(np.zeros(len(nodes['featureids']), dtype=np.uint8)),  # BRANCH_LEQ
+        nodes_splits=numpy_helper.from_array(np.array(nodes['splits'], dtype=np.float64)),
+        nodes_missing_value_tracks_true=nodes['missing'],
+        nodes_truenodeids=nodes['trueids'], nodes_trueleafs=nodes['trueleafs'],
+        nodes_falsenodeids=nodes['falseids'], nodes_falseleafs=nodes['falseleafs'],
+        leaf_targetids=[0] * len(leaf_weights),
+        leaf_weights=numpy_helper.from_array(np.array(leaf_weights, dtype=np.float64)),
+    ), dump
+
+def build_onnx_graph(package: dict, source_digest: str = ''):
+    """
+    Grafo completo del paquete en double, con el mismo plegado que FastPredictor:
+
+        X -> MatMul(W) + b -> árboles (suma) -> sigmoide -> [1-p, p]
+          -> max -> coef * max + intercept -> sigmoide (meta-modelo)
+
+    Salidas: primary_proba (N x 2) y meta_confidence (N). La lista de features, el
+    umbral y el sha256 del paquete de origen van en los metadatos del modelo.
+    """
+    predictor = FastPredictor.from_package(package)
+    trees, dump = _tree_ensemble_node(predictor.booster, 'Z', 'raw')
+    objective = dump['objective'].split()
+    if objective[0] != 'binary':
+        raise ValueError(f"objetivo no soportado: {dump['objective']}")
+    sigmoid = float(objective[1].split(':')[1]) if len(objective) > 1 else 1.0
+
+    def constant(name, value):
+        return numpy_helper.from_array(np.asarray(value, dtype=np.float64), name)
+
+    initializers = [
+        constant('W', predictor.weights), constant('b', predictor.offset), constant('sigmoid', sigmoid),
+        constant('one', 1.0), constant('meta_coef', predictor.meta_coef), constant('meta_intercept', predictor.meta_intercept),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), 'squeeze_axes'),
+    ]
+    nodes = [
+        helper.make_node('MatMul', ['X', 'W'], ['XW']),
+        helper.make_node('Add', ['XW', 'b'], ['Z']),
+        trees,
+        helper.make_node('Mul', ['raw', 'sigmoid'], ['raw_scaled']),
+        helper.make_node('Sigmoid', ['raw_scaled'], ['buy']),
+        helper.make_node('Sub', ['one', 'buy'], ['sell']),
+        helper.make_node('Concat', ['sell', 'buy'], ['primary_proba'], axis=1),
+        helper.make_node('Max', ['sell', 'buy'], ['primary_max']),
+        helper.make_node('Mul', ['primary_max', 'meta_coef'], ['meta_scaled']),
+        helper.make_node('Add', ['meta_scaled', 'meta_intercept'], ['meta_logit']),
+        helper.make_node('Sigmoid', ['meta_logit'], ['meta_column']),
+        helper.make_node('Squeeze', ['meta_column', 'squeeze_axes'], ['meta_confidence']),
+    ]
+    graph = helper.make_graph(
+        nodes, 'cryptonita_model',
+        inputs=[helper.make_tensor_value_info('X', TensorProto.DOUBLE, [None, len(predictor.features)])],
+        outputs=[
+            helper.make_tensor_value_info('primary_proba', TensorProto.DOUBLE, [None, 2]),
+            helper.make_tensor_value_info('meta_confidence', TensorProto.DOUBLE, [None]),
+        ],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid(domain, version) for domain, version in OPSET_IMPORTS],
+                              producer_name='cryptonita', ir_version=IR_VERSION)
+    helper.set_model_props(model, {
+        'source_digest': source_digest,
+        'feature_list': json.dumps(package['feature_list']),
+        'optimal_threshold': repr(float(package['optimal_threshold'])),
+        'exported_at': pd.Timestamp.now(tz='UTC').isoformat(),
+    })
+    onnx.checker.check_model(model)
+    return model
+
+def export_package(package: dict, onnx_path: str, source_digest: str = '') -> str:
+    """
+    Exporta el paquete a `onnx_path` tras comprobar que el grafo da las mismas
+    probabilidades que sklearn en una muestra sintética (ValueError si no). Se
+    escribe en un temporal y se mueve encima (atómico).
+    """
+    model = build_onnx_graph(package, source_digest)
+    tmp = onnx_path + '.tmp'
+    onnx.save(model, tmp)
+    try:
+        sample = synthetic_inputs(package, settings.FAST_PREDICTOR_CHECK_ROWS)
+        difference = max_difference(OnnxPredictor(tmp).predict(sample), sklearn_predict(package, sample))
+        if difference > settings.ONNX_MAX_DIFF:
+            raise ValueError(f"el grafo ONNX difiere de sklearn en {difference:.2e}")
+        os.replace(tmp, onnx_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    logging.info(f"📦 Modelo exportado a ONNX: {onnx_path}")
+    return onnx_path
+
+# --- BACKEND DE PUNTUACIÓN ---
+
+class OnnxPredictor:
+    """
+    Puntuación con onnxruntime en CPU. Solo necesita el fichero .onnx (sin
+    unpickle ni las versiones exactas de sklearn/LightGBM); los hilos intra-op se
+    fijan con ONNX_INTRA_OP_THREADS.
+    """
+
+    name = 'onnx'
+
+    def __init__(self, onnx_path: str, threads: int = None):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = settings.ONNX_INTRA_OP_THREADS if threads is None else threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.source_digest = metadata.get('source_digest', '')
+        self.feature_list = json.loads(metadata['feature_list'])
+        self.optimal_threshold = float(metadata['optimal_threshold'])
+        self.features = [col.split('__')[1] for col in self.feature_list]
+
+    def package(self) -> dict:
+        """Lo que LoadedModel necesita del paquete cuando no se carga el joblib."""
+        return {'feature_list': self.feature_list, 'optimal_threshold': self.optimal_threshold}
+
+    def predict(self, X) -> dict:
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(dtype=np.float64)
+        primary_proba, meta_confidence = self.session.run(None, {'X': np.ascontiguousarray(X, dtype=np.float64)})
+        return {
+            'primary_proba': primary_proba,
+            'primary_preds': (primary_proba[:, 1] > primary_proba[:, 0]).astype(np.int64),
+            'meta_confidence': meta_confidence,
+        }
+
+def onnx_predictor_for(model_path: str, digest: str, package: dict = None):
+    """
+    OnnxPredictor para el paquete `model_path` cuyo sha256 es `digest`: el .onnx
+    de al lado si se exportó de ese mismo contenido; si no y se pasa `package`, se
+    exporta de nuevo. None si onnxruntime no está o el paquete no es convertible.
+    """
+    if not ONNX_AVAILABLE:
+        logging.warning("⚠️ onnx/onnxruntime no instalados: se usa el predictor nativo")
+        return None
+    onnx_path = onnx_path_for(model_path)
+    try:
+        if os.path.exists(onnx_path):
+            predictor = OnnxPredictor(onnx_path)
+            if predictor.source_digest == digest:
+                return predictor
+        if package is None:
+            return None
+        export_package(package, onnx_path, digest)
+        return OnnxPredictor(onnx_path)
+    except (ValueError, KeyError, AttributeError, OSError) as e:
+        logging.warning(f"⚠️ Backend ONNX no disponible ({e}); se usa el predictor nativo")
+        return None
+
+# --- EQUIVALENCIA NUMÉRICA ---
+
+def run_equivalence_suite(paths: list = None) -> bool:
+    """
+    Exporta cada paquete a un directorio temporal y compara onnxruntime con el
+    Pipeline de sklearn (filas sintéticas, una sola fila, valores extremos y las
+    filas reales de 02 si existen) y con el booster nativo en entradas con NaN
+    (que el PCA de sklearn no admite). Cualquier cambio de clase o diferencia
+    por encima de ONNX_MAX_DIFF es un fallo.
+    """
+    import joblib
+    import tempfile
+    from src.modeling.model_server import file_digest
+
+    paths = paths or [path for path in PACKAGE_PATHS if os.path.exists(path)]
+    from src.feature_engineering.latest_snapshot import feature_store, read_feature_store
+    all_ok = True
+    with tempfile.TemporaryDirectory() as workdir:
+        for path in paths:
+            package = joblib.load(path)
+            onnx_path = os.path.join(workdir, os.path.basename(onnx_path_for(path)))
+            export_package(package, onnx_path, file_digest(path))
+            predictor = OnnxPredictor(onnx_path)
+            native = FastPredictor.from_package(package)
+            features = predictor.features
+            print(f"📦 {os.path.basename(path)} -> {os.path.getsize(onnx_path) / 1e3:.0f} KB")
+
+            synthetic = synthetic_inputs(package, 100_000, seed=1)
+            extreme = synthetic_inputs(package, 1_000, seed=2) * 1e3
+            with_nan = synthetic_inputs(package, 1_000, seed=3)
+            with_nan = with_nan.mask(np.random.default_rng(3).random(with_nan.shape) < 0.2)
+            cases = [
+                ('sintéticas (100k)', synthetic, sklearn_predict),
+                ('una fila', synthetic.iloc[:1], sklearn_predict),
+                ('extremos (x1000)', extreme, sklearn_predict),
+                ('con NaN (vs booster)', with_nan, lambda _, X: native.predict(X)),
+            ]
+            if feature_store().exists():
+                real = read_feature_store(features)[features].astype(np.float64).dropna()
+                cases.append((f"reales de 02 ({len(real):,})", real, sklearn_predict))
+
+            for label, X, reference in cases:
+                difference = max_difference(predictor.predict(X), reference(package, X))
+                ok = difference <= settings.ONNX_MAX_DIFF
+                all_ok &= ok
+                print(f"   {'✅' if ok else '❌'} {label}: máx |dif| {difference:.1e}")
+    print(f"\n{'✅ Equivalencia ONNX superada' if all_ok else '❌ Equivalencia ONNX fallida'}")
+    return all_ok
+
+# --- BENCHMARK ---
+
+def run_benchmark(batch_sizes=(1, 1_000, 100_000), repeats: int = 20):
+    """Carga y latencia/throughput: joblib + sklearn, predictor nativo y onnxruntime."""
+    import joblib
+    import tempfile
+    from src.modeling.model_server import file_digest
+
+    def timed(fn, n):
+        times = []
+        for _ in range(n):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return np.median(times)
+
+    path = settings.MODEL_PACKAGE_PATH
+    package = joblib.load(path)
+    with tempfile.TemporaryDirectory() as workdir:
+        onnx_path = export_package(package, os.path.join(workdir, 'model.onnx'), file_digest(path))
+        t_joblib = timed(lambda: joblib.load(path), 5)
+        t_session = timed(lambda: OnnxPredictor(onnx_path), 5)
+        print(f"📊 carga: joblib {t_joblib * 1000:.1f} ms | sesión onnxruntime {t_session * 1000:.1f} ms "
+              f"(.joblib {os.path.getsize(path) / 1e3:.0f} KB, .onnx {os.path.getsize(onnx_path) / 1e3:.0f} KB)")
+
+        native = FastPredictor.from_package(package)
+        backends = {'sklearn': lambda X: sklearn_predict(package, X), 'nativo': native.predict}
+        threads = sorted({1, os.cpu_count() or 1})
+        for n_threads in threads:
+            predictor = OnnxPredictor(onnx_path, threads=n_threads)
+            backends[f"onnx ({n_threads} hilo{'s' if n_threads > 1 else ''})"] = predictor.predict
+
+        for n_rows in batch_sizes:
+            X = synthetic_inputs(package, n_rows, seed=n_rows)
+            n = repeats if n_rows <= 10_000 else 3
+            times = {name: timed(lambda: fn(X), n) for name, fn in backends.items()}
+            summary = ' | '.join(
+                f"{name} {t * 1000:.2f} ms" if n_rows < 10_000 else f"{name} {n_rows / t / 1e3:.0f}k filas/s"
+                for name, t in times.items()
+            )
+            print(f"   {n_rows:>7,} filas: {summary}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not ONNX_AVAILABLE:
+        print("❌ onnx/onnxruntime no instalados (pip install onnx onnxruntime)")
+        sys.exit(1)
+    if '--check' in sys.argv:
+        sys.exit(0 if run_equivalence_suite() else 1)
+    elif '--benchmark' in sys.argv:
+        run_benchmark()
+    else:
+        from src.modeling.model_server import file_digest
+        import joblib
+        for path in PACKAGE_PATHS:
+            if os.path.exists(path):
+                export_package(joblib.load(path), onnx_path_for(path), file_digest(path))
@@ -0,0 +1,105 @@
+# src/modeling/signal_matrix.py
+
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.utils.compact_schema import model_input
+
+def score_frame(model, features_df: pd.DataFrame, batch_rows: int = None) -> dict:
+    """
+    Predicciones del modelo para todas las filas de `features_df` en bloques de
+    `batch_rows` (acota la memoria de la copia float64). Devuelve los arrays de
+    LoadedModel.predict alineados con las filas del frame.
+    """
+    batch_rows = batch_rows or settings.SIMULATION_BATCH_ROWS
+    chunks = []
+    for start in range(0, len(features_df), batch_rows):
+        X = model_input(features_df.iloc[start:start + batch_rows], model.features)
+        chunks.append(model.predict(X))
+    if not chunks:
+        return {'primary_preds': np.empty(0, dtype=np.int64), 'passes_threshold': np.empty(0, dtype=bool)}
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+def build_signal_matrix(features_df: pd.DataFrame, model, batch_rows: int = None) -> pd.DataFrame:
+    """
+    Matriz de señales (fechas x tickers) para todo el histórico: 1 compra, -1
+    venta, 0 mantener y NaN donde el ticker no tiene fila esa fecha.
+
+    El frame se puntúa entero (sin filtrar ticker a ticker) y cada predicción se
+    coloca en su celda con los códigos de fecha y ticker. Mismo resultado que
+    concatenar una serie por ticker: fechas ordenadas y tickers en orden de aparición.
+    """
+    output = score_frame(model, features_df, batch_rows)
+    signals = np.zeros(len(features_df))
+    signals[(output['primary_preds'] == 1) & output['passes_threshold']] = 1   # BUY
+    signals[(output['primary_preds'] == 0) & output['passes_threshold']] = -1  # SELL
+
+    ticker_codes, tickers = pd.factorize(features_df['ticker'])
+    date_codes, dates = pd.factorize(pd.DatetimeIndex(features_df['timestamp']), sort=True)
+
+    matrix = np.full((len(dates), len(tickers)), np.nan)
+    matrix[date_codes, ticker_codes] = signals
+    return pd.DataFrame(matrix, index=dates.rename('timestamp'), columns=pd.Index(np.asarray(tickers), name='ticker'))
+
+# --- BENCHMARK ---
+
+def _reference_per_ticker(features_df: pd.DataFrame, model) -> pd.DataFrame:
+    """Camino anterior de 05: filtro y predict_proba ticker a ticker (para paridad)."""
+    all_signals_list = []
+    for ticker in features_df['ticker'].unique():
+        ticker_data = features_df[features_df['ticker'] == ticker].set_index('timestamp')
+        ticker_features = model_input(ticker_data, model.features)
+        if ticker_features.empty:
+            continue
+        output = model.predict(ticker_features)
+        signals = np.zeros(len(ticker_features))
+        signals[(output['primary_preds'] == 1) & output['passes_threshold']] = 1
+        signals[(output['primary_preds'] == 0) & output['passes_threshold']] = -1
+        all_signals_list.append(pd.Series(signals, index=ticker_features.index, name=ticker))
+    return pd.concat(all_signals_list, axis=1)
+
+def run_benchmark(n_tickers: int = 300, n_days: int = 1500, seed: int = 0):
+    from src.modeling.model_server import model_server
+    from src.modeling.fast_predictor import synthetic_inputs
+
+    model = model_server.current()
+    tickers = [f"T{i:04d}-USD" for i in range(n_tickers)]
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D', tz='UTC')
+    features_df = synthetic_inputs(model.package, n_tickers * n_days, seed=seed)
+    features_df.insert(0, 'timestamp', np.tile(dates, n_tickers))
+    features_df.insert(0, 'ticker', pd.Categorical(np.repeat(tickers, n_days)))
+    # Historias de distinta longitud, como los listados nuevos
+    features_df = features_df.sample(frac=0.9, random_state=seed).sort_values(['ticker', 'timestamp']).reset_index(drop=True)
+    print(f"📊 {n_tickers} activos x {n_days} días ({len(features_df):,} filas)")
+
+    start = time.perf_counter()
+    batched = build_signal_matrix(features_df, model)
+    t_batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    score_frame(model, features_df)
+    t_model = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = _reference_per_ticker(features_df, model)
+    t_reference = time.perf_counter() - start
+
+    same = (batched.index.equals(reference.index)
+            and list(batched.columns) == list(reference.columns)
+            and np.array_equal(batched.to_numpy(), reference.to_numpy(), equal_nan=True))
+    print(f"   por ticker {t_reference:.2f} s | por lotes {t_batched:.2f} s ({t_reference / t_batched:.1f}x), "
+          f"de ellos modelo {t_model:.2f} s ({t_model / t_batched:.0%})")
+    print(f"   {'✅' if same else '❌'} matriz de señales idéntica ({batched.shape[0]} fechas x {batched.shape[1]} tickers)")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark()
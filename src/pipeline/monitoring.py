@@ -126,6 +126,35 @@ class CryptonitaPipelineMonitor:
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    def check_feature_drift(self) -> Dict[str, Any]:
+        """Deriva y calidad de las features del modelo frente al entrenamiento (último día procesado por 02)"""
+        try:
+            from src.feature_engineering.feature_drift import FeatureDriftMonitor
+            report = FeatureDriftMonitor().latest()
+            if report['status'] == 'no_data':
+                return {"status": "no_data", "message": "El monitor de deriva aún no tiene días procesados"}
+            if report['status'] == 'no_reference':
+                return {"status": "no_reference", "message": f"Sin datos de entrenamiento anteriores a {report['reference_until'][:10]}"}
+            return {
+                "status": report['status'],
+                "day": report['day'],
+                "window_days": report['window_days'],
+                "alerts": report['alerts'],
+                "no_data": report['no_data'],
+                "features": {
+                    name: {
+                        "status": r['status'],
+                        "psi": r['window']['psi'],
+                        "ks": r['window']['ks'],
+                        "zero_rate": r['window'].get('zero_rate'),
+                        "null_rate": r['window'].get('null_rate'),
+                    }
+                    for name, r in report['features'].items()
+                }
+            }
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
 def print_status():
     """Imprime el estado completo del sistema"""
     monitor = CryptonitaPipelineMonitor()
@@ -155,5 +184,23 @@ def print_status():
     else:
         print(f"❌ {signals_status.get('message', 'Error con signals.json')}")
 
+    print("\n📐 DERIVA DE FEATURES")
+    print("-" * 30)
+    drift = monitor.check_feature_drift()
+    if drift['status'] in ('ok', 'warn', 'alert'):
+        icon = {'ok': '✅', 'warn': '⚠️ ', 'alert': '🚨'}[drift['status']]
+        print(f"{icon} {drift['status'].upper()} ({drift['day'][:10]}, ventana {drift['window_days']} días)")
+        for name, r in drift['features'].items():
+            if r['status'] == 'ok':
+                continue
+            if r['psi'] is None:
+                # Sin valores no nulos en la ventana: no hay PSI/KS que mostrar
+                nulls = f"nulos {r['null_rate']:.0%}" if r['null_rate'] is not None else "sin filas"
+                print(f"   {name}: sin datos en la ventana ({nulls}) -> {r['status']}")
+            else:
+                print(f"   {name}: PSI {r['psi']:.3f}, KS {r['ks']:.3f}, ceros {r['zero_rate']:.0%}")
+    else:
+        print(f"❌ {drift.get('message', drift.get('error'))}")
+
 if __name__ == "__main__":
     print_status()
\ No newline at end of file
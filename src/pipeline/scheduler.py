@@ -39,6 +39,16 @@ app.conf.beat_schedule = {
         }
     },
     
+    # 🔗 CORRELACIONES MÓVILES - TRAS CADA ACTUALIZACIÓN DE DATOS
+    # La API solo lee el estado; aquí se añaden los días nuevos
+    'correlaciones-6h': {
+        'task': 'src.pipeline.tasks.correlation_sync_task',
+        'schedule': crontab(minute=30, hour='2,8,14,20'),  # 30 min después de la ingesta
+        'options': {
+            'expires': 5 * 60 * 60,  # Expira en 5 horas
+        }
+    },
+    
     # 🛡️ PIPELINE DE BACKUP - SOLO SI EL PRINCIPAL FALLA
     # 2:00 AM UTC (hora tranquila, sin mercados importantes)
     'cryptonita-backup-nocturno': {
@@ -49,6 +59,16 @@ app.conf.beat_schedule = {
         }
     },
     
+    # 🗄️ RETENCIÓN DE DATOS - DOMINGOS A LAS 3:30 AM UTC
+    # Archiva en Parquet los meses antiguos y deja agregados diarios en caliente
+    'retencion-datos-semanal': {
+        'task': 'src.pipeline.tasks.data_retention_task',
+        'schedule': crontab(hour=3, minute=30, day_of_week=0),
+        'options': {
+            'expires': 3 * 60 * 60,  # Expira en 3 horas
+        }
+    },
+    
     # 🏥 HEALTH CHECK - CADA 4 HORAS
     # Verificar que todo esté funcionando
     'health-check-4h': {
@@ -104,6 +124,8 @@ app.conf.task_routes = {
     'src.pipeline.tasks.generate_signals_task': {'queue': 'model_inference'},
     'src.pipeline.tasks.execute_trades_task': {'queue': 'trading'},
     'src.pipeline.tasks.run_complete_pipeline': {'queue': 'main_pipeline'},
+    'src.pipeline.tasks.data_retention_task': {'queue': 'data_processing'},
+    'src.pipeline.tasks.correlation_sync_task': {'queue': 'data_processing'},
 }
 
 if __name__ == '__main__':
@@ -129,6 +129,49 @@ def execute_trades_task(self, previous_result=None):
             logger.error("💀 Ejecución de trades falló después de 2 intentos")
             raise
 
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def data_retention_task(self):
+    """Archiva en Parquet los datos antiguos y los agrega en tablas diarias"""
+    try:
+        logger.info("🗄️ Iniciando retención y archivado de datos...")
+        
+        from src.utils.db_retention import run_retention
+        summary = run_retention()
+        
+        logger.info(f"✅ Retención completada: {summary}")
+        return {"status": "success", "task": "data_retention", "result": summary}
+        
+    except Exception as exc:
+        logger.error(f"❌ Error en retención de datos: {exc}")
+        if self.request.retries < 1:
+            raise self.retry(exc=exc, countdown=300)
+        raise
+
+@app.task(bind=True, max_retries=2, default_retry_delay=120)
+def correlation_sync_task(self):
+    """Añade los días nuevos de asset_metrics a las correlaciones móviles que sirve la API"""
+    try:
+        logger.info("🔗 Sincronizando correlaciones móviles...")
+        
+        from src.utils.db_connector import create_db_engine
+        from src.feature_engineering.rolling_correlation import refresh_correlations
+        engine = create_db_engine()
+        if engine is None:
+            raise RuntimeError("no hay conexión a la base de datos")
+        try:
+            correlations = refresh_correlations(engine)
+        finally:
+            engine.dispose()
+        
+        logger.info(f"✅ Correlaciones al día hasta {correlations.dates[-1] if correlations.dates else '-'}")
+        return {"status": "success", "task": "correlation_sync", "result": len(correlations.tickers)}
+        
+    except Exception as exc:
+        logger.error(f"❌ Error sincronizando correlaciones: {exc}")
+        if self.request.retries < 2:
+            raise self.retry(exc=exc, countdown=120)
+        raise
+
 # =============================================
 # PIPELINES COMPLEJOS (Workflows)
 # =============================================
@@ -18,6 +18,7 @@ if project_root not in sys.path:
 
 from src.utils.db_connector import create_db_engine
 from src.config import settings
+from src.utils.hot_cache import hot_cache
 
 # --- FUNCIONES DE INGESTA ESPECIALIZADAS Y ROBUSTAS ---
 
@@ -145,6 +146,19 @@ def ingest_daily_macro_data(engine, ticker, table_name, start_date, end_date):
     except Exception as e:
         logging.error(f"❌ Fallo en la ingesta diaria de '{table_name}': {e}"); return False
 
+def update_hot_bar_cache(engine):
+    """Publica en la caché caliente el último bar y la ventana reciente de cada ticker."""
+    since = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=settings.HOT_CACHE_BAR_WINDOW_DAYS)
+    query = text("""
+        SELECT ticker, timestamp, open, high, low, close, volume
+        FROM asset_metrics WHERE timestamp >= :since ORDER BY ticker, timestamp
+    """)
+    bars_df = pd.read_sql(query, engine, params={'since': since.to_pydatetime()})
+    if bars_df.empty:
+        logging.info("No hay barras recientes para la caché caliente."); return
+    bars_df['timestamp'] = pd.to_datetime(bars_df['timestamp'], utc=True)
+    hot_cache.write_bars(bars_df)
+
 # --- FUNCIÓN PRINCIPAL ---
 def run_daily_ingestion():
     engine = create_db_engine()
@@ -165,6 +179,8 @@ def run_daily_ingestion():
     for ticker, table_name in settings.MACRO_TICKERS.items():
         if not ingest_daily_macro_data(engine, ticker, table_name, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')):
             success_macros = False
+
+    update_hot_bar_cache(engine)
             
     if success_assets and success_funding and success_macros:
         logging.info("\n🎉 Proceso de ingesta diaria completado con éxito.")
@@ -1,8 +1,5 @@
 # src/production/03_generate_signals.py - VERSIÓN FINAL INTEGRADA
 
-import pandas as pd
-import numpy as np
-import joblib
 import os
 import sys
 import logging
@@ -17,6 +14,10 @@ if project_root not in sys.path:
 
 # Importar sistema de gestión de dinero
 from src.trading.advanced_money_management import advanced_money_manager
+from src.utils.hot_cache import hot_cache
+from src.modeling.model_server import model_server
+from src.utils.compact_schema import model_input, log_peak_rss
+from src.feature_engineering.latest_snapshot import feature_store, load_latest_features
 
 class CryptonitaTradingBot:
     """
@@ -83,31 +84,28 @@ class CryptonitaTradingBot:
         try:
             logging.info("🧠 Cargando modelo y generando predicciones...")
             
-            # Cargar modelo
-            model_path = os.path.join(project_root, 'models', 'ULTRA_MODEL_PACKAGE.joblib')
-            model_package = joblib.load(model_path)
-            primary_model = model_package['primary_model_pipeline']
-            meta_model = model_package['meta_model']
-            optimal_threshold = model_package['optimal_threshold']
-            model_features_list = model_package['feature_list']
+            # Modelo en memoria del proceso (se recarga solo si cambia el artefacto)
+            model = model_server.current()
+            optimal_threshold = model.optimal_threshold
+            original_model_features = model.features
             
-            # Cargar datos
-            data_path = os.path.join(project_root, 'notebooks', 'dataframes', 'model_input_features.parquet')
-            features_df = pd.read_parquet(data_path)
-            
-            # Preparar datos más recientes
-            features_df['timestamp'] = pd.to_datetime(features_df['timestamp'])
-            latest_features = features_df.sort_values('timestamp').groupby('ticker').last()
+            # Datos más recientes: primero la caché caliente (escrita por 02), si no el snapshot de 02
+            latest_features = hot_cache.latest_features(
+                columns=original_model_features + ['timestamp'], not_older_than=feature_store().mtime()
+            )
+            if latest_features is not None:
+                logging.info(f"🔥 Features leídas de la caché caliente (v{hot_cache.version('features')})")
+            else:
+                latest_features = load_latest_features(original_model_features + ['timestamp'])
             
-            original_model_features = [col.split('__')[1] for col in model_features_list]
-            X = latest_features[original_model_features]
+            # Frontera con el modelo: float64 aunque el parquet esté en esquema compacto
+            X = model_input(latest_features, original_model_features)
             
             # Generar predicciones
-            primary_proba = primary_model.predict_proba(X)
-            primary_preds = np.argmax(primary_proba, axis=1)
-            
-            meta_features = pd.DataFrame({'primary_model_prob': primary_proba.max(axis=1)}, index=X.index)
-            meta_confidence = meta_model.predict_proba(meta_features)[:, 1]
+            output = model.predict(X)
+            primary_proba = output['primary_proba']
+            primary_preds = output['primary_preds']
+            meta_confidence = output['meta_confidence']
             
             # Estructurar predicciones
             predictions = {}
@@ -119,6 +117,8 @@ class CryptonitaTradingBot:
                     'sell_probability': primary_proba[i][0]
                 }
             
+            hot_cache.write_predictions(predictions, timestamp=latest_features['timestamp'].max())
+            
             logging.info(f"✅ Predicciones generadas para {len(predictions)} activos")
             logging.info(f"📊 Threshold modelo: {optimal_threshold:.3f}, Bot BUY: {self.buy_confidence_threshold:.3f}")
             
@@ -409,4 +409,5 @@ def run_inference():
     bot.run_trading_bot()
 
 if __name__ == "__main__":
-    run_inference()
\ No newline at end of file
+    run_inference()
+    log_peak_rss('03_generate_signals')
\ No newline at end of file
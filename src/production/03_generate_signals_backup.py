@@ -17,6 +17,8 @@ if project_root not in sys.path:
 
 # Importar sistema de gestión de dinero
 from src.trading.advanced_money_management import advanced_money_manager
+from src.utils.compact_schema import expand_frame
+from src.feature_engineering.latest_snapshot import read_feature_store
 
 class CryptonitaTradingBot:
     """
@@ -92,8 +94,8 @@ class CryptonitaTradingBot:
             model_features_list = model_package['feature_list']
             
             # Cargar datos
-            data_path = os.path.join(project_root, 'notebooks', 'dataframes', 'model_input_features.parquet')
-            features_df = pd.read_parquet(data_path)
+            # Meses con la última fila de cada ticker, expandidos (el almacén puede estar en esquema compacto)
+            features_df = expand_frame(read_feature_store(latest=True))
             
             # Preparar datos más recientes
             features_df['timestamp'] = pd.to_datetime(features_df['timestamp'])
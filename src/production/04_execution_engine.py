@@ -14,6 +14,7 @@ if project_root not in sys.path:
 
 from src.production.exchange_connector import BinanceConnector
 from src.config import settings
+from src.utils.compact_schema import log_peak_rss
 
 def run_execution_engine():
     """
@@ -92,4 +93,5 @@ def run_execution_engine():
     logging.info("\n--- [FIN] Motor de Ejecución Finalizado ---")
 
 if __name__ == "__main__":
-    run_execution_engine()
\ No newline at end of file
+    run_execution_engine()
+    log_peak_rss('04_execution_engine')
\ No newline at end of file
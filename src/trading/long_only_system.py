@@ -1,8 +1,5 @@
 # src/trading/long_only_trading_system.py
 
-import pandas as pd
-import numpy as np
-import joblib
 import os
 import sys
 import logging
@@ -17,6 +14,9 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from src.trading.advanced_money_management import advanced_money_manager
+from src.utils.compact_schema import model_input
+from src.feature_engineering.latest_snapshot import load_latest_features
+from src.modeling.model_server import model_server
 
 class LongOnlyTradingSystem:
     """
@@ -77,20 +77,18 @@ class LongOnlyTradingSystem:
     def _load_model_and_data(self):
         """Carga modelo y datos"""
         try:
-            model_path = os.path.join(project_root, 'models', 'ULTRA_MODEL_PACKAGE.joblib')
-            model_package = joblib.load(model_path)
+            model = model_server.current()
             
-            data_path = os.path.join(project_root, 'notebooks', 'dataframes', 'model_input_features.parquet')
-            features_df = pd.read_parquet(data_path)
+            # Snapshot de 02 (una fila por ticker); el almacén completo solo si no es válido
+            latest_features = load_latest_features(model.features + ['timestamp'])
             
             logging.info("✅ Modelo y datos cargados exitosamente")
             
             return {
-                'primary_model': model_package['primary_model_pipeline'],
-                'meta_model': model_package['meta_model'],
-                'optimal_threshold': model_package['optimal_threshold'],
-                'features_list': model_package['feature_list'],
-                'features_df': features_df
+                'model': model,
+                'optimal_threshold': model.optimal_threshold,
+                'features_list': model.feature_list,
+                'latest_features': latest_features
             }
         except Exception as e:
             logging.error(f"❌ Error cargando modelo: {e}")
@@ -98,20 +96,16 @@ class LongOnlyTradingSystem:
     
     def _generate_predictions(self, model_data):
         """Genera predicciones del modelo"""
-        features_df = model_data['features_df']
-        features_df['timestamp'] = pd.to_datetime(features_df['timestamp'])
-        latest_features = features_df.sort_values('timestamp').groupby('ticker').last()
+        latest_features = model_data['latest_features']
         
-        # Preparar features
-        original_features = [col.split('__')[1] for col in model_data['features_list']]
-        X = latest_features[original_features]
+        # Preparar features (float64 aunque el parquet esté en esquema compacto)
+        X = model_input(latest_features, model_data['model'].features)
         
         # Predicciones
-        primary_proba = model_data['primary_model'].predict_proba(X)
-        primary_preds = np.argmax(primary_proba, axis=1)
-        
-        meta_features = pd.DataFrame({'primary_model_prob': primary_proba.max(axis=1)}, index=X.index)
-        meta_confidence = model_data['meta_model'].predict_proba(meta_features)[:, 1]
+        output = model_data['model'].predict(X)
+        primary_proba = output['primary_proba']
+        primary_preds = output['primary_preds']
+        meta_confidence = output['meta_confidence']
         
         # Estructura de predicciones
         predictions = {}
@@ -0,0 +1,178 @@
+# src/utils/backend_parity.py
+"""
+Suite de paridad entre backends de almacenamiento.
+
+Copia las tablas del pipeline desde PostgreSQL a un archivo DuckDB temporal y
+ejecuta las mismas consultas (ingesta, features, señales y dashboard) en ambos
+motores, comparando los resultados con tolerancia numérica.
+
+Uso:  python src/utils/backend_parity.py [--keep]
+"""
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text
+import tempfile
+import sys
+import os
+import logging
+
+# --- Configuración ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+from src.utils.db_connector import create_db_engine
+from src.utils.db_streaming import BulkCopyWriter
+from src.utils.storage_backend import EMBEDDED_SCHEMA, truncate_table, table_columns, list_tables
+
+# Consultas SQL que el pipeline lanza directamente contra la base de datos
+PARITY_QUERIES = {
+    # 01 - Ingesta incremental
+    'ingest_max_ts_per_ticker': ("SELECT ticker, MAX(timestamp) AS max_ts FROM asset_metrics GROUP BY ticker", {}),
+    'ingest_funding_max_ts': ("SELECT ticker, MAX(timestamp) AS max_ts FROM derivatives_funding_rates GROUP BY ticker", {}),
+    'ingest_macro_max_ts': ("SELECT MAX(timestamp) AS max_ts FROM macro_gc", {}),
+    # 02 - Preparación de características
+    'features_asset_metrics': ("SELECT ticker, timestamp, open, high, low, close, volume FROM asset_metrics", {}),
+    'features_funding': ("SELECT timestamp, ticker, funding_rate FROM derivatives_funding_rates", {}),
+    'features_macro_spy': ("SELECT timestamp, close AS spy_close FROM macro_spy", {}),
+    'features_macro_gc': ("SELECT timestamp, close AS gc_close FROM macro_gc", {}),
+    # Indicadores técnicos / patrones (lectura ordenada por ticker)
+    'indicators_ordered_scan': ("SELECT ticker, timestamp, open, high, low, close, volume FROM asset_metrics ORDER BY ticker, timestamp", {}),
+    # Agregados analíticos típicos del dashboard
+    'dashboard_daily_close': (
+        "SELECT ticker, DATE(timestamp) AS date, AVG(close) AS avg_close, STDDEV(close) AS std_close, "
+        "SUM(volume) AS volume FROM asset_metrics GROUP BY ticker, DATE(timestamp)", {}
+    ),
+    'dashboard_last_days': (
+        "SELECT ticker, COUNT(*) AS n, MAX(close) AS max_close, MIN(close) AS min_close FROM asset_metrics "
+        "WHERE timestamp >= NOW() - :days * INTERVAL '1 day' GROUP BY ticker", {'days': 30}
+    ),
+}
+
+# Métodos de los servicios del dashboard que se comparan de extremo a extremo
+SERVICE_CALLS = [
+    ('data_service', 'get_top_performers', {'days': 7}),
+    ('data_service', 'get_asset_metrics_summary', {}),
+    ('data_service', 'get_recent_trades', {'limit': 10}),
+    ('analytics', 'get_market_sentiment', {}),
+    ('analytics', 'get_asset_performance_ranking', {'days': 30}),
+    ('analytics', 'get_volatility_analysis', {'days': 30}),
+    ('analytics', 'calculate_correlation_matrix', {}),
+]
+
+def copy_tables(source_engine, target_engine, tables: list = None) -> dict:
+    """Copia las tablas del pipeline de un backend a otro (vaciando el destino)."""
+    tables = tables or list(EMBEDDED_SCHEMA)
+    source_tables = set(list_tables(source_engine))
+    copied = {}
+    with target_engine.connect() as connection:
+        with connection.begin():
+            for table in tables:
+                if table not in source_tables:
+                    logging.warning(f" -> '{table}' no existe en el origen. Saltando.")
+                    continue
+                df = pd.read_sql(text(f"SELECT * FROM {table}"), source_engine)
+                truncate_table(connection, table)
+                target_cols = table_columns(connection, table)
+                writer = BulkCopyWriter(connection, table, [c for c in df.columns if c in target_cols])
+                writer.write(df)
+                copied[table] = writer.rows_written
+    return copied
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Normaliza tipos y orden de filas para poder comparar resultados de motores distintos."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], utc=True)
+        elif df[col].dtype == object:
+            converted = pd.to_numeric(df[col], errors='coerce')
+            if converted.notna().sum() == df[col].notna().sum():
+                df[col] = converted.astype(float)
+            else:
+                df[col] = df[col].astype(str)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+def frames_match(left: pd.DataFrame, right: pd.DataFrame, rtol: float = 1e-9) -> tuple:
+    """Compara dos resultados; devuelve (ok, motivo)."""
+    if list(left.columns) != list(right.columns):
+        return False, f"columnas distintas: {list(left.columns)} vs {list(right.columns)}"
+    if len(left) != len(right):
+        return False, f"filas distintas: {len(left)} vs {len(right)}"
+    left, right = _normalize(left), _normalize(right)
+    for col in left.columns:
+        a, b = left[col], right[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            if not np.allclose(a.to_numpy(float), b.to_numpy(float), rtol=rtol, atol=0, equal_nan=True):
+                return False, f"valores distintos en '{col}'"
+        elif not a.astype(str).equals(b.astype(str)):
+            return False, f"valores distintos en '{col}'"
+    return True, ""
+
+def _results_match(left, right, rtol: float = 1e-9) -> bool:
+    """Comparación recursiva de los dict/list que devuelven los servicios."""
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_results_match(left[k], right[k], rtol) for k in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_results_match(a, b, rtol) for a, b in zip(left, right))
+    if isinstance(left, (int, float, np.number)) and isinstance(right, (int, float, np.number)):
+        return bool(np.isclose(float(left), float(right), rtol=rtol, atol=0, equal_nan=True))
+    return left == right
+
+def run_parity_suite(reference_engine, candidate_engine, rtol: float = 1e-9) -> dict:
+    """Ejecuta todas las consultas y servicios en ambos motores. Devuelve {nombre: (ok, motivo)}."""
+    from src.web.api.database import CryptonitaDataService
+    from src.web.api.analytics import AnalyticsService
+
+    results = {}
+    for name, (query, params) in PARITY_QUERIES.items():
+        try:
+            left = pd.read_sql(text(query), reference_engine, params=params)
+            right = pd.read_sql(text(query), candidate_engine, params=params)
+            results[name] = frames_match(left, right, rtol)
+        except Exception as e:
+            results[name] = (False, f"error: {e}")
+
+    services = {
+        'reference': {'data_service': CryptonitaDataService(reference_engine), 'analytics': AnalyticsService(reference_engine)},
+        'candidate': {'data_service': CryptonitaDataService(candidate_engine), 'analytics': AnalyticsService(candidate_engine)},
+    }
+    for service_name, method, kwargs in SERVICE_CALLS:
+        left = getattr(services['reference'][service_name], method)(**kwargs)
+        right = getattr(services['candidate'][service_name], method)(**kwargs)
+        ok = _results_match(left, right, rtol)
+        results[f"{service_name}.{method}"] = (ok, "" if ok else f"{left!r} vs {right!r}"[:300])
+
+    return results
+
+def main(keep: bool = False) -> bool:
+    logging.info("--- [INICIO] Suite de paridad PostgreSQL vs DuckDB ---")
+    reference_engine = create_db_engine('postgresql')
+    if not reference_engine:
+        logging.error("No se pudo conectar a PostgreSQL. Abortando."); return False
+
+    tmp_dir = tempfile.mkdtemp(prefix='cryptonita_parity_')
+    settings.EMBEDDED_DB_PATH = os.path.join(tmp_dir, 'parity.duckdb')
+    candidate_engine = create_db_engine('duckdb')
+
+    copied = copy_tables(reference_engine, candidate_engine)
+    logging.info(f"Tablas copiadas a DuckDB: {copied}")
+
+    results = run_parity_suite(reference_engine, candidate_engine)
+    for name, (ok, reason) in results.items():
+        logging.info(f"  {'✅' if ok else '❌'} {name} {reason}")
+
+    passed = sum(ok for ok, _ in results.values())
+    logging.info(f"Resultado: {passed}/{len(results)} comprobaciones idénticas.")
+    if keep:
+        logging.info(f"Archivo DuckDB conservado en: {settings.EMBEDDED_DB_PATH}")
+    else:
+        candidate_engine.dispose()
+        os.remove(settings.EMBEDDED_DB_PATH)
+    return passed == len(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main(keep='--keep' in sys.argv) else 1)
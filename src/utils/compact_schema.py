@@ -0,0 +1,172 @@
+# src/utils/compact_schema.py
+
+import pandas as pd
+import numpy as np
+import subprocess
+import resource
+import tempfile
+import json
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+
+# Los timestamps diarios se guardan como días desde 1970-01-01 UTC (int32)
+NS_PER_DAY = 86_400 * 10**9
+
+# Cota del error relativo de una columna guardada en float32 (para comparar frames)
+FLOAT32_RTOL = float(np.finfo(np.float32).eps)
+
+# --- CONVERSIONES ---
+
+def to_day_offsets(timestamps) -> np.ndarray:
+    """Timestamps diarios (normalizados) -> días desde 1970-01-01 como int32."""
+    ns = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).as_unit('ns').asi8
+    if (ns % NS_PER_DAY).any():
+        raise ValueError("Los timestamps no están normalizados a día: no caben en días enteros")
+    return (ns // NS_PER_DAY).astype(np.int32)
+
+def from_day_offsets(days) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(np.asarray(days, dtype=np.int64) * NS_PER_DAY).tz_localize('UTC')
+
+def _fits_float32(values: np.ndarray) -> bool:
+    """True si todos los valores finitos están dentro del rango de float32 (sin desbordar a inf)."""
+    finite = values[np.isfinite(values)]
+    return finite.size == 0 or bool(np.abs(finite).max() < np.finfo(np.float32).max)
+
+def compact_frame(df: pd.DataFrame, time_column: str = 'timestamp', float32_columns: list = None) -> pd.DataFrame:
+    """
+    Representación compacta de un frame de features diario:
+      - float64 -> float32 solo en las columnas de `float32_columns` (por defecto
+        COMPACT_FLOAT32_COLUMNS, features sin escala) que quepan en su rango; los
+        precios y el resto de columnas se quedan en float64
+      - ticker  -> categórica (códigos int8/int16 + diccionario, también en Parquet)
+      - timestamp -> días desde 1970-01-01 (int32)
+    """
+    float32_columns = set(settings.COMPACT_FLOAT32_COLUMNS if float32_columns is None else float32_columns)
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col == time_column and not pd.api.types.is_integer_dtype(series):
+            columns[col] = to_day_offsets(series)
+        elif col == 'ticker':
+            columns[col] = series.astype('category')
+        elif col in float32_columns and series.dtype == np.float64 and _fits_float32(series.to_numpy()):
+            columns[col] = series.to_numpy().astype(np.float32)
+        else:
+            columns[col] = series
+    return pd.DataFrame(columns, index=df.index)
+
+def expand_frame(df: pd.DataFrame, time_column: str = 'timestamp') -> pd.DataFrame:
+    """Inverso de compact_frame: float64, ticker como texto y timestamp UTC. Sin efecto en frames ya expandidos."""
+    df = expand_timestamps(df.copy(), time_column)
+    for col in df.columns:
+        if df[col].dtype == np.float32:
+            df[col] = df[col].astype(np.float64)
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    if isinstance(df.index, pd.CategoricalIndex):
+        df.index = pd.Index(df.index.astype(object), name=df.index.name)
+    return df
+
+def expand_timestamps(df: pd.DataFrame, time_column: str = 'timestamp') -> pd.DataFrame:
+    """Solo la columna de tiempo a datetime UTC (en sitio); el resto se queda compacto."""
+    if time_column in df.columns:
+        if pd.api.types.is_integer_dtype(df[time_column]):
+            df[time_column] = from_day_offsets(df[time_column])
+        else:
+            df[time_column] = pd.to_datetime(df[time_column], utc=True)
+    return df
+
+def model_input(df: pd.DataFrame, features: list) -> pd.DataFrame:
+    """Frontera con el modelo: las features pedidas, en ese orden y en float64 (como se entrenó)."""
+    return df[features].astype(np.float64)
+
+def latest_per_ticker(features_df: pd.DataFrame, time_column: str = 'timestamp') -> pd.DataFrame:
+    """
+    Último registro por ticker (índice = ticker), como
+    `features_df.sort_values('timestamp').groupby('ticker').last()`, pero
+    valiendo para frames compactos o no. Devuelve el resultado expandido.
+    """
+    latest = features_df.sort_values(time_column, kind='mergesort').groupby('ticker', observed=True).last()
+    return expand_frame(latest, time_column)
+
+def write_feature_frame(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """Escribe `df` en compacto si COMPACT_SCHEMA está activo. Devuelve lo escrito."""
+    if settings.COMPACT_SCHEMA:
+        df = compact_frame(df)
+    df.to_parquet(path)
+    return df
+
+# --- MEMORIA ---
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso (MB)."""
+    # En Linux, VmHWM es del espacio de direcciones actual; ru_maxrss arrastra el
+    # pico del proceso padre a través de fork + exec (p. ej. los workers de Celery)
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def log_peak_rss(stage: str):
+    logging.info(f"📈 Pico de memoria (RSS) de {stage}: {peak_rss_mb():.1f} MB")
+
+# --- MEDICIÓN ---
+
+def _synthetic_features(n_tickers: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2018-01-01', periods=n_days, freq='D', tz='UTC')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (n_tickers, n_days)), axis=1)).ravel()
+    df = pd.DataFrame({
+        'timestamp': np.tile(dates, n_tickers),
+        'ticker': np.repeat([f"T{i:04d}-USD" for i in range(n_tickers)], n_days),
+        'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+        'volume': rng.integers(1, 10**9, n_tickers * n_days).astype(float),
+    })
+    for col in ['macd_signal', 'macd_hist', 'funding_rate', 'spy_close', 'vix_close', 'tnx_close',
+                'dxy_close', 'gc_close', 'cl_close', 'log_return', 'volatility_7d',
+                'price_to_ema_ratio', 'macd_norm', 'log_return_gc_close']:
+        df[col] = rng.normal(0, 1, len(df))
+    return df
+
+def _measure_consumer(path: str, features: list):
+    """Lo que hacen 03/05 con el parquet: leerlo, último vector por ticker y matriz del modelo por ticker."""
+    features_df = pd.read_parquet(path)
+    in_memory = features_df.memory_usage(deep=True).sum() / 1e6
+    X = model_input(latest_per_ticker(features_df), features)
+    for ticker in features_df['ticker'].unique():
+        model_input(features_df[features_df['ticker'] == ticker], features)
+    print(json.dumps({'frame_mb': in_memory, 'peak_rss_mb': peak_rss_mb(), 'rows': len(X)}))
+
+def run_measurement(n_tickers: int = 300, n_days: int = 2500):
+    """Pico de RSS de lectura + consumo del parquet de features en formato float64 y compacto, cada uno en su proceso."""
+    features = [c for c in _synthetic_features(1, 2).columns if c not in ('timestamp', 'ticker', 'open', 'high', 'low', 'volume')]
+    df = _synthetic_features(n_tickers, n_days)
+    print(f"📊 {n_tickers} tickers x {n_days} días ({len(df):,} filas)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, frame in [('float64', df), ('compacto', compact_frame(df))]:
+            path = os.path.join(tmp, f"{label}.parquet")
+            frame.to_parquet(path)
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--consume', path, ','.join(features)],
+                capture_output=True, text=True, check=True
+            )
+            stats = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"   {label:9s}: parquet {os.path.getsize(path) / 1e6:6.1f} MB | "
+                  f"frame {stats['frame_mb']:7.1f} MB | pico RSS {stats['peak_rss_mb']:7.1f} MB")
+
+if __name__ == "__main__":
+    if '--consume' in sys.argv:
+        i = sys.argv.index('--consume')
+        _measure_consumer(sys.argv[i + 1], sys.argv[i + 2].split(','))
+    else:
+        run_measurement()
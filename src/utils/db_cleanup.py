@@ -1,6 +1,5 @@
 # src/utils/db_cleanup.py
 
-from sqlalchemy import text
 import sys
 import os
 import logging
@@ -12,6 +11,7 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from src.utils.db_connector import create_db_engine
+from src.utils.storage_backend import truncate_table
 
 def cleanup_database():
     """
@@ -38,7 +38,7 @@ def cleanup_database():
                     logging.info(f" -> Vaciando la tabla '{table}'...")
                     # TRUNCATE es más rápido que DELETE y resetea los contadores.
                     # CASCADE elimina registros en tablas dependientes si existen.
-                    connection.execute(text(f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE;"))
+                    truncate_table(connection, table, restart_identity=True)
                     logging.info(f"    ✅ Tabla '{table}' vaciada con éxito.")
                 # La transacción se confirma (commit) al salir.
         logging.info("\n🎉 Proceso de limpieza de la base de datos completado con éxito.")
@@ -1,7 +1,7 @@
 # src/utils/db_connector.py
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import text
 import sys
 
 # --- Bloque de importación ---
@@ -12,23 +12,20 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 # --- Fin del bloque de importación ---
 
-from src.config import settings
+from src.utils.storage_backend import build_engine
 
-def create_db_engine():
+def create_db_engine(backend: str = None):
     """
-    Crea y retorna un motor de conexión de SQLAlchemy para PostgreSQL
-    usando las credenciales del archivo de configuración.
+    Crea y retorna un motor de conexión de SQLAlchemy. Por defecto usa el
+    backend de settings.DB_BACKEND: PostgreSQL con las credenciales del archivo
+    de configuración, o DuckDB embebido sobre un único archivo local.
     """
     try:
-        # Construimos la URL de conexión
-        db_url = (
-            f"postgresql+psycopg2://{settings.DB_USER}:{settings.DB_PASSWORD}@"
-            f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
-        )
-        engine = create_engine(db_url)
+        engine = build_engine(backend)
         # Probamos la conexión
-        engine.connect()
-        print("Conexión a la base de datos establecida exitosamente.")
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        print(f"Conexión a la base de datos ({engine.dialect.name}) establecida exitosamente.")
         return engine
     except Exception as e:
         print(f"Error al conectar con la base de datos: {e}")
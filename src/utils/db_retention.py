@@ -0,0 +1,334 @@
+# src/utils/db_retention.py
+
+import pandas as pd
+from sqlalchemy import text, inspect
+from datetime import datetime, timezone
+import hashlib
+import sys
+import os
+import logging
+
+# --- Configuración ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.db_connector import create_db_engine
+from src.config import settings
+
+CATALOG_TABLE = 'archive_catalog'
+
+CATALOG_DDL = f"""
+CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+    id INTEGER DEFAULT nextval('{CATALOG_TABLE}_id_seq') PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    partition_key TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    min_ts TIMESTAMPTZ,
+    max_ts TIMESTAMPTZ,
+    checksum TEXT,
+    archived_at TIMESTAMPTZ NOT NULL,
+    UNIQUE (table_name, partition_key)
+);
+"""
+
+# Estructura de las tablas de agregados diarios (una por tipo de rollup)
+ROLLUP_DDL = {
+    'ohlcv': "CREATE TABLE IF NOT EXISTS {table} (ticker TEXT, day DATE, open DOUBLE PRECISION, high DOUBLE PRECISION, low DOUBLE PRECISION, close DOUBLE PRECISION, volume DOUBLE PRECISION, bar_count INTEGER, PRIMARY KEY (ticker, day));",
+    'funding': "CREATE TABLE IF NOT EXISTS {table} (ticker TEXT, day DATE, funding_rate_mean FLOAT, funding_rate_sum FLOAT, funding_rate_last FLOAT, tick_count INTEGER, PRIMARY KEY (ticker, day));",
+    'trades': "CREATE TABLE IF NOT EXISTS {table} (day DATE, ticker VARCHAR(20), action VARCHAR(10), trade_count INTEGER, total_size FLOAT, notional FLOAT, avg_price FLOAT, PRIMARY KEY (day, ticker, action));",
+}
+
+# --- FUNCIONES DE AGREGACIÓN (ROLLUPS) ---
+
+def _rollup_ohlcv(df: pd.DataFrame, time_column: str) -> pd.DataFrame:
+    """Agrega barras intradía a velas diarias."""
+    df = df.sort_values(time_column)
+    df['day'] = df[time_column].dt.normalize().dt.date
+    return df.groupby(['ticker', 'day']).agg(
+        open=('open', 'first'), high=('high', 'max'), low=('low', 'min'),
+        close=('close', 'last'), volume=('volume', 'sum'), bar_count=('close', 'size')
+    ).reset_index()
+
+def _rollup_funding(df: pd.DataFrame, time_column: str) -> pd.DataFrame:
+    """Agrega los ticks de funding (cada 8h) a un registro diario por ticker."""
+    df = df.sort_values(time_column)
+    df['day'] = df[time_column].dt.normalize().dt.date
+    return df.groupby(['ticker', 'day']).agg(
+        funding_rate_mean=('funding_rate', 'mean'), funding_rate_sum=('funding_rate', 'sum'),
+        funding_rate_last=('funding_rate', 'last'), tick_count=('funding_rate', 'size')
+    ).reset_index()
+
+def _rollup_trades(df: pd.DataFrame, time_column: str) -> pd.DataFrame:
+    """Agrega el trade_log por día, ticker y acción."""
+    df = df.copy()
+    df['day'] = df[time_column].dt.normalize().dt.date
+    df['notional'] = df['price'] * df['size']
+    rollup = df.groupby(['day', 'ticker', 'action']).agg(
+        trade_count=('size', 'size'), total_size=('size', 'sum'), notional=('notional', 'sum')
+    ).reset_index()
+    rollup['avg_price'] = rollup['notional'] / rollup['total_size'].where(rollup['total_size'] != 0)
+    return rollup
+
+ROLLUPS = {
+    'ohlcv': _rollup_ohlcv,
+    'funding': _rollup_funding,
+    'trades': _rollup_trades,
+}
+
+# --- FUNCIONES AUXILIARES ---
+
+def _file_checksum(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _as_utc(value):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+def _archive_path(table_name: str, partition_key: str) -> str:
+    """Ruta relativa (a ARCHIVE_DIR) del archivo Parquet de una partición."""
+    return os.path.join(table_name, f"{table_name}_{partition_key}.parquet")
+
+def _pending_partitions(connection, table_name: str, time_column: str, cutoff: pd.Timestamp) -> list:
+    """Meses completos anteriores al corte que todavía tienen filas en caliente."""
+    cutoff_month = cutoff.tz_localize(None).to_period('M').to_timestamp().tz_localize('UTC')
+    query = text(
+        f"SELECT DISTINCT date_trunc('month', {time_column}) AS month FROM {table_name} "
+        f"WHERE {time_column} < :cutoff ORDER BY month"
+    )
+    months = pd.read_sql(query, connection, params={'cutoff': cutoff_month.to_pydatetime()})
+    return [_as_utc(m) for m in months['month']]
+
+def ensure_catalog(engine):
+    """Crea la tabla del catálogo de archivos si no existe."""
+    with engine.connect() as connection:
+        with connection.begin():
+            connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {CATALOG_TABLE}_id_seq;"))
+            connection.execute(text(CATALOG_DDL))
+
+def reconcile_archive(engine) -> dict:
+    """
+    Resuelve los `.tmp` que dejó una ejecución interrumpida entre el commit de la
+    transacción y la publicación del archivo: si su checksum es el del catálogo,
+    la transacción se confirmó (las filas ya no están en caliente) y se publica;
+    si no, las filas siguen en caliente y el temporal se borra.
+    """
+    result = {'published': 0, 'removed': 0}
+    if not os.path.isdir(settings.ARCHIVE_DIR):
+        return result
+    tmp_paths = [
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(settings.ARCHIVE_DIR) for name in names if name.endswith('.parquet.tmp')
+    ]
+    if not tmp_paths:
+        return result
+    catalog = pd.read_sql(text(f"SELECT file_path, checksum FROM {CATALOG_TABLE}"), engine)
+    checksums = dict(zip(catalog['file_path'], catalog['checksum']))
+    for tmp_path in tmp_paths:
+        final_path = tmp_path[:-len('.tmp')]
+        relative_path = os.path.relpath(final_path, settings.ARCHIVE_DIR)
+        if checksums.get(relative_path) == _file_checksum(tmp_path):
+            os.replace(tmp_path, final_path)
+            result['published'] += 1
+            logging.warning(f" -> Archivo '{relative_path}' confirmado en el catálogo pero sin publicar: publicado.")
+        else:
+            os.remove(tmp_path)
+            result['removed'] += 1
+            logging.warning(f" -> Temporal huérfano '{relative_path}.tmp' sin transacción confirmada: eliminado.")
+    return result
+
+# --- ARCHIVADO DE UNA PARTICIÓN ---
+
+def archive_partition(engine, table_name: str, policy: dict, month_start: pd.Timestamp, dry_run: bool = False) -> int:
+    """
+    Archiva un mes de `table_name`: exporta las filas a Parquet, recalcula el
+    agregado diario, borra las filas en caliente y registra el archivo en el catálogo.
+    Devuelve el número de filas archivadas.
+    """
+    time_column = policy['time_column']
+    month_end = month_start + pd.offsets.MonthBegin(1)
+    partition_key = month_start.strftime('%Y-%m')
+    params = {'start': month_start.to_pydatetime(), 'end': month_end.to_pydatetime()}
+
+    hot_df = pd.read_sql(
+        text(f"SELECT * FROM {table_name} WHERE {time_column} >= :start AND {time_column} < :end"),
+        engine, params=params
+    )
+    if hot_df.empty:
+        return 0
+    hot_df[time_column] = pd.to_datetime(hot_df[time_column], utc=True)
+
+    if dry_run:
+        logging.info(f" -> [DRY-RUN] {table_name} {partition_key}: se archivarían {len(hot_df)} filas.")
+        return len(hot_df)
+
+    relative_path = _archive_path(table_name, partition_key)
+    final_path = os.path.join(settings.ARCHIVE_DIR, relative_path)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+    # Si el mes ya estaba archivado (filas que llegaron tarde), fusionamos con el archivo existente
+    partition_df = hot_df
+    if os.path.exists(final_path):
+        archived_df = pd.read_parquet(final_path)
+        partition_df = pd.concat([archived_df, hot_df], ignore_index=True).drop_duplicates()
+    partition_df = partition_df.sort_values(time_column).reset_index(drop=True)
+
+    # Escribimos a un fichero temporal; solo lo publicamos tras confirmar la transacción
+    # (si el proceso muere entre medias, reconcile_archive lo resuelve en la siguiente ejecución)
+    tmp_path = final_path + '.tmp'
+    partition_df.to_parquet(tmp_path, compression=settings.ARCHIVE_COMPRESSION, index=False)
+
+    rollup_df = ROLLUPS[policy['rollup']](partition_df, time_column)
+    rollup_table = policy['rollup_table']
+    try:
+        with engine.connect() as connection:
+            with connection.begin():
+                connection.execute(text(ROLLUP_DDL[policy['rollup']].format(table=rollup_table)))
+                connection.execute(
+                    text(f"DELETE FROM {rollup_table} WHERE day >= :start_day AND day < :end_day"),
+                    {'start_day': month_start.date(), 'end_day': month_end.date()}
+                )
+                rollup_df.to_sql(rollup_table, connection, if_exists='append', index=False, method='multi')
+                connection.execute(
+                    text(f"DELETE FROM {table_name} WHERE {time_column} >= :start AND {time_column} < :end"),
+                    params
+                )
+                connection.execute(
+                    text(f"DELETE FROM {CATALOG_TABLE} WHERE table_name = :table_name AND partition_key = :partition_key"),
+                    {'table_name': table_name, 'partition_key': partition_key}
+                )
+                connection.execute(
+                    text(f"INSERT INTO {CATALOG_TABLE} (table_name, partition_key, file_path, row_count, min_ts, max_ts, checksum, archived_at) "
+                         "VALUES (:table_name, :partition_key, :file_path, :row_count, :min_ts, :max_ts, :checksum, :archived_at)"),
+                    {
+                        'table_name': table_name, 'partition_key': partition_key, 'file_path': relative_path,
+                        'row_count': len(partition_df),
+                        'min_ts': partition_df[time_column].min().to_pydatetime(),
+                        'max_ts': partition_df[time_column].max().to_pydatetime(),
+                        'checksum': _file_checksum(tmp_path),
+                        'archived_at': datetime.now(timezone.utc),
+                    }
+                )
+        os.replace(tmp_path, final_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    logging.info(f"    ✅ {table_name} {partition_key}: {len(hot_df)} filas archivadas en '{relative_path}' "
+                 f"({len(rollup_df)} agregados en '{rollup_table}').")
+    return len(hot_df)
+
+# --- PROCESO PRINCIPAL DE RETENCIÓN ---
+
+def run_retention(policies: dict = None, dry_run: bool = False, now: datetime = None) -> dict:
+    """
+    Aplica las políticas de retención: todo mes completo más antiguo que
+    `hot_days` se agrega, se exporta a Parquet comprimido y se elimina de PostgreSQL.
+    """
+    policies = policies or settings.RETENTION_POLICIES
+    now = _as_utc(now or datetime.now(timezone.utc))
+
+    logging.info("--- [INICIO] Proceso de retención y archivado de datos. ---")
+    engine = create_db_engine()
+    if not engine:
+        logging.error("No se pudo conectar a la base de datos. Abortando.")
+        return {}
+
+    if not dry_run:
+        ensure_catalog(engine)
+        reconcile_archive(engine)
+    existing_tables = set(inspect(engine).get_table_names())
+    summary = {}
+
+    for table_name, policy in policies.items():
+        if table_name not in existing_tables:
+            logging.warning(f" -> La tabla '{table_name}' no existe. Saltando.")
+            continue
+        cutoff = now - pd.Timedelta(days=policy['hot_days'])
+        try:
+            with engine.connect() as connection:
+                partitions = _pending_partitions(connection, table_name, policy['time_column'], cutoff)
+            logging.info(f" -> '{table_name}': {len(partitions)} partición(es) mensual(es) anteriores a {cutoff.date()}.")
+            summary[table_name] = sum(
+                archive_partition(engine, table_name, policy, month_start, dry_run=dry_run)
+                for month_start in partitions
+            )
+        except Exception as e:
+            logging.error(f"❌ Error archivando '{table_name}': {e}")
+            summary[table_name] = None
+
+    logging.info(f"🎉 Retención completada: {summary}")
+    return summary
+
+# --- LECTURA TRANSPARENTE (CALIENTE + ARCHIVO) ---
+
+def read_table_range(engine, table_name: str, start=None, end=None, columns: list = None) -> pd.DataFrame:
+    """
+    Lee `table_name` en el rango [start, end) uniendo las filas en caliente de
+    PostgreSQL con las particiones archivadas en Parquet que solapan el rango.
+    """
+    time_column = settings.RETENTION_POLICIES.get(table_name, {}).get('time_column', 'timestamp')
+    start, end = _as_utc(start), _as_utc(end)
+
+    select_cols = '*'
+    if columns:
+        select_cols = ', '.join(dict.fromkeys([time_column] + list(columns)))
+    conditions, params = [], {}
+    if start is not None:
+        conditions.append(f"{time_column} >= :start"); params['start'] = start.to_pydatetime()
+    if end is not None:
+        conditions.append(f"{time_column} < :end"); params['end'] = end.to_pydatetime()
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    hot_df = pd.read_sql(text(f"SELECT {select_cols} FROM {table_name}{where}"), engine, params=params)
+    frames = [hot_df]
+
+    if CATALOG_TABLE in inspect(engine).get_table_names():
+        catalog_conditions, catalog_params = ["table_name = :table_name"], {'table_name': table_name}
+        if start is not None:
+            catalog_conditions.append("max_ts >= :start"); catalog_params['start'] = params['start']
+        if end is not None:
+            catalog_conditions.append("min_ts < :end"); catalog_params['end'] = params['end']
+        catalog = pd.read_sql(
+            text(f"SELECT file_path FROM {CATALOG_TABLE} WHERE {' AND '.join(catalog_conditions)} ORDER BY partition_key"),
+            engine, params=catalog_params
+        )
+        for relative_path in catalog['file_path']:
+            cold_df = pd.read_parquet(os.path.join(settings.ARCHIVE_DIR, relative_path),
+                                      columns=list(dict.fromkeys([time_column] + list(columns))) if columns else None)
+            if start is not None:
+                cold_df = cold_df[cold_df[time_column] >= start]
+            if end is not None:
+                cold_df = cold_df[cold_df[time_column] < end]
+            frames.append(cold_df)
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return hot_df
+    df = pd.concat(frames, ignore_index=True)
+    df[time_column] = pd.to_datetime(df[time_column], utc=True)
+    return df.sort_values(time_column).reset_index(drop=True)
+
+if __name__ == "__main__":
+    dry_run = '--dry-run' in sys.argv
+    if dry_run:
+        print("ℹ️ Modo DRY-RUN: no se modificará la base de datos.")
+        run_retention(dry_run=True)
+    else:
+        print("⚠️ ADVERTENCIA: Las filas antiguas se moverán a Parquet y se BORRARÁN de PostgreSQL:")
+        for table_name, policy in settings.RETENTION_POLICIES.items():
+            print(f"   - {table_name} (> {policy['hot_days']} días)")
+        confirm = input("Escribe 'CONFIRMAR' para continuar: ")
+        if confirm == "CONFIRMAR":
+            run_retention()
+        else:
+            print("Retención cancelada por el usuario.")
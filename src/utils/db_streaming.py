@@ -0,0 +1,89 @@
+# src/utils/db_streaming.py
+
+import pandas as pd
+import numpy as np
+from sqlalchemy import text
+import io
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Filas que se piden al cursor de servidor en cada viaje
+DEFAULT_BATCH_SIZE = 20_000
+
+def iter_ticker_frames(engine, query: str, params: dict = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Recorre el resultado de `query` con un cursor de servidor (named cursor en
+    psycopg2) y devuelve un DataFrame por ticker, de uno en uno.
+    La consulta DEBE ir ordenada por ticker para que cada grupo sea contiguo.
+    La memoria máxima es la de un ticker más un lote, no la de toda la tabla.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            text(query), params or {}
+        )
+        columns = list(result.keys())
+        buffer, buffer_ticker = [], None
+
+        for rows in result.partitions(batch_size):
+            chunk = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            tickers = chunk['ticker'].to_numpy()
+            bounds = [0, *(np.flatnonzero(tickers[1:] != tickers[:-1]) + 1), len(chunk)]
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                ticker = tickers[start]
+                if buffer and ticker != buffer_ticker:
+                    yield buffer_ticker, pd.concat(buffer, ignore_index=True)
+                    buffer = []
+                buffer.append(chunk.iloc[start:end])
+                buffer_ticker = ticker
+
+        if buffer:
+            yield buffer_ticker, pd.concat(buffer, ignore_index=True)
+
+class BulkCopyWriter:
+    """
+    Escritor masivo para una tabla: usa COPY ... FROM STDIN sobre la conexión
+    psycopg2 subyacente, un INSERT ... SELECT vectorizado sobre el DataFrame
+    registrado en DuckDB y, en otros motores, cae a `to_sql(method='multi')`.
+    Cada llamada a `write` envía un bloque y lo libera, sin acumular en memoria.
+    """
+
+    def __init__(self, connection, table_name: str, columns: list):
+        self.connection = connection
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._use_copy = connection.dialect.driver == 'psycopg2'
+        self._use_duckdb = connection.dialect.name == 'duckdb'
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        df = df[self.columns]
+        if self._use_copy:
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor = self.connection.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {self.table_name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            finally:
+                cursor.close()
+        elif self._use_duckdb:
+            raw_connection = self.connection.connection.dbapi_connection
+            raw_connection.register('_bulk_copy_df', df)
+            try:
+                self.connection.execute(text(
+                    f"INSERT INTO {self.table_name} ({', '.join(self.columns)}) "
+                    f"SELECT {', '.join(self.columns)} FROM _bulk_copy_df"
+                ))
+            finally:
+                raw_connection.unregister('_bulk_copy_df')
+        else:
+            df.to_sql(self.table_name, self.connection, if_exists='append', index=False, method='multi')
+        self.rows_written += len(df)
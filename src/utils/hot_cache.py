@@ -0,0 +1,229 @@
+# src/utils/hot_cache.py
+
+import pandas as pd
+import numpy as np
+import redis
+from datetime import datetime, timezone
+import json
+import sys
+import os
+import logging
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+
+# Se incrementa si cambia el formato de los hashes: las claves antiguas quedan
+# fuera del espacio de nombres y caducan solas por TTL.
+SCHEMA_VERSION = 1
+
+KINDS = ('bar', 'features', 'prediction')
+
+class HotCache:
+    """
+    Caché write-through en Redis con "lo último por ticker":
+      - bar:        último bar diario + ventana de cierres recientes
+      - features:   último vector de características (salida de 02)
+      - prediction: última predicción del modelo (salida de 03)
+
+    Cada tipo es un hash por ticker más un índice con los tickers de la última
+    generación escrita y un contador de versión. Todas las operaciones toleran
+    que Redis no esté disponible: devuelven None y el llamante lee de disco.
+    """
+
+    def __init__(self, url: str = None, client=None, prefix: str = None, enabled: bool = None):
+        self.enabled = settings.HOT_CACHE_ENABLED if enabled is None else enabled
+        self.prefix = f"{prefix or settings.HOT_CACHE_PREFIX}:v{SCHEMA_VERSION}"
+        self._client = client
+        self._url = url or settings.HOT_CACHE_URL
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                self._url, decode_responses=True, socket_timeout=1, socket_connect_timeout=1
+            )
+        return self._client
+
+    # --- Claves ---
+
+    def _key(self, kind: str, ticker: str) -> str:
+        return f"{self.prefix}:{kind}:{ticker}"
+
+    def _index_key(self, kind: str) -> str:
+        return f"{self.prefix}:{kind}:__index__"
+
+    def _version_key(self, kind: str) -> str:
+        return f"{self.prefix}:{kind}:__version__"
+
+    # --- Escritura ---
+
+    def _write(self, kind: str, records: dict) -> int:
+        """
+        Sustituye de forma atómica (MULTI/EXEC) la generación de `kind` por
+        `records` ({ticker: {campo: valor}}). Devuelve la versión escrita o None.
+        """
+        if not self.enabled or not records:
+            return None
+        ttl = settings.HOT_CACHE_TTL[kind]
+        try:
+            version = self.client.incr(self._version_key(kind))
+            written_at = datetime.now(timezone.utc).isoformat()
+            pipe = self.client.pipeline(transaction=True)
+            pipe.delete(self._index_key(kind))
+            for ticker, fields in records.items():
+                key = self._key(kind, ticker)
+                pipe.delete(key)
+                pipe.hset(key, mapping={**fields, '_version': version, '_written_at': written_at})
+                pipe.expire(key, ttl)
+            pipe.sadd(self._index_key(kind), *records.keys())
+            pipe.expire(self._index_key(kind), ttl)
+            pipe.expire(self._version_key(kind), ttl)
+            pipe.execute()
+            logging.info(f"🔥 Caché caliente '{kind}' actualizada: {len(records)} tickers (v{version}).")
+            return version
+        except redis.RedisError as e:
+            logging.warning(f"⚠️ No se pudo escribir la caché caliente '{kind}': {e}")
+            return None
+
+    def write_bars(self, bars_df: pd.DataFrame) -> int:
+        """
+        Recibe las barras recientes (ticker, timestamp, open, high, low, close, volume)
+        y guarda por ticker el último bar y la ventana de (timestamp, close, volume).
+        """
+        records = {}
+        bars_df = bars_df.sort_values(['ticker', 'timestamp'])
+        for ticker, group in bars_df.groupby('ticker', sort=False):
+            last = group.iloc[-1]
+            window = [
+                [pd.Timestamp(ts).isoformat(), float(close), float(volume)]
+                for ts, close, volume in zip(group['timestamp'], group['close'], group['volume'])
+            ]
+            records[ticker] = {
+                'timestamp': pd.Timestamp(last['timestamp']).isoformat(),
+                **{col: float(last[col]) for col in ['open', 'high', 'low', 'close', 'volume']},
+                'window': json.dumps(window),
+            }
+        return self._write('bar', records)
+
+    def write_features(self, latest_features: pd.DataFrame) -> int:
+        """`latest_features`: una fila por ticker (índice = ticker) con su timestamp."""
+        records = {}
+        for ticker, row in latest_features.iterrows():
+            fields = {'timestamp': pd.Timestamp(row['timestamp']).isoformat()}
+            for col, value in row.drop('timestamp').items():
+                if pd.notna(value) and isinstance(value, (int, float, np.number)):
+                    # repr de un float es exacto: el vector leído es idéntico al del parquet
+                    fields[col] = repr(float(value))
+            records[ticker] = fields
+        return self._write('features', records)
+
+    def write_predictions(self, predictions: dict, timestamp=None) -> int:
+        records = {}
+        ts = pd.Timestamp(timestamp or datetime.now(timezone.utc)).isoformat()
+        for ticker, pred in predictions.items():
+            records[ticker] = {
+                'timestamp': ts,
+                'prediction': pred['prediction'],
+                **{k: repr(float(v)) for k, v in pred.items() if k != 'prediction'},
+            }
+        return self._write('prediction', records)
+
+    # --- Lectura ---
+
+    @staticmethod
+    def _decode(fields: dict) -> dict:
+        decoded = {}
+        for name, value in fields.items():
+            if name == '_version':
+                decoded[name] = int(value)
+            elif name in ('timestamp', '_written_at'):
+                decoded[name] = pd.Timestamp(value)
+            elif name == 'window':
+                decoded[name] = json.loads(value)
+            else:
+                try:
+                    decoded[name] = float(value)
+                except ValueError:
+                    decoded[name] = value
+        return decoded
+
+    def read(self, kind: str, tickers: list = None) -> dict:
+        """Devuelve {ticker: campos} de la última generación, o None si no hay caché."""
+        if not self.enabled:
+            return None
+        try:
+            if tickers is None:
+                tickers = sorted(self.client.smembers(self._index_key(kind)))
+            if not tickers:
+                return None
+            pipe = self.client.pipeline(transaction=False)
+            for ticker in tickers:
+                pipe.hgetall(self._key(kind, ticker))
+            results = pipe.execute()
+        except redis.RedisError as e:
+            logging.warning(f"⚠️ Caché caliente '{kind}' no disponible: {e}")
+            return None
+        return {ticker: self._decode(fields) for ticker, fields in zip(tickers, results) if fields}
+
+    def version(self, kind: str) -> int:
+        try:
+            value = self.client.get(self._version_key(kind)) if self.enabled else None
+        except redis.RedisError:
+            return None
+        return int(value) if value is not None else None
+
+    def latest_features(self, columns: list = None, not_older_than: float = None) -> pd.DataFrame:
+        """
+        Último vector de características por ticker (índice = ticker, ordenado),
+        equivalente a `features_df.sort_values('timestamp').groupby('ticker').last()`.
+        Devuelve None si falta la caché, alguna columna pedida, o si se escribió
+        antes de `not_older_than` (epoch en segundos, p. ej. el mtime del parquet).
+        """
+        entries = self.read('features')
+        if not entries:
+            return None
+        if not_older_than is not None:
+            oldest = min(fields['_written_at'] for fields in entries.values())
+            if oldest.timestamp() < not_older_than:
+                return None
+        df = pd.DataFrame.from_dict(entries, orient='index').sort_index()
+        df.index.name = 'ticker'
+        if columns is not None:
+            if not set(columns).issubset(df.columns) or df[columns].isna().any().any():
+                return None
+            return df[columns]
+        return df.drop(columns=['_version', '_written_at'])
+
+    def bar_window(self, tickers: list = None, days: int = None) -> pd.DataFrame:
+        """
+        Cierres recientes en formato largo (ticker, timestamp, close, volume),
+        filtrados a los últimos `days` días. None si la caché no cubre la ventana.
+        """
+        if days is not None and days > settings.HOT_CACHE_BAR_WINDOW_DAYS:
+            return None
+        entries = self.read('bar', tickers)
+        if not entries:
+            return None
+        rows = [
+            (ticker, ts, close, volume)
+            for ticker, fields in entries.items()
+            for ts, close, volume in fields['window']
+        ]
+        df = pd.DataFrame(rows, columns=['ticker', 'timestamp', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        if days is not None:
+            df = df[df['timestamp'] >= pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)]
+        return df.reset_index(drop=True)
+
+# Instancia compartida (la conexión a Redis se abre en el primer uso)
+hot_cache = HotCache()
+
+if __name__ == "__main__":
+    for kind in KINDS:
+        entries = hot_cache.read(kind) or {}
+        print(f"🔥 {kind}: versión {hot_cache.version(kind)} | {len(entries)} tickers")
+        for ticker, fields in list(entries.items())[:3]:
+            print(f"   {ticker}: {fields.get('timestamp')} (escrito {fields.get('_written_at')})")
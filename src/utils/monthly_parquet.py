@@ -0,0 +1,225 @@
+# src/utils/monthly_parquet.py
+
+import pandas as pd
+import numpy as np
+import shutil
+import uuid
+import json
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.compact_schema import from_day_offsets
+
+MANIFEST_NAME = 'manifest.json'
+
+def month_codes(timestamps) -> np.ndarray:
+    """Mes natural de cada fila como entero año*100+mes (timestamps UTC o días int32 del esquema compacto)."""
+    if pd.api.types.is_integer_dtype(timestamps):
+        index = from_day_offsets(timestamps)
+    else:
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True))
+    return np.asarray(index.year * 100 + index.month, dtype=np.int64)
+
+def month_key(code: int) -> str:
+    return f"{code // 100:04d}-{code % 100:02d}"
+
+def month_of(timestamp) -> str:
+    """'YYYY-MM' de un instante (naive = UTC)."""
+    ts = pd.Timestamp(timestamp)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    return f"{ts.year:04d}-{ts.month:02d}"
+
+def split_months(df: pd.DataFrame, time_column: str = 'timestamp') -> dict:
+    """{'YYYY-MM': filas de ese mes} en el orden en que aparecen."""
+    if df.empty:
+        return {}
+    codes = month_codes(df[time_column])
+    return {month_key(code): df[codes == code] for code in np.unique(codes)}
+
+def _is_month(name: str) -> bool:
+    return len(name) == 7 and name[4] == '-' and name[:4].isdigit() and name[5:].isdigit()
+
+def _concat(parts: list) -> pd.DataFrame:
+    """Concatena conservando las categóricas aunque cada fichero tenga su propio diccionario."""
+    categorical = [col for col in parts[0].columns if isinstance(parts[0][col].dtype, pd.CategoricalDtype)]
+    df = pd.concat(parts, ignore_index=True)
+    for col in categorical:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+class MonthlyParquetStore:
+    """
+    Frame diario guardado como un parquet por mes natural ('YYYY-MM') en
+    `directory`, más los ficheros con nombre propio que quiera el llamante
+    (p. ej. la historia de un ticker recalculado).
+
+    `manifest.json` dice qué fichero vale para cada nombre y guarda los metadatos
+    del llamante; es el único punto de confirmación: los ficheros nuevos se
+    escriben con nombre único y solo existen para los lectores cuando el
+    manifiesto (atómico) los referencia. Así una ejecución diaria escribe solo
+    los meses que cambian y los lectores leen solo los meses que les interesan.
+    Los ficheros que dejan de estar referenciados se borran una confirmación
+    más tarde, para no quitárselos a un lector que cargó el manifiesto anterior.
+
+    Con `key_column` (p. ej. 'ticker') el manifiesto anota el mes de la última
+    fila de cada clave, para leer el último vector sin recorrer la historia.
+    """
+
+    def __init__(self, directory: str, time_column: str = 'timestamp', key_column: str = None):
+        self.directory = directory
+        self.time_column = time_column
+        self.key_column = key_column
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def mtime(self) -> float:
+        """Momento de la última confirmación (0 si no hay ninguna)."""
+        return os.path.getmtime(self.manifest_path) if self.exists() else 0.0
+
+    def manifest(self) -> dict:
+        if not self.exists():
+            return {'files': {}, 'meta': {}, 'previous': []}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def months(self, manifest: dict = None) -> list:
+        manifest = manifest if manifest is not None else self.manifest()
+        return sorted(name for name in manifest['files'] if _is_month(name))
+
+    def path(self, name: str, manifest: dict = None) -> str:
+        manifest = manifest if manifest is not None else self.manifest()
+        return os.path.join(self.directory, manifest['files'][name])
+
+    def read_file(self, name: str, columns: list = None, manifest: dict = None) -> pd.DataFrame:
+        """Un fichero por nombre, o None si no existe."""
+        manifest = manifest if manifest is not None else self.manifest()
+        if name not in manifest['files']:
+            return None
+        return pd.read_parquet(self.path(name, manifest), columns=columns)
+
+    def read(self, since=None, columns: list = None, latest: bool = False, manifest: dict = None) -> pd.DataFrame:
+        """
+        Filas desde `since` (sin él, todas), leyendo solo los meses que lo
+        solapan. Con `latest`, se leen además enteros los meses que guardan la
+        última fila de cada clave (`key_column`), aunque sean anteriores a
+        `since`. Devuelve None si el almacén está vacío.
+        """
+        manifest = manifest if manifest is not None else self.manifest()
+        months = self.months(manifest)
+        if not months:
+            return None
+        start = None if since is None else month_of(since)
+        if latest:
+            first = min(manifest.get('last_month', {}).values(), default=months[0])
+            if start is None or first < start:
+                start, since = first, None
+        parts = [self.read_file(m, columns, manifest) for m in months if start is None or m >= start]
+        # Sin meses desde `since`: frame vacío con el esquema del almacén
+        df = _concat(parts or [self.read_file(months[-1], columns, manifest).iloc[:0]])
+        if since is not None:
+            df = df[self.timestamps(df) >= _as_utc(since)].reset_index(drop=True)
+        return df
+
+    def timestamps(self, df: pd.DataFrame) -> pd.Series:
+        """Columna de tiempo como datetime UTC (también en esquema compacto)."""
+        column = df[self.time_column]
+        if pd.api.types.is_integer_dtype(column):
+            return pd.Series(from_day_offsets(column), index=df.index)
+        return pd.to_datetime(column, utc=True)
+
+    def commit(self, write: dict = None, drop=(), meta: dict = None, reset: bool = False, base: 'MonthlyParquetStore' = None):
+        """
+        Confirma un cambio: `write` ({nombre: frame}) sustituye esos ficheros,
+        `drop` los quita, `meta` reemplaza los metadatos (None = los mismos) y
+        `reset` parte de un almacén vacío. Con `base`, se parte del contenido de
+        otro almacén: sus ficheros se enlazan (hardlink, sin copiar datos).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        current = self.manifest()
+        write = write or {}
+        if base is not None:
+            source = base.manifest()
+            files = {}
+            for name, filename in source['files'].items():
+                if name in write or name in drop:
+                    continue
+                target = os.path.join(self.directory, filename)
+                if not os.path.exists(target):
+                    _link(os.path.join(base.directory, filename), target)
+                files[name] = filename
+            new_meta, last_month = source['meta'], source.get('last_month', {})
+        else:
+            files = {} if reset else dict(current['files'])
+            new_meta, last_month = current['meta'], {} if reset else current.get('last_month', {})
+        for name in drop:
+            files.pop(name, None)
+        for name, df in write.items():
+            filename = f"{name.replace(os.sep, '_').replace(':', '_')}.{uuid.uuid4().hex[:12]}.parquet"
+            df.to_parquet(os.path.join(self.directory, filename), index=False)
+            files[name] = filename
+        manifest = {
+            'files': files, 'meta': new_meta if meta is None else meta,
+            'last_month': self._last_months(last_month, files, write, drop) if self.key_column else {},
+            # Ficheros de la confirmación anterior: se conservan una vuelta más
+            'previous': sorted(set(current['files'].values()) - set(files.values())),
+        }
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+        self._collect(manifest)
+
+    def _last_months(self, last_month: dict, files: dict, write: dict, drop) -> dict:
+        """
+        Mes de la última fila por clave tras la confirmación. Las claves cuyo
+        mes se ha sustituido sin que vuelvan a aparecer se retrasan al último
+        mes que se conserva.
+        """
+        changed = [name for name in list(write) + list(drop) if _is_month(name)]
+        last_month = dict(last_month)
+        if changed:
+            floor = min(changed)
+            kept = max((m for m in files if _is_month(m) and m < floor), default=None)
+            for key, month in list(last_month.items()):
+                if month >= floor:
+                    if kept is None:
+                        del last_month[key]
+                    else:
+                        last_month[key] = kept
+        for name, df in write.items():
+            if _is_month(name):
+                for key in df[self.key_column].unique():
+                    last_month[str(key)] = max(last_month.get(str(key), name), name)
+        return last_month
+
+    def _collect(self, manifest: dict):
+        """Borra los ficheros que no referencian ni esta confirmación ni la anterior."""
+        keep = set(manifest['files'].values()) | set(manifest['previous']) | {MANIFEST_NAME}
+        for filename in os.listdir(self.directory):
+            if filename not in keep and filename.endswith('.parquet'):
+                os.remove(os.path.join(self.directory, filename))
+
+    def size_bytes(self) -> int:
+        manifest = self.manifest()
+        return sum(os.path.getsize(os.path.join(self.directory, f)) for f in manifest['files'].values())
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def _as_utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+def _link(source: str, target: str):
+    """Hardlink (mismo contenido sin copiarlo); copia si el sistema de ficheros no lo permite."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
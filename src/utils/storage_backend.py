@@ -0,0 +1,86 @@
+# src/utils/storage_backend.py
+
+from sqlalchemy import create_engine, text, inspect
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import settings
+
+SUPPORTED_BACKENDS = ('postgresql', 'duckdb')
+
+# Mismo layout de tablas que en PostgreSQL. Los precios se guardan como DOUBLE:
+# en DuckDB un NUMERIC sin precisión es DECIMAL(18,3) y truncaría activos como SHIB.
+EMBEDDED_SCHEMA = {
+    "asset_metrics": "CREATE TABLE IF NOT EXISTS asset_metrics (ticker TEXT, timestamp TIMESTAMPTZ, open DOUBLE PRECISION, high DOUBLE PRECISION, low DOUBLE PRECISION, close DOUBLE PRECISION, volume BIGINT, PRIMARY KEY (ticker, timestamp));",
+    "derivatives_funding_rates": "CREATE TABLE IF NOT EXISTS derivatives_funding_rates (timestamp TIMESTAMPTZ, ticker TEXT, funding_rate DOUBLE PRECISION);",
+    "technical_indicators": "CREATE TABLE IF NOT EXISTS technical_indicators (ticker TEXT, timestamp TIMESTAMPTZ, ema_12 DOUBLE PRECISION, ema_26 DOUBLE PRECISION, macd DOUBLE PRECISION, macd_signal DOUBLE PRECISION, macd_hist DOUBLE PRECISION, rsi_14 DOUBLE PRECISION, bb_upper DOUBLE PRECISION, bb_middle DOUBLE PRECISION, bb_lower DOUBLE PRECISION, obv BIGINT, atr_14 DOUBLE PRECISION, PRIMARY KEY (ticker, timestamp));",
+    "candle_patterns": "CREATE TABLE IF NOT EXISTS candle_patterns (ticker TEXT, timestamp TIMESTAMPTZ, pattern_score INTEGER, pattern_name TEXT, PRIMARY KEY (ticker, timestamp));",
+    "trade_log": "CREATE TABLE IF NOT EXISTS trade_log (id INTEGER DEFAULT nextval('trade_log_id_seq') PRIMARY KEY, timestamp TIMESTAMPTZ NOT NULL, ticker VARCHAR(20) NOT NULL, action VARCHAR(10) NOT NULL, price FLOAT, size FLOAT, order_id VARCHAR(50) UNIQUE, status VARCHAR(20));",
+}
+for _macro_table in settings.MACRO_TICKERS.values():
+    EMBEDDED_SCHEMA[_macro_table] = (
+        f"CREATE TABLE IF NOT EXISTS {_macro_table} (timestamp TIMESTAMPTZ, open DOUBLE PRECISION, high DOUBLE PRECISION, "
+        f"low DOUBLE PRECISION, close DOUBLE PRECISION, volume BIGINT);"
+    )
+
+EMBEDDED_SEQUENCES = ['trade_log_id_seq']
+
+def get_backend() -> str:
+    backend = settings.DB_BACKEND.lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Backend de almacenamiento no soportado: '{backend}' (usa uno de {SUPPORTED_BACKENDS})")
+    return backend
+
+def build_database_url(backend: str = None) -> str:
+    """URL de SQLAlchemy para el backend indicado (o el de settings)."""
+    backend = backend or get_backend()
+    if backend == 'duckdb':
+        return f"duckdb:///{os.path.abspath(settings.EMBEDDED_DB_PATH)}"
+    return (
+        f"postgresql+psycopg2://{settings.DB_USER}:{settings.DB_PASSWORD}@"
+        f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    )
+
+def build_engine(backend: str = None):
+    """Crea el motor de SQLAlchemy; en modo embebido asegura el archivo y el esquema."""
+    backend = backend or get_backend()
+    if backend == 'duckdb':
+        os.makedirs(os.path.dirname(os.path.abspath(settings.EMBEDDED_DB_PATH)), exist_ok=True)
+        engine = create_engine(build_database_url(backend))
+        initialize_embedded_schema(engine)
+        return engine
+    return create_engine(build_database_url(backend))
+
+def is_embedded(engine) -> bool:
+    return engine.dialect.name == 'duckdb'
+
+def initialize_embedded_schema(engine):
+    """Crea (si no existen) las tablas del pipeline en la base de datos embebida."""
+    with engine.connect() as connection:
+        with connection.begin():
+            for sequence in EMBEDDED_SEQUENCES:
+                connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {sequence};"))
+            for ddl in EMBEDDED_SCHEMA.values():
+                connection.execute(text(ddl))
+
+def default_schema(engine) -> str:
+    """Esquema por defecto: 'public' en PostgreSQL, 'main' en DuckDB."""
+    return 'main' if is_embedded(engine) else 'public'
+
+def truncate_table(connection, table_name: str, restart_identity: bool = False):
+    """TRUNCATE portable: las opciones RESTART IDENTITY/CASCADE solo existen en PostgreSQL."""
+    if connection.dialect.name == 'postgresql' and restart_identity:
+        connection.execute(text(f"TRUNCATE TABLE {table_name} RESTART IDENTITY CASCADE;"))
+    else:
+        connection.execute(text(f"TRUNCATE TABLE {table_name};"))
+
+def list_tables(engine) -> list:
+    return sorted(inspect(engine).get_table_names())
+
+def table_columns(connection, table_name: str) -> list:
+    """Columnas de una tabla sin pasar por la reflexión de pg_catalog (incompleta en DuckDB)."""
+    return list(connection.execute(text(f"SELECT * FROM {table_name} LIMIT 0")).keys())
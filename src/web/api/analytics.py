@@ -1,8 +1,10 @@
 # src/web/api/analytics.py
 import pandas as pd
 import numpy as np
+from sqlalchemy import text
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+import json
 import sys
 import os
 
@@ -12,12 +14,14 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from src.utils.db_connector import create_db_engine
+from src.utils.hot_cache import hot_cache
+from src.feature_engineering.rolling_correlation import RollingCorrelationEngine
 
 class AnalyticsService:
     """Servicio avanzado de analytics para Cryptonita"""
     
-    def __init__(self):
-        self.engine = create_db_engine()
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else create_db_engine()
     
     def calculate_portfolio_metrics(self, trades_data: List[Dict]) -> Dict:
         """Calcula métricas básicas del portfolio"""
@@ -197,19 +201,22 @@ class AnalyticsService:
     def get_market_sentiment(self) -> Dict:
         """Obtiene el sentiment general del mercado"""
         try:
-            if not self.engine:
-                return {"sentiment": "UNKNOWN", "confidence": 0}
-            
-            # Query para obtener datos recientes de precios
-            query = """
-            SELECT ticker, close, timestamp
-            FROM asset_metrics 
-            WHERE timestamp >= NOW() - INTERVAL '7 days'
-            AND ticker IN ('BTC-USD', 'ETH-USD', 'BNB-USD')
-            ORDER BY ticker, timestamp DESC
-            """
-            
-            df = pd.read_sql(query, self.engine)
+            # Ventana de 7 días desde la caché caliente; si no está, de la base de datos
+            df = hot_cache.bar_window(tickers=['BTC-USD', 'ETH-USD', 'BNB-USD'], days=7)
+            if df is None:
+                if not self.engine:
+                    return {"sentiment": "UNKNOWN", "confidence": 0}
+                
+                # Query para obtener datos recientes de precios
+                query = """
+                SELECT ticker, close, timestamp
+                FROM asset_metrics 
+                WHERE timestamp >= NOW() - INTERVAL '7 days'
+                AND ticker IN ('BTC-USD', 'ETH-USD', 'BNB-USD')
+                ORDER BY ticker, timestamp DESC
+                """
+                
+                df = pd.read_sql(text(query), self.engine)
             
             if df.empty:
                 return {"sentiment": "NEUTRAL", "confidence": 0}
@@ -258,11 +265,11 @@ class AnalyticsService:
             # Query para trades del día
             trades_query = """
             SELECT * FROM trade_log 
-            WHERE DATE(timestamp) = %s
+            WHERE DATE(timestamp) = :today
             ORDER BY timestamp DESC
             """
             
-            trades_df = pd.read_sql(trades_query, self.engine, params=[today])
+            trades_df = pd.read_sql(text(trades_query), self.engine, params={'today': today})
             
             # Métricas del día
             daily_trades = len(trades_df)
@@ -310,11 +317,11 @@ class AnalyticsService:
             # Query para trades de la semana
             trades_query = """
             SELECT * FROM trade_log 
-            WHERE timestamp >= %s
+            WHERE timestamp >= :week_start
             ORDER BY timestamp DESC
             """
             
-            trades_df = pd.read_sql(trades_query, self.engine, params=[week_start])
+            trades_df = pd.read_sql(text(trades_query), self.engine, params={'week_start': week_start})
             
             # Calcular métricas semanales
             weekly_trades = len(trades_df)
@@ -378,7 +385,7 @@ class AnalyticsService:
                     ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY timestamp ASC) as rn_first,
                     ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY timestamp DESC) as rn_last
                 FROM asset_metrics 
-                WHERE timestamp >= NOW() - INTERVAL '%s days'
+                WHERE timestamp >= NOW() - :days * INTERVAL '1 day'
             ),
             first_last_prices AS (
                 SELECT 
@@ -400,7 +407,7 @@ class AnalyticsService:
             LIMIT 20
             """
             
-            df = pd.read_sql(query, self.engine, params=[days])
+            df = pd.read_sql(text(query), self.engine, params={'days': days})
             
             return [
                 {
@@ -424,34 +431,13 @@ class AnalyticsService:
             if not assets:
                 assets = ['BTC-USD', 'ETH-USD', 'BNB-USD', 'SOL-USD', 'ADA-USD']
             
-            # Query para obtener precios diarios
-            assets_str = "', '".join(assets)
-            query = f"""
-            SELECT 
-                DATE(timestamp) as date,
-                ticker,
-                AVG(close) as avg_close
-            FROM asset_metrics 
-            WHERE ticker IN ('{assets_str}')
-            AND timestamp >= NOW() - INTERVAL '30 days'
-            GROUP BY DATE(timestamp), ticker
-            ORDER BY date, ticker
-            """
-            
-            df = pd.read_sql(query, self.engine)
+            # Ventana móvil que mantiene el pipeline (correlation_sync_task); aquí solo se lee
+            correlations = RollingCorrelationEngine.load()
+            corr_matrix = correlations.correlation_matrix(assets)
             
-            if df.empty:
+            if corr_matrix.empty:
                 return {}
             
-            # Pivot para tener activos como columnas
-            pivot_df = df.pivot(index='date', columns='ticker', values='avg_close')
-            
-            # Calcular retornos diarios
-            returns_df = pivot_df.pct_change().dropna()
-            
-            # Calcular matriz de correlación
-            corr_matrix = returns_df.corr()
-            
             # Convertir a formato JSON serializable
             correlation_data = {}
             for asset1 in corr_matrix.index:
@@ -478,12 +464,12 @@ class AnalyticsService:
                 AVG(close) as avg_close
             FROM asset_metrics 
             WHERE ticker IN ('BTC-USD', 'ETH-USD', 'BNB-USD')
-            AND timestamp >= NOW() - INTERVAL '%s days'
+            AND timestamp >= NOW() - :days * INTERVAL '1 day'
             GROUP BY DATE(timestamp), ticker
             ORDER BY date, ticker
             """
             
-            df = pd.read_sql(query, self.engine, params=[days])
+            df = pd.read_sql(text(query), self.engine, params={'days': days})
             
             if df.empty:
                 return {"error": "No data available"}
@@ -537,7 +523,7 @@ class AnalyticsService:
             ORDER BY timestamp
             """
             
-            df = pd.read_sql(query, self.engine)
+            df = pd.read_sql(text(query), self.engine)
             
             if df.empty:
                 return {"no_trades": True}
@@ -1,6 +1,7 @@
 # src/web/api/database.py - VERSIÓN MEJORADA
 import pandas as pd
 import numpy as np
+from sqlalchemy import text
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import sys
@@ -14,12 +15,13 @@ if project_root not in sys.path:
 
 # Importar tu conector existente
 from src.utils.db_connector import create_db_engine
+from src.utils.hot_cache import hot_cache
 
 class CryptonitaDataService:
     """Servicio mejorado para acceder a los datos de PostgreSQL"""
     
-    def __init__(self):
-        self.engine = create_db_engine()
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else create_db_engine()
         self.logger = logging.getLogger(__name__)
     
     def get_portfolio_summary(self) -> Dict:
@@ -63,7 +65,7 @@ class CryptonitaDataService:
                      ts.sell_orders, ts.last_trade, ts.first_trade, ts.avg_trade_value, ts.unique_assets
             """
             
-            df = pd.read_sql(query, self.engine)
+            df = pd.read_sql(text(query), self.engine)
             
             if df.empty or df.iloc[0]['total_trades'] == 0:
                 return {
@@ -147,10 +149,10 @@ class CryptonitaDataService:
                 order_id
             FROM trade_log
             ORDER BY timestamp DESC
-            LIMIT %s
+            LIMIT :limit
             """
             
-            df = pd.read_sql(query, self.engine, params=[limit])
+            df = pd.read_sql(text(query), self.engine, params={'limit': limit})
             
             return [
                 {
@@ -174,49 +176,52 @@ class CryptonitaDataService:
     def get_top_performers(self, days: int = 7) -> List[Dict]:
         """Obtiene los activos con mejor rendimiento con análisis mejorado"""
         try:
-            if not self.engine:
-                return []
-            
-            query = """
-            WITH daily_prices AS (
-                SELECT 
-                    ticker,
-                    DATE(timestamp) as date,
-                    AVG(close) as avg_close,
-                    MIN(close) as min_close,
-                    MAX(close) as max_close,
-                    AVG(volume) as avg_volume
-                FROM asset_metrics
-                WHERE timestamp >= NOW() - INTERVAL '%s days'
-                GROUP BY ticker, DATE(timestamp)
-            ),
-            price_analysis AS (
+            # Misma agregación sobre la ventana de la caché caliente, si la cubre
+            df = self._top_performers_from_cache(days)
+            if df is None:
+                if not self.engine:
+                    return []
+            
+                query = """
+                WITH daily_prices AS (
+                    SELECT 
+                        ticker,
+                        DATE(timestamp) as date,
+                        AVG(close) as avg_close,
+                        MIN(close) as min_close,
+                        MAX(close) as max_close,
+                        AVG(volume) as avg_volume
+                    FROM asset_metrics
+                    WHERE timestamp >= NOW() - :days * INTERVAL '1 day'
+                    GROUP BY ticker, DATE(timestamp)
+                ),
+                price_analysis AS (
+                    SELECT 
+                        ticker,
+                        COUNT(*) as trading_days,
+                        (MAX(avg_close) - MIN(avg_close)) / MIN(avg_close) * 100 as change_percent,
+                        STDDEV(avg_close) / AVG(avg_close) * 100 as volatility_percent,
+                        AVG(avg_volume) as avg_daily_volume,
+                        MAX(avg_close) as period_high,
+                        MIN(avg_close) as period_low
+                    FROM daily_prices
+                    GROUP BY ticker
+                    HAVING COUNT(*) >= 2
+                )
                 SELECT 
                     ticker,
-                    COUNT(*) as trading_days,
-                    (MAX(avg_close) - MIN(avg_close)) / MIN(avg_close) * 100 as change_percent,
-                    STDDEV(avg_close) / AVG(avg_close) * 100 as volatility_percent,
-                    AVG(avg_volume) as avg_daily_volume,
-                    MAX(avg_close) as period_high,
-                    MIN(avg_close) as period_low
-                FROM daily_prices
-                GROUP BY ticker
-                HAVING COUNT(*) >= 2
-            )
-            SELECT 
-                ticker,
-                ROUND(change_percent::numeric, 2) as change_percent,
-                ROUND(volatility_percent::numeric, 2) as volatility,
-                trading_days,
-                ROUND(avg_daily_volume::numeric, 0) as avg_volume,
-                ROUND(period_high::numeric, 6) as high,
-                ROUND(period_low::numeric, 6) as low
-            FROM price_analysis
-            ORDER BY change_percent DESC
-            LIMIT 10
-            """
-            
-            df = pd.read_sql(query, self.engine, params=[days])
+                    ROUND(change_percent::numeric(38, 10), 2) as change_percent,
+                    ROUND(volatility_percent::numeric(38, 10), 2) as volatility,
+                    trading_days,
+                    ROUND(avg_daily_volume::numeric(38, 10), 0) as avg_volume,
+                    ROUND(period_high::numeric(38, 10), 6) as high,
+                    ROUND(period_low::numeric(38, 10), 6) as low
+                FROM price_analysis
+                ORDER BY change_percent DESC
+                LIMIT 10
+                """
+            
+                df = pd.read_sql(text(query), self.engine, params={'days': days})
             
             return [
                 {
@@ -236,6 +241,35 @@ class CryptonitaDataService:
             self.logger.error(f"Error in get_top_performers: {e}")
             return []
     
+    def _top_performers_from_cache(self, days: int) -> Optional[pd.DataFrame]:
+        """Réplica en pandas de la consulta de get_top_performers sobre la ventana de barras cacheada."""
+        bars = hot_cache.bar_window(days=days)
+        if bars is None or bars.empty:
+            return None
+        bars['date'] = bars['timestamp'].dt.date
+        daily = bars.groupby(['ticker', 'date']).agg(avg_close=('close', 'mean'), avg_volume=('volume', 'mean'))
+        stats = daily.groupby('ticker').agg(
+            trading_days=('avg_close', 'size'),
+            period_high=('avg_close', 'max'),
+            period_low=('avg_close', 'min'),
+            mean_close=('avg_close', 'mean'),
+            std_close=('avg_close', 'std'),
+            avg_volume=('avg_volume', 'mean'),
+        )
+        stats = stats[stats['trading_days'] >= 2]
+        stats['change_percent'] = (stats['period_high'] - stats['period_low']) / stats['period_low'] * 100
+        stats['volatility'] = stats['std_close'] / stats['mean_close'] * 100
+        df = stats.sort_values('change_percent', ascending=False).head(10).reset_index()
+        return pd.DataFrame({
+            'ticker': df['ticker'],
+            'change_percent': df['change_percent'].round(2),
+            'volatility': df['volatility'].round(2),
+            'trading_days': df['trading_days'],
+            'avg_volume': df['avg_volume'].round(0),
+            'high': df['period_high'].round(6),
+            'low': df['period_low'].round(6),
+        })
+    
     def get_asset_metrics_summary(self) -> Dict:
         """Obtiene resumen mejorado de métricas de activos"""
         try:
@@ -270,13 +304,13 @@ class CryptonitaDataService:
                 a.*,
                 r.records_today,
                 d.missing_prices,
-                ROUND(d.avg_volume::numeric, 0) as avg_volume
+                ROUND(d.avg_volume::numeric(38, 10), 0) as avg_volume
             FROM asset_summary a
             CROSS JOIN recent_activity r
             CROSS JOIN data_quality d
             """
             
-            df = pd.read_sql(query, self.engine)
+            df = pd.read_sql(text(query), self.engine)
             row = df.iloc[0]
             
             # Calcular calidad de datos
@@ -345,7 +379,7 @@ class CryptonitaDataService:
             db_health = "healthy"
             try:
                 with self.engine.connect() as conn:
-                    conn.execute("SELECT 1")
+                    conn.execute(text("SELECT 1"))
             except:
                 db_health = "error"
             
@@ -379,7 +413,7 @@ class CryptonitaDataService:
                     MIN(timestamp) as first_trade,
                     MAX(timestamp) as last_trade
                 FROM trade_log
-                WHERE timestamp >= NOW() - INTERVAL '%s days'
+                WHERE timestamp >= NOW() - :days * INTERVAL '1 day'
                 GROUP BY ticker, action
             ),
             ticker_summary AS (
@@ -395,14 +429,14 @@ class CryptonitaDataService:
                 ta.*,
                 ts.total_trades,
                 ts.action_types,
-                ROUND(ta.total_volume::numeric, 2) as volume,
-                ROUND(ta.avg_trade_size::numeric, 2) as avg_size
+                ROUND(ta.total_volume::numeric(38, 10), 2) as volume,
+                ROUND(ta.avg_trade_size::numeric(38, 10), 2) as avg_size
             FROM trade_analytics ta
             JOIN ticker_summary ts ON ta.ticker = ts.ticker
             ORDER BY ta.total_volume DESC
             """
             
-            df = pd.read_sql(query, self.engine, params=[days])
+            df = pd.read_sql(text(query), self.engine, params={'days': days})
             
             if df.empty:
                 return {"no_data": True}
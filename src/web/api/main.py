@@ -25,6 +25,7 @@ from src.web.api.database import data_service
 from src.web.api.analytics import AnalyticsService
 from src.config import settings
 from src.trading.advanced_money_management import advanced_money_manager
+from src.modeling.model_server import model_server
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -120,6 +121,72 @@ async def get_system_status():
             }
         )
 
+@app.get("/api/monitoring/drift")
+async def get_feature_drift():
+    """Deriva (PSI/KS) y calidad de datos de las features del modelo frente al entrenamiento"""
+    try:
+        monitor = CryptonitaPipelineMonitor()
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "drift": monitor.check_feature_drift()
+        }
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "timestamp": datetime.now().isoformat(),
+                "error": str(e)
+            }
+        )
+
+@app.get("/api/model/status")
+async def get_model_status():
+    """Versión del modelo en memoria del servidor y número de recargas"""
+    try:
+        model_server.current()
+        return {"status": "success", "timestamp": datetime.now().isoformat(), "model": model_server.status()}
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"status": "error", "timestamp": datetime.now().isoformat(), "error": str(e)}
+        )
+
+@app.post("/api/model/predict")
+async def predict_batch(rows: Dict[str, Dict[str, float]]):
+    """Predicción por lotes con el modelo caliente: {ticker: {feature: valor}}"""
+    try:
+        model = model_server.current()
+        X = pd.DataFrame.from_dict(rows, orient='index').reindex(columns=model.features).astype(np.float64)
+        missing = X.columns[X.isna().any()].tolist()
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Faltan features: {missing}")
+        output = model.predict(X)
+        predictions = {
+            ticker: {
+                'prediction': 'BUY' if output['primary_preds'][i] == 1 else 'SELL',
+                'confidence': float(output['meta_confidence'][i]),
+                'buy_probability': float(output['primary_proba'][i][1]),
+                'sell_probability': float(output['primary_proba'][i][0]),
+                'passes_threshold': bool(output['passes_threshold'][i])
+            }
+            for i, ticker in enumerate(X.index)
+        }
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "model_version": model.version,
+            "predictions": predictions
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"status": "error", "timestamp": datetime.now().isoformat(), "error": str(e)}
+        )
+
 @app.get("/api/portfolio")
 async def get_portfolio_data():
     """Datos completos del portfolio con análisis"""